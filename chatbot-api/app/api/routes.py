@@ -1,10 +1,13 @@
 """API routes for the chatbot service."""
 
 import logging
+import time
+import orjson
 from datetime import datetime
-from typing import Optional
-from fastapi import APIRouter, HTTPException, Query
+from typing import Any, AsyncGenerator, AsyncIterator, Dict, List, Optional
+from fastapi import APIRouter, HTTPException, Query, Request, Response, WebSocket
 from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 from app.models import (
     ChatRequest, 
     ChatResponse, 
@@ -12,7 +15,21 @@ from app.models import (
     ErrorResponse,
     StreamChunk
 )
+from app.services.admission import AdmissionRejected
+from app.services.batch import BatchBusy
 from app.services.chat_service import ChatService
+from app.services.multiplex import ChatMultiplexer
+from app.services.ollama_pool import NoBackendAvailableError
+from app.services.timing import StageTimer
+from app.services.streaming import (
+    SSE_DONE,
+    coalesce_chunks,
+    encode_delta,
+    encode_sse,
+    encode_sse_event,
+    gzip_stream,
+    negotiate_stream_format
+)
 from app.config import settings
 
 
@@ -25,16 +42,15 @@ router = APIRouter()
 chat_service = ChatService()
 
 
-@router.on_event("startup")
-async def startup_event():
-    """Initialize the chat service on startup."""
-    await chat_service.__aenter__()
-
-
-@router.on_event("shutdown")
-async def shutdown_event():
-    """Clean up the chat service on shutdown."""
-    await chat_service.__aexit__(None, None, None)
+def _snapshot_age() -> Dict[str, Any]:
+    """Describe how fresh the upstream snapshot served by /health and /models is."""
+    checked_at = chat_service.upstream_checked_at()
+    if checked_at is None:
+        return {"upstream_checked_at": None, "upstream_age_seconds": None}
+    return {
+        "upstream_checked_at": datetime.utcfromtimestamp(checked_at).isoformat(),
+        "upstream_age_seconds": round(max(0.0, time.time() - checked_at), 3)
+    }
 
 
 @router.get("/health", response_model=HealthResponse)
@@ -53,7 +69,8 @@ async def health_check():
             status="healthy",
             version=settings.api_version,
             model=settings.ollama_model,
-            timestamp=datetime.utcnow().isoformat()
+            timestamp=datetime.utcnow().isoformat(),
+            **_snapshot_age()
         )
     except Exception as e:
         logger.error(f"Health check failed: {e}")
@@ -65,12 +82,16 @@ async def health_check():
 
 @router.get("/models")
 async def list_models():
-    """List available models from Ollama."""
+    """List available models from the background-refreshed Ollama snapshot."""
     try:
         models = await chat_service.list_available_models()
+        residency = chat_service.model_residency()
         return {
             "models": models,
-            "default_model": settings.ollama_model
+            "default_model": settings.ollama_model,
+            "resident_models": sorted(residency),
+            "residency": residency,
+            **_snapshot_age()
         }
     except Exception as e:
         logger.error(f"Failed to list models: {e}")
@@ -80,21 +101,47 @@ async def list_models():
         )
 
 
+@router.get("/cache/stats")
+async def cache_stats():
+    """Get response cache hit/miss/eviction counters."""
+    return chat_service.cache_stats()
+
+
 @router.post("/chat", response_model=ChatResponse)
 async def chat_complete(
     request: ChatRequest,
+    http_request: Request,
+    http_response: Response,
     conversation_id: Optional[str] = Query(None, description="Optional conversation ID")
 ):
     """Generate a complete (non-streaming) chat response."""
+    timer = StageTimer.from_request(http_request)
     try:
+        # Shed load before touching conversation state
+        chat_service.check_admission(request)
+        chat_service.check_upstream(request)
+        
         # Process the chat request
         conv_id = await chat_service.process_chat_request(request, conversation_id)
         
         # Generate complete response
-        response = await chat_service.generate_complete_response(request, conv_id)
+        response = await chat_service.generate_complete_response(request, conv_id, timer)
+        http_response.headers["Server-Timing"] = timer.server_timing()
         
         return response
         
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except NoBackendAvailableError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
     except Exception as e:
         logger.error(f"Error in chat completion: {e}")
         raise HTTPException(
@@ -103,28 +150,87 @@ async def chat_complete(
         )
 
 
+async def _full_events(chunks: AsyncIterator[StreamChunk]) -> AsyncGenerator[bytes, None]:
+    """Encode every chunk as a full ``StreamChunk`` event, ending with ``[DONE]``."""
+    async for chunk in chunks:
+        yield encode_sse(chunk)
+        if chunk.is_complete:
+            yield SSE_DONE
+            break
+
+
+async def _compact_events(
+    chunks: AsyncIterator[StreamChunk],
+    model: str,
+    conversation_id: str
+) -> AsyncGenerator[bytes, None]:
+    """Encode chunks in the compact format.
+    
+    A ``start`` event carries the model and conversation ID once, content
+    goes out as bare JSON-string deltas, and an ``end`` event with the usage
+    and timings closes the stream (preceded by an ``error`` event if generation failed).
+    """
+    yield encode_sse_event("start", {"model": model, "conversation_id": conversation_id})
+    async for chunk in chunks:
+        if chunk.queue_position is not None:
+            yield encode_sse_event("queued", {"position": chunk.queue_position})
+        elif chunk.is_complete:
+            if chunk.content:
+                yield encode_sse_event("error", {"error": chunk.content})
+            yield encode_sse_event("end", {
+                "usage": chunk.usage.model_dump(exclude_none=True) if chunk.usage is not None else None,
+                "timing": chunk.timing.model_dump(exclude_none=True) if chunk.timing is not None else None
+            })
+            break
+        else:
+            yield encode_delta(chunk.content)
+
+
 @router.post("/chat/stream")
 async def chat_stream(
     request: ChatRequest,
-    conversation_id: Optional[str] = Query(None, description="Optional conversation ID")
+    http_request: Request,
+    conversation_id: Optional[str] = Query(None, description="Optional conversation ID"),
+    stream_format: Optional[str] = Query(
+        None,
+        alias="format",
+        description="Stream format: full (default) or compact; also negotiable via Accept"
+    )
 ):
     """Generate a streaming chat response."""
+    timer = StageTimer.from_request(http_request)
+    try:
+        stream_format = negotiate_stream_format(stream_format, http_request.headers.get("accept"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     try:
+        # Shed load before touching conversation state
+        chat_service.check_admission(request)
+        chat_service.check_upstream(request)
+        
         # Process the chat request
         conv_id = await chat_service.process_chat_request(request, conversation_id)
         
         async def generate_stream():
             """Generate streaming response chunks."""
+            # Coalesce token bursts into fewer SSE frames (the first token is never delayed),
+            # and stop generating as soon as the client goes away
+            chunks = coalesce_chunks(
+                chat_service.generate_streaming_response(request, conv_id, timer),
+                flush_interval=settings.stream_flush_interval_ms / 1000,
+                flush_bytes=settings.stream_flush_bytes,
+                is_disconnected=http_request.is_disconnected,
+                disconnect_poll_interval=settings.stream_disconnect_poll_interval
+            )
+            if stream_format == "compact":
+                events = _compact_events(chunks, chat_service.resolve_model(request), conv_id)
+            else:
+                events = _full_events(chunks)
             try:
-                async for chunk in chat_service.generate_streaming_response(request, conv_id):
-                    # Format as Server-Sent Events
-                    chunk_json = chunk.model_dump_json()
-                    yield f"data: {chunk_json}\n\n"
-                    
-                    # Send final event when complete
-                    if chunk.is_complete:
-                        yield f"data: [DONE]\n\n"
-                        break
+                # Format as Server-Sent Events
+                async for event in events:
+                    yield event
                         
             except Exception as e:
                 logger.error(f"Error in streaming response: {e}")
@@ -133,8 +239,15 @@ async def chat_stream(
                     is_complete=True,
                     model=request.model or settings.ollama_model
                 )
-                yield f"data: {error_chunk.model_dump_json()}\n\n"
-                yield f"data: [DONE]\n\n"
+                if stream_format == "compact":
+                    yield encode_sse_event("error", {"error": error_chunk.content})
+                    yield encode_sse_event("end", {"usage": None, "timing": None})
+                else:
+                    yield encode_sse(error_chunk)
+                    yield SSE_DONE
+            finally:
+                await events.aclose()
+                await chunks.aclose()
         
         return StreamingResponse(
             generate_stream(),
@@ -143,9 +256,22 @@ async def chat_stream(
                 "Cache-Control": "no-cache",
                 "Connection": "keep-alive",
                 "X-Accel-Buffering": "no",  # Disable nginx buffering
+                "X-Stream-Format": stream_format,
             }
         )
         
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    except NoBackendAvailableError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
     except Exception as e:
         logger.error(f"Error in chat streaming: {e}")
         raise HTTPException(
@@ -154,15 +280,155 @@ async def chat_stream(
         )
 
 
+@router.websocket("/chat/ws")
+async def chat_websocket(websocket: WebSocket):
+    """Multiplex many chat streams over one WebSocket.
+    
+    Streams share the ``ChatService`` generation path with ``/chat/stream``;
+    see ``ChatMultiplexer`` for the frame protocol.
+    """
+    await websocket.accept()
+    multiplexer = ChatMultiplexer(
+        websocket,
+        chat_service,
+        initial_credits=settings.ws_initial_credits,
+        max_streams=settings.ws_max_streams,
+        credit_timeout=settings.ws_credit_timeout
+    )
+    await multiplexer.run()
+
+
+def _parse_batch(body: bytes, content_type: str) -> List[ChatRequest]:
+    """Parse a batch body: a JSON array of chat requests, or one request per NDJSON line."""
+    try:
+        if "ndjson" in content_type or not body.lstrip().startswith(b"["):
+            items = [orjson.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            items = orjson.loads(body)
+    except orjson.JSONDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid batch body: {e}")
+    if not items:
+        raise HTTPException(status_code=400, detail="Batch is empty")
+    if len(items) > settings.batch_max_items:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch has {len(items)} requests, the limit is {settings.batch_max_items}"
+        )
+    requests = []
+    for index, item in enumerate(items):
+        try:
+            requests.append(ChatRequest.model_validate(item))
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail=f"Invalid request at index {index}: {e}")
+    return requests
+
+
+class _ClaimedBatchResponse(StreamingResponse):
+    """Streaming response that gives back its batch claim however the response ends.
+    
+    Releasing from the body iterator alone would leak the claim when the
+    body is never started, leaving the batch busy for good.
+    """
+    
+    def __init__(self, batch, content: AsyncIterator[bytes], **kwargs):
+        super().__init__(content, **kwargs)
+        self.batch = batch
+    
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            chat_service.batches.release(self.batch)
+
+
+def _stream_batch(batch_id: str) -> StreamingResponse:
+    """Claim a batch and stream its results as NDJSON."""
+    try:
+        batch = chat_service.batches.acquire(batch_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired batch: {batch_id}")
+    except BatchBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    async def generate_results():
+        async for record in chat_service.batches.stream(batch):
+            yield orjson.dumps(record) + b"\n"
+    
+    return _ClaimedBatchResponse(
+        batch,
+        generate_results(),
+        media_type="application/x-ndjson",
+        headers={"X-Batch-ID": batch_id, "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/chat/batch")
+async def chat_batch(
+    http_request: Request,
+    batch_id: Optional[str] = Query(None, description="Optional ID for the new batch")
+):
+    """Run a batch of independent chat requests, streaming NDJSON results as they finish.
+    
+    The body is a JSON array of chat requests or NDJSON with one request per
+    line. Each result carries the request's ``index``; results arrive in
+    completion order and a ``done`` summary comes last.
+    """
+    requests = _parse_batch(await http_request.body(), http_request.headers.get("content-type", ""))
+    try:
+        batch_id = chat_service.batches.create(requests, batch_id)
+    except BatchBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    logger.info(f"Accepted batch {batch_id} with {len(requests)} requests")
+    return _stream_batch(batch_id)
+
+
+@router.get("/chat/batch/{batch_id}")
+async def resume_chat_batch(batch_id: str):
+    """Resume a batch: replay completed results, then run and stream the rest."""
+    return _stream_batch(batch_id)
+
+
+@router.get("/conversations/stats")
+async def conversation_stats():
+    """Get conversation store size and eviction counters."""
+    return chat_service.conversation_stats()
+
+
+@router.get("/conversations/export")
+async def export_conversations(
+    gzip: bool = Query(False, description="Gzip the export stream")
+):
+    """Stream every stored conversation as NDJSON, one conversation per line."""
+    if gzip:
+        return StreamingResponse(
+            gzip_stream(chat_service.export_conversations()),
+            media_type="application/gzip",
+            headers={"Content-Disposition": 'attachment; filename="conversations.ndjson.gz"'}
+        )
+    return StreamingResponse(
+        chat_service.export_conversations(),
+        media_type="application/x-ndjson"
+    )
+
+
 @router.get("/conversation/{conversation_id}")
-async def get_conversation_history(conversation_id: str):
-    """Get conversation history by ID."""
+async def get_conversation_history(
+    conversation_id: str,
+    cursor: Optional[str] = Query(None, description="Cursor returned as next_cursor by the previous page"),
+    limit: int = Query(0, ge=0, le=1000, description="Maximum messages per page (0 returns all)")
+):
+    """Get conversation history by ID, optionally one page at a time."""
+    try:
+        position = int(cursor) if cursor else 0
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {cursor}")
     try:
-        history = chat_service.get_conversation_history(conversation_id)
+        messages, next_cursor = await chat_service.get_conversation_page(conversation_id, position, limit)
         return {
             "conversation_id": conversation_id,
-            "message_count": len(history),
-            "messages": history
+            "message_count": len(chat_service.get_conversation_history(conversation_id)),
+            "messages": messages,
+            "next_cursor": str(next_cursor) if next_cursor is not None else None
         }
     except Exception as e:
         logger.error(f"Error retrieving conversation: {e}")
@@ -176,7 +442,7 @@ async def get_conversation_history(conversation_id: str):
 async def clear_conversation_history(conversation_id: str):
     """Clear conversation history by ID."""
     try:
-        success = chat_service.clear_conversation(conversation_id)
+        success = await chat_service.clear_conversation(conversation_id)
         if not success:
             raise HTTPException(
                 status_code=404,
@@ -1,7 +1,7 @@
 """Configuration management for the chatbot API."""
 
 import os
-from typing import List
+from typing import Dict, List
 from pydantic import Field
 from pydantic_settings import BaseSettings
 
@@ -12,10 +12,81 @@ class Settings(BaseSettings):
     # Ollama Configuration
     ollama_model: str = Field(default="qwen3:1.7b", alias="OLLAMA_MODEL")
     ollama_base_url: str = Field(default="http://localhost:11434", alias="OLLAMA_BASE_URL")
+    ollama_probe_interval: float = Field(default=15.0, alias="OLLAMA_PROBE_INTERVAL")
+    ollama_probe_jitter: float = Field(default=0.2, alias="OLLAMA_PROBE_JITTER")
+    ollama_connect_timeout: float = Field(default=5.0, alias="OLLAMA_CONNECT_TIMEOUT")
+    ollama_reuse_context: bool = Field(default=True, alias="OLLAMA_REUSE_CONTEXT")
+    context_cache_size: int = Field(default=256, alias="CONTEXT_CACHE_SIZE")
+    single_flight_enabled: bool = Field(default=True, alias="SINGLE_FLIGHT_ENABLED")
+    
+    # Model Residency Configuration
+    ollama_keep_alive: str = Field(default="30m", alias="OLLAMA_KEEP_ALIVE")
+    ollama_preload: bool = Field(default=True, alias="OLLAMA_PRELOAD")
+    ollama_preload_models: str = Field(default="", alias="OLLAMA_PRELOAD_MODELS")
+    residency_poll_interval: float = Field(default=10.0, alias="RESIDENCY_POLL_INTERVAL")
+    prefer_resident_model: bool = Field(default=False, alias="PREFER_RESIDENT_MODEL")
+    
+    # Circuit Breaker and Hedging Configuration
+    circuit_failure_threshold: int = Field(default=5, alias="CIRCUIT_FAILURE_THRESHOLD")
+    circuit_reset_timeout: float = Field(default=30.0, alias="CIRCUIT_RESET_TIMEOUT")
+    circuit_slow_ttft: float = Field(default=20.0, alias="CIRCUIT_SLOW_TTFT")
+    ollama_hedge_enabled: bool = Field(default=False, alias="OLLAMA_HEDGE_ENABLED")
+    ollama_hedge_percentile: float = Field(default=95.0, alias="OLLAMA_HEDGE_PERCENTILE")
+    ollama_hedge_min_samples: int = Field(default=20, alias="OLLAMA_HEDGE_MIN_SAMPLES")
+    ollama_hedge_min_delay: float = Field(default=0.25, alias="OLLAMA_HEDGE_MIN_DELAY")
+    
+    # Conversation Store Configuration
+    conversation_max_bytes: int = Field(default=64 * 1024 * 1024, alias="CONVERSATION_MAX_BYTES")
+    conversation_idle_ttl: float = Field(default=86400.0, alias="CONVERSATION_IDLE_TTL")
+    conversation_max_messages: int = Field(default=50, alias="CONVERSATION_MAX_MESSAGES")
+    conversation_backend: str = Field(default="memory", alias="CONVERSATION_BACKEND")
+    conversation_db_path: str = Field(default="data/conversations.db", alias="CONVERSATION_DB_PATH")
+    conversation_flush_interval_ms: float = Field(default=50.0, alias="CONVERSATION_FLUSH_INTERVAL_MS")
+    conversation_flush_batch: int = Field(default=256, alias="CONVERSATION_FLUSH_BATCH")
+    
+    # Context Window Configuration
+    context_token_budget: int = Field(default=4096, alias="CONTEXT_TOKEN_BUDGET")
+    context_reserve_tokens: int = Field(default=512, alias="CONTEXT_RESERVE_TOKENS")
+    context_max_message_tokens: int = Field(default=0, alias="CONTEXT_MAX_MESSAGE_TOKENS")
+    prompt_cache_size: int = Field(default=1024, alias="PROMPT_CACHE_SIZE")
+    
+    # Streaming Configuration
+    stream_flush_interval_ms: float = Field(default=20.0, alias="STREAM_FLUSH_INTERVAL_MS")
+    stream_flush_bytes: int = Field(default=512, alias="STREAM_FLUSH_BYTES")
+    stream_disconnect_poll_interval: float = Field(default=0.25, alias="STREAM_DISCONNECT_POLL_INTERVAL")
+    ws_initial_credits: int = Field(default=64, alias="WS_INITIAL_CREDITS")
+    ws_max_streams: int = Field(default=16, alias="WS_MAX_STREAMS")
+    ws_credit_timeout: float = Field(default=30.0, alias="WS_CREDIT_TIMEOUT")
+    
+    # Admission Control Configuration
+    admission_max_concurrency: int = Field(default=4, alias="ADMISSION_MAX_CONCURRENCY")
+    admission_max_queue: int = Field(default=32, alias="ADMISSION_MAX_QUEUE")
+    admission_model_limits: Dict[str, int] = Field(default={}, alias="ADMISSION_MODEL_LIMITS")
+    
+    # Batch Configuration
+    batch_concurrency: int = Field(default=2, alias="BATCH_CONCURRENCY")
+    batch_max_items: int = Field(default=10000, alias="BATCH_MAX_ITEMS")
+    batch_max_batches: int = Field(default=100, alias="BATCH_MAX_BATCHES")
+    batch_retention: float = Field(default=86400.0, alias="BATCH_RETENTION")
+    
+    # Response Cache Configuration
+    response_cache_max_entries: int = Field(default=1024, alias="RESPONSE_CACHE_MAX_ENTRIES")
+    response_cache_max_bytes: int = Field(default=16 * 1024 * 1024, alias="RESPONSE_CACHE_MAX_BYTES")
+    response_cache_ttl: float = Field(default=3600.0, alias="RESPONSE_CACHE_TTL")
+    
+    # Semantic Cache Configuration
+    semantic_cache_enabled: bool = Field(default=False, alias="SEMANTIC_CACHE_ENABLED")
+    semantic_cache_embed_model: str = Field(default="nomic-embed-text", alias="SEMANTIC_CACHE_EMBED_MODEL")
+    semantic_cache_threshold: float = Field(default=0.92, alias="SEMANTIC_CACHE_THRESHOLD")
+    semantic_cache_capacity: int = Field(default=4096, alias="SEMANTIC_CACHE_CAPACITY")
+    semantic_cache_path: str = Field(default="data/semantic_cache.npz", alias="SEMANTIC_CACHE_PATH")
+    semantic_cache_save_every: int = Field(default=50, alias="SEMANTIC_CACHE_SAVE_EVERY")
     
     # API Configuration
     api_host: str = Field(default="0.0.0.0", alias="API_HOST")
     api_port: int = Field(default=8000, alias="API_PORT")
+    api_workers: int = Field(default=1, alias="API_WORKERS")
+    worker_start_timeout: float = Field(default=60.0, alias="WORKER_START_TIMEOUT")
     api_title: str = Field(default="Chatbot API", alias="API_TITLE")
     api_version: str = Field(default="1.0.0", alias="API_VERSION")
     api_description: str = Field(
@@ -32,6 +103,20 @@ class Settings(BaseSettings):
     allowed_methods: List[str] = Field(default=["*"], alias="ALLOWED_METHODS")
     allowed_headers: List[str] = Field(default=["*"], alias="ALLOWED_HEADERS")
     
+    @staticmethod
+    def parse_base_urls(value: str) -> List[str]:
+        """Split a comma-separated list of Ollama base URLs."""
+        return [url.strip().rstrip("/") for url in value.split(",") if url.strip()]
+    
+    def preload_models(self) -> List[str]:
+        """Models to keep warm: the default model plus OLLAMA_PRELOAD_MODELS."""
+        models = [self.ollama_model]
+        for model in self.ollama_preload_models.split(","):
+            model = model.strip()
+            if model and model not in models:
+                models.append(model)
+        return models
+    
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
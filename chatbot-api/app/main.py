@@ -4,11 +4,13 @@ import logging
 import sys
 import os
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from app.config import settings
-from app.api.routes import router
+from app.api.routes import router, chat_service
+from app.services.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from app.services.timing import RequestArrivalMiddleware
 
 
 # Configure logging
@@ -30,8 +32,12 @@ async def lifespan(app: FastAPI):
     logger.info(f"Environment OLLAMA_MODEL: {os.getenv('OLLAMA_MODEL', 'Not set')}")
     logger.info(f"Using Ollama model: {settings.ollama_model}")
     logger.info(f"Ollama base URL: {settings.ollama_base_url}")
+    # Router-level startup/shutdown events are ignored when a lifespan is set,
+    # so the chat service (and its backend probes) is managed here.
+    await chat_service.__aenter__()
     yield
     logger.info("Shutting down Chatbot API service...")
+    await chat_service.__aexit__(None, None, None)
 
 
 # Create FastAPI application
@@ -57,6 +63,9 @@ app.add_middleware(
 # Add trusted host middleware for security
 app.add_middleware(TrustedHostMiddleware, allowed_hosts=["*"])
 
+# Outermost, so request timings include body parsing and the other middleware
+app.add_middleware(RequestArrivalMiddleware)
+
 # Include API routes
 app.include_router(router, prefix="/api/v1")
 
@@ -73,15 +82,33 @@ async def root():
         "health": "/api/v1/health"
     }
 
+# Prometheus scrape endpoint
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Latency histograms, load gauges and error counters in Prometheus text format."""
+    return Response(chat_service.render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
 
 if __name__ == "__main__":
     import uvicorn
     
     logger.info(f"Starting server on {settings.api_host}:{settings.api_port}")
-    uvicorn.run(
-        "app.main:app",
-        host=settings.api_host,
-        port=settings.api_port,
-        reload=False,
-        log_level=settings.log_level.lower()
-    ) 
\ No newline at end of file
+    if settings.api_workers > 1:
+        # Route each conversation to the worker process that owns its history
+        from app.supervisor import run
+        
+        run(
+            settings.api_workers,
+            host=settings.api_host,
+            port=settings.api_port,
+            log_level=settings.log_level.lower(),
+            start_timeout=settings.worker_start_timeout
+        )
+    else:
+        uvicorn.run(
+            "app.main:app",
+            host=settings.api_host,
+            port=settings.api_port,
+            reload=False,
+            log_level=settings.log_level.lower()
+        ) 
\ No newline at end of file
@@ -1,7 +1,7 @@
 """Data models for the chatbot API."""
 
 from typing import List, Optional, Dict, Any
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
 
 class ChatMessage(BaseModel):
@@ -10,6 +10,15 @@ class ChatMessage(BaseModel):
     role: str = Field(..., description="The role of the message sender (user, assistant, system)")
     content: str = Field(..., description="The content of the message")
     timestamp: Optional[str] = Field(None, description="Timestamp of the message")
+    truncated: bool = Field(
+        default=False,
+        description="Whether generation was cut short (e.g. the client disconnected)"
+    )
+
+    # Digest of the transcript up to and including this message (server-side only)
+    _digest: Optional[str] = PrivateAttr(default=None)
+    # Cached token estimate used by the context window manager
+    _token_count: Optional[int] = PrivateAttr(default=None)
 
 
 class ChatRequest(BaseModel):
@@ -24,6 +33,45 @@ class ChatRequest(BaseModel):
     max_tokens: Optional[int] = Field(None, description="Maximum tokens to generate")
     temperature: Optional[float] = Field(0.7, description="Sampling temperature")
     stream: bool = Field(True, description="Whether to stream the response")
+    cache: Optional[bool] = Field(
+        None,
+        description="Use the response cache (defaults to on only when temperature is 0)"
+    )
+
+
+class Usage(BaseModel):
+    """Token usage for one generation, from Ollama's evaluation counters.
+    
+    Counts are None when the response was served from cache.
+    """
+    
+    prompt_tokens: Optional[int] = Field(None, description="Prompt tokens evaluated")
+    completion_tokens: Optional[int] = Field(None, description="Tokens generated")
+    total_tokens: Optional[int] = Field(None, description="Prompt plus generated tokens")
+    cached: bool = Field(default=False, description="Whether the response came from a cache")
+    load_ms: Optional[float] = Field(None, description="Time Ollama spent loading the model")
+    prompt_eval_ms: Optional[float] = Field(None, description="Time Ollama spent on prompt prefill")
+    eval_ms: Optional[float] = Field(None, description="Time Ollama spent generating tokens")
+    tokens_per_second: Optional[float] = Field(None, description="Generation speed (completion_tokens / eval_ms)")
+
+
+class Timing(BaseModel):
+    """Server-side duration of each request stage, in milliseconds.
+    
+    Each stage runs from the end of the previous one. Stages that didn't
+    happen are None. Non-streaming responses have no ``connect`` or
+    ``first_token`` stage; ``last_token_ms`` then covers the whole Ollama call.
+    A semantic cache hit never queues, so its lookup is counted in ``prompt_ms``.
+    """
+    
+    parse_ms: Optional[float] = Field(None, description="Reading and validating the request")
+    history_ms: Optional[float] = Field(None, description="Loading the conversation history")
+    queue_ms: Optional[float] = Field(None, description="Semantic cache lookup and waiting for a generation slot")
+    prompt_ms: Optional[float] = Field(None, description="Context cache lookup, context fitting and prompt serialization")
+    connect_ms: Optional[float] = Field(None, description="Until Ollama started its response")
+    first_token_ms: Optional[float] = Field(None, description="Until the first token (model load and prompt prefill)")
+    last_token_ms: Optional[float] = Field(None, description="From the first token to the last")
+    total_ms: float = Field(..., description="From arrival to the last token")
 
 
 class ChatResponse(BaseModel):
@@ -33,6 +81,27 @@ class ChatResponse(BaseModel):
     role: str = Field(default="assistant", description="The role of the responder")
     model: str = Field(..., description="The model used for generation")
     conversation_id: Optional[str] = Field(None, description="Unique conversation identifier")
+    usage: Optional[Usage] = Field(None, description="Token usage from Ollama's eval counters")
+    timing: Optional[Timing] = Field(None, description="Server-side stage timings")
+
+
+class GenerationResult(BaseModel):
+    """Complete generation returned by Ollama, with its evaluation statistics.
+    
+    Durations are in nanoseconds, as reported by Ollama. Statistics are None
+    when the response was served from cache or the request failed.
+    """
+    
+    content: str = Field(..., description="The generated text")
+    model: str = Field(..., description="The model used for generation")
+    cached: bool = Field(default=False, description="Whether the response came from the response cache")
+    error: Optional[str] = Field(None, description="Why generation failed (content then holds the error text)")
+    prompt_eval_count: Optional[int] = Field(None, description="Prompt tokens evaluated")
+    eval_count: Optional[int] = Field(None, description="Tokens generated")
+    total_duration: Optional[int] = Field(None, description="Total request time")
+    load_duration: Optional[int] = Field(None, description="Time spent loading the model")
+    prompt_eval_duration: Optional[int] = Field(None, description="Time spent evaluating the prompt")
+    eval_duration: Optional[int] = Field(None, description="Time spent generating tokens")
 
 
 class StreamChunk(BaseModel):
@@ -41,6 +110,12 @@ class StreamChunk(BaseModel):
     content: str = Field(..., description="The content chunk")
     is_complete: bool = Field(default=False, description="Whether this is the final chunk")
     model: str = Field(..., description="The model used for generation")
+    queue_position: Optional[int] = Field(
+        None,
+        description="Position in the model's wait queue (sent before generation starts)"
+    )
+    usage: Optional[Usage] = Field(None, description="Token usage (final chunk only)")
+    timing: Optional[Timing] = Field(None, description="Stage timings (final chunk only)")
 
 
 class ErrorResponse(BaseModel):
@@ -57,4 +132,9 @@ class HealthResponse(BaseModel):
     status: str = Field(..., description="Health status")
     version: str = Field(..., description="API version")
     model: str = Field(..., description="Current Ollama model")
-    timestamp: str = Field(..., description="Health check timestamp") 
\ No newline at end of file
+    timestamp: str = Field(..., description="Health check timestamp")
+    upstream_checked_at: Optional[str] = Field(
+        None,
+        description="When Ollama was last probed (the status is served from that snapshot)"
+    )
+    upstream_age_seconds: Optional[float] = Field(None, description="Age of the upstream snapshot") 
\ No newline at end of file
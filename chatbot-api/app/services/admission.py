@@ -0,0 +1,254 @@
+"""Per-model admission control with a bounded wait queue."""
+
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    """Raised when a model's wait queue is full."""
+
+    def __init__(self, model: str, retry_after: int):
+        """Initialize the rejection.
+
+        Args:
+            model: Model whose queue overflowed
+            retry_after: Suggested seconds before retrying
+        """
+        super().__init__(f"Too many requests for model {model}")
+        self.model = model
+        self.retry_after = retry_after
+
+
+class _ModelGate:
+    """Concurrency slots and FIFO wait queues for a single model.
+
+    Batch work waits in its own queue and only gets a slot when no
+    interactive request is waiting. With several slots it never holds all
+    of them; with a single slot it only starts while the model is idle.
+    Either way an interactive request waits behind at most one batch item,
+    never a whole batch.
+    """
+
+    def __init__(self, limit: int, max_queue: int):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.active = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+        self.batch_active = 0
+        # Slots batch work may hold while interactive requests are running
+        self.batch_limit = limit - 1
+        self.batch_waiters: Deque[asyncio.Future] = deque()
+        # Exponentially weighted average generation time, used for Retry-After
+        self.avg_service_time = 1.0
+
+    def batch_may_start(self) -> bool:
+        """Whether a batch item may take a free slot."""
+        return self.batch_active < self.batch_limit or self.active == 0
+
+    def retry_after(self) -> int:
+        """Estimate how long until a new request could be admitted."""
+        estimate = self.avg_service_time * (len(self.waiters) + 1) / self.limit
+        return max(1, min(60, math.ceil(estimate)))
+
+    def release(self, service_time: float, batch: bool = False) -> None:
+        """Free a slot and hand it to the next live waiter, interactive first."""
+        self.avg_service_time = 0.8 * self.avg_service_time + 0.2 * service_time
+        self.active -= 1
+        if batch:
+            self.batch_active -= 1
+        self.dispatch()
+
+    def dispatch(self) -> None:
+        """Hand free slots to waiting requests."""
+        while self.active < self.limit:
+            waiter = self._next_live(self.waiters)
+            batch = False
+            if waiter is None and self.batch_may_start():
+                waiter = self._next_live(self.batch_waiters)
+                batch = True
+            if waiter is None:
+                return
+            self.active += 1
+            if batch:
+                self.batch_active += 1
+            waiter.set_result(None)
+
+    @staticmethod
+    def _next_live(waiters: Deque[asyncio.Future]) -> Optional[asyncio.Future]:
+        """Pop the first waiter that hasn't been cancelled."""
+        while waiters:
+            waiter = waiters.popleft()
+            if not waiter.done():
+                return waiter
+        return None
+
+
+class AdmissionTicket:
+    """A request's place in a model's admission queue."""
+
+    def __init__(
+        self,
+        gate: _ModelGate,
+        waiter: Optional[asyncio.Future],
+        position: int,
+        batch: bool = False
+    ):
+        """Initialize the ticket.
+
+        Args:
+            gate: Gate the ticket belongs to
+            waiter: Future resolved when a slot is handed over (None if admitted)
+            position: 1-based queue position, or 0 if admitted immediately
+            batch: Whether the ticket is for low-priority batch work
+        """
+        self.position = position
+        self.batch = batch
+        self._gate = gate
+        self._waiter = waiter
+        self._admitted = waiter is None
+        self._released = False
+        self._started_at = time.monotonic()
+
+    async def wait(self) -> None:
+        """Wait until the request holds a concurrency slot."""
+        if self._admitted:
+            return
+        try:
+            await self._waiter
+        except asyncio.CancelledError:
+            # The slot may have been handed over just before cancellation
+            if self._waiter.done() and not self._waiter.cancelled():
+                self._admitted = True
+            self.release()
+            raise
+        self._admitted = True
+        self._started_at = time.monotonic()
+
+    def release(self) -> None:
+        """Give the slot back, or leave the queue if still waiting."""
+        if self._released:
+            return
+        self._released = True
+        # A slot handed over before wait() ran is held all the same
+        if not self._admitted and self._waiter.done() and not self._waiter.cancelled():
+            self._admitted = True
+        if self._admitted:
+            self._gate.release(time.monotonic() - self._started_at, self.batch)
+        else:
+            self._waiter.cancel()
+            try:
+                (self._gate.batch_waiters if self.batch else self._gate.waiters).remove(self._waiter)
+            except ValueError:
+                pass
+
+
+class AdmissionController:
+    """Limits concurrent generations per model and sheds overflow."""
+
+    def __init__(
+        self,
+        max_concurrency: int = 4,
+        max_queue: int = 32,
+        model_limits: Optional[Dict[str, int]] = None
+    ):
+        """Initialize the admission controller.
+
+        Args:
+            max_concurrency: Default concurrent generations per model (0 disables)
+            max_queue: Maximum queued requests per model
+            model_limits: Per-model overrides of ``max_concurrency``
+        """
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.model_limits = model_limits or {}
+        self._gates: Dict[str, _ModelGate] = {}
+
+    @property
+    def enabled(self) -> bool:
+        """Whether admission control limits anything."""
+        return self.max_concurrency > 0 or bool(self.model_limits)
+
+    def _gate(self, model: str) -> Optional[_ModelGate]:
+        """Get (or create) the gate for a model, or None if unlimited."""
+        gate = self._gates.get(model)
+        if gate is None:
+            limit = self.model_limits.get(model, self.max_concurrency)
+            if limit <= 0:
+                return None
+            gate = _ModelGate(limit, self.max_queue)
+            self._gates[model] = gate
+        return gate
+
+    def check(self, model: str) -> None:
+        """Reject early if a new request for a model would overflow its queue.
+
+        Args:
+            model: Model the request will run on
+
+        Raises:
+            AdmissionRejected: If the model's queue is full
+        """
+        gate = self._gate(model)
+        if gate is None:
+            return
+        if gate.active >= gate.limit and len(gate.waiters) >= gate.max_queue:
+            raise AdmissionRejected(model, gate.retry_after())
+
+    def enter(self, model: str, batch: bool = False) -> AdmissionTicket:
+        """Take a slot for a model, or a place in its wait queue.
+
+        Args:
+            model: Model the request will run on
+            batch: Queue as low-priority batch work, which is never shed
+
+        Returns:
+            Ticket to ``wait()`` on and ``release()`` when done
+
+        Raises:
+            AdmissionRejected: If the model's queue is full
+        """
+        gate = self._gate(model)
+        if gate is None:
+            return AdmissionTicket(_ModelGate(1, 0), None, 0, batch)
+        if batch:
+            if gate.active < gate.limit and gate.batch_may_start() and not gate.waiters:
+                gate.active += 1
+                gate.batch_active += 1
+                return AdmissionTicket(gate, None, 0, batch=True)
+            waiter = asyncio.get_running_loop().create_future()
+            gate.batch_waiters.append(waiter)
+            return AdmissionTicket(gate, waiter, len(gate.batch_waiters), batch=True)
+        if gate.active < gate.limit and not gate.waiters:
+            gate.active += 1
+            return AdmissionTicket(gate, None, 0)
+        if len(gate.waiters) >= gate.max_queue:
+            logger.warning(f"Admission queue full for model {model}, shedding request")
+            raise AdmissionRejected(model, gate.retry_after())
+        waiter = asyncio.get_running_loop().create_future()
+        gate.waiters.append(waiter)
+        return AdmissionTicket(gate, waiter, len(gate.waiters))
+
+    def stats(self) -> Dict[str, Any]:
+        """Return per-model active and queued request counts.
+
+        Returns:
+            Dictionary keyed by model name
+        """
+        return {
+            model: {
+                "active": gate.active,
+                "queued": len(gate.waiters),
+                "batch_active": gate.batch_active,
+                "batch_queued": len(gate.batch_waiters),
+                "limit": gate.limit,
+                "max_queue": gate.max_queue,
+            }
+            for model, gate in self._gates.items()
+        }
@@ -0,0 +1,224 @@
+"""Batch chat jobs: bounded-concurrency scheduling, completion-order results and resume."""
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, List, Optional
+from app.models import ChatRequest, GenerationResult
+
+
+logger = logging.getLogger(__name__)
+
+
+class BatchBusy(Exception):
+    """Raised when a batch is already being streamed to another client."""
+
+
+class _Batch:
+    """A submitted batch and the results completed so far."""
+
+    __slots__ = ("batch_id", "requests", "results", "running", "last_access")
+
+    def __init__(self, batch_id: str, requests: List[ChatRequest]):
+        self.batch_id = batch_id
+        self.requests = requests
+        # Successful results by request index; failed items are retried on resume
+        self.results: Dict[int, Dict[str, Any]] = {}
+        self.running = False
+        self.last_access = time.monotonic()
+
+    def pending(self) -> List[int]:
+        """Indexes of requests without a successful result."""
+        return [index for index in range(len(self.requests)) if index not in self.results]
+
+
+class BatchManager:
+    """Runs batches of independent chat requests and keeps their results for resuming.
+
+    Each batch runs while a client is streaming its results. If the client
+    goes away, in-flight items are cancelled (stopping their generations)
+    and the batch can be resumed later by ID: completed results are replayed
+    and only the remaining items are run.
+    """
+
+    def __init__(
+        self,
+        run_item: Callable[[ChatRequest], Awaitable[GenerationResult]],
+        concurrency: int = 2,
+        max_batches: int = 100,
+        retention: float = 86400.0
+    ):
+        """Initialize the batch manager.
+
+        Args:
+            run_item: Generates the response for one request
+            concurrency: Items of one batch generated at the same time
+            max_batches: Batches kept for resuming; the least recently used is dropped
+            retention: Seconds an idle batch is kept for resuming
+        """
+        self.run_item = run_item
+        self.concurrency = max(1, concurrency)
+        self.max_batches = max_batches
+        self.retention = retention
+        self._batches: "OrderedDict[str, _Batch]" = OrderedDict()
+
+    def create(self, requests: List[ChatRequest], batch_id: Optional[str] = None) -> str:
+        """Register a new batch.
+
+        Args:
+            requests: Requests in submission order
+            batch_id: ID chosen by the caller (generated if not given)
+
+        Returns:
+            Batch ID
+
+        Raises:
+            BatchBusy: If a batch with the given ID already exists
+        """
+        self._expire()
+        batch_id = batch_id or str(uuid.uuid4())
+        if batch_id in self._batches:
+            raise BatchBusy(f"Batch {batch_id} already exists")
+        self._batches[batch_id] = _Batch(batch_id, requests)
+        while len(self._batches) > self.max_batches:
+            dropped, batch = next(iter(self._batches.items()))
+            if batch.running:
+                break
+            del self._batches[dropped]
+        return batch_id
+
+    def get(self, batch_id: str) -> Optional[_Batch]:
+        """Look up a batch, marking it as recently used.
+
+        Args:
+            batch_id: Batch ID
+
+        Returns:
+            The batch, or None if unknown or expired
+        """
+        self._expire()
+        batch = self._batches.get(batch_id)
+        if batch is not None:
+            batch.last_access = time.monotonic()
+            self._batches.move_to_end(batch_id)
+        return batch
+
+    def acquire(self, batch_id: str) -> _Batch:
+        """Claim a batch for one client to stream.
+
+        Claiming happens before the response starts, so two concurrent
+        requests for the same batch can't both pass the busy check.
+
+        Args:
+            batch_id: Batch ID
+
+        Returns:
+            The batch, marked as running until ``release`` is called
+
+        Raises:
+            KeyError: If the batch is unknown or expired
+            BatchBusy: If the batch is already being streamed
+        """
+        batch = self.get(batch_id)
+        if batch is None:
+            raise KeyError(batch_id)
+        if batch.running:
+            raise BatchBusy(f"Batch {batch_id} is already running")
+        batch.running = True
+        return batch
+
+    def release(self, batch: _Batch) -> None:
+        """Give back a claim taken with ``acquire`` so the batch can be resumed.
+
+        Call it however the response ends, including when its body was never
+        started (e.g. the client left before the response began).
+
+        Args:
+            batch: Claimed batch
+        """
+        batch.running = False
+        batch.last_access = time.monotonic()
+
+    def _expire(self) -> None:
+        """Drop idle batches past the retention period."""
+        if self.retention <= 0:
+            return
+        cutoff = time.monotonic() - self.retention
+        for batch_id, batch in list(self._batches.items()):
+            if batch.last_access >= cutoff:
+                break
+            if not batch.running:
+                del self._batches[batch_id]
+
+    async def stream(self, batch: _Batch) -> AsyncGenerator[Dict[str, Any], None]:
+        """Run a batch's remaining items and yield results as they complete.
+
+        Results already completed by an earlier run are yielded first. A
+        summary record with ``done: true`` comes last. The caller keeps the
+        claim and releases it once the response is over.
+
+        Args:
+            batch: Batch claimed with ``acquire``
+
+        Yields:
+            Result records with the request ``index``, in completion order
+        """
+        batch_id = batch.batch_id
+        pending = batch.pending()
+        queue: asyncio.Queue = asyncio.Queue()
+        todo = iter(pending)
+        failed = 0
+
+        async def worker():
+            for index in todo:
+                queue.put_nowait(await self._run(batch, index))
+
+        workers = [asyncio.create_task(worker()) for _ in range(min(self.concurrency, len(pending)))]
+        try:
+            for index in sorted(batch.results):
+                yield batch.results[index]
+            if pending:
+                logger.info(f"Running {len(pending)} of {len(batch.requests)} items in batch {batch_id}")
+            for _ in pending:
+                record = await queue.get()
+                if record["status"] != "ok":
+                    failed += 1
+                yield record
+            yield {
+                "batch_id": batch_id,
+                "done": True,
+                "total": len(batch.requests),
+                "completed": len(batch.results),
+                "failed": failed,
+            }
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            batch.last_access = time.monotonic()
+
+    async def _run(self, batch: _Batch, index: int) -> Dict[str, Any]:
+        """Run one item, recording it if it succeeded."""
+        try:
+            result = await self.run_item(batch.requests[index])
+        except Exception as e:
+            logger.error(f"Batch {batch.batch_id} item {index} failed: {e}")
+            return {"index": index, "status": "error", "error": str(e)}
+        if result.error is not None:
+            return {"index": index, "status": "error", "error": result.error, "model": result.model}
+        record = {"index": index, "status": "ok", "message": result.content, "model": result.model}
+        batch.results[index] = record
+        return record
+
+    def stats(self) -> Dict[str, Any]:
+        """Return retained and running batch counts.
+
+        Returns:
+            Dictionary of batch counters
+        """
+        return {
+            "batches": len(self._batches),
+            "running": sum(1 for batch in self._batches.values() if batch.running),
+        }
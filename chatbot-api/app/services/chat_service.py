@@ -1,32 +1,110 @@
 """Chat service for managing conversations and generating responses."""
 
+import asyncio
+import time
 import uuid
 import logging
-from datetime import datetime
-from typing import AsyncGenerator, Dict, List, Optional
-from app.models import ChatMessage, ChatRequest, ChatResponse, StreamChunk
+import orjson
+from typing import Any, AsyncGenerator, AsyncIterator, Dict, List, Optional, Sequence, Tuple, Union
+from app.models import ChatMessage, ChatRequest, ChatResponse, GenerationResult, StreamChunk, Usage
+from app.services.admission import AdmissionController, AdmissionRejected, AdmissionTicket
+from app.services.batch import BatchManager
+from app.services.context_window import ContextWindowManager
+from app.services.context_cache import ContextCache, chain_digest, transcript_digest
+from app.services.conversation_store import ConversationStore
+from app.services.message_ring import MessageRecord
+from app.services.metrics import metrics
+from app.services.sqlite_store import SQLiteConversationStore
+from app.services.timing import StageTimer
 from app.services.ollama_service import OllamaService
+from app.services.response_cache import ResponseCache
+from app.services.semantic_cache import SemanticCache
+from app.services.prompt_builder import PromptPrefixCache
+from app.services.single_flight import SingleFlight
 from app.config import settings
 
 
 logger = logging.getLogger(__name__)
 
+# Bytes of NDJSON buffered before an export chunk is sent
+EXPORT_CHUNK_BYTES = 64 * 1024
+
 
 class ChatService:
     """High-level service for managing chat conversations."""
     
     def __init__(self):
         """Initialize the chat service."""
-        self.conversations: Dict[str, List[ChatMessage]] = {}
+        self.conversations = self._create_conversation_store()
         self.ollama_service = OllamaService()
+        self.context_cache = ContextCache(settings.context_cache_size)
+        self.context_window = ContextWindowManager(
+            self.ollama_service,
+            token_budget=settings.context_token_budget,
+            reserve_tokens=settings.context_reserve_tokens,
+            max_message_tokens=settings.context_max_message_tokens
+        )
+        self.prompt_cache = PromptPrefixCache(settings.prompt_cache_size)
+        self.single_flight = SingleFlight()
+        self.admission = AdmissionController(
+            max_concurrency=settings.admission_max_concurrency,
+            max_queue=settings.admission_max_queue,
+            model_limits=settings.admission_model_limits
+        )
+        self.batches = BatchManager(
+            self.generate_batch_item,
+            concurrency=settings.batch_concurrency,
+            max_batches=settings.batch_max_batches,
+            retention=settings.batch_retention
+        )
+        self.semantic_cache: Optional[SemanticCache] = None
+        if settings.semantic_cache_enabled:
+            self.semantic_cache = SemanticCache(
+                capacity=settings.semantic_cache_capacity,
+                threshold=settings.semantic_cache_threshold,
+                path=settings.semantic_cache_path,
+                save_every=settings.semantic_cache_save_every
+            )
+    
+    def _create_conversation_store(self) -> ConversationStore:
+        """Create the configured conversation store backend.
+        
+        Returns:
+            In-memory store, or a SQLite store using memory as a hot cache
+        """
+        options = dict(
+            max_bytes=settings.conversation_max_bytes,
+            idle_ttl=settings.conversation_idle_ttl,
+            max_messages=settings.conversation_max_messages,
+            on_evict=self._on_conversation_evicted
+        )
+        if settings.conversation_backend == "sqlite":
+            return SQLiteConversationStore(
+                settings.conversation_db_path,
+                flush_interval=settings.conversation_flush_interval_ms / 1000,
+                flush_batch=settings.conversation_flush_batch,
+                **options
+            )
+        if settings.conversation_backend != "memory":
+            logger.warning(
+                f"Unknown CONVERSATION_BACKEND {settings.conversation_backend!r}, using memory"
+            )
+        return ConversationStore(**options)
     
     async def __aenter__(self):
         """Async context manager entry."""
+        self.conversations.start()
         await self.ollama_service.__aenter__()
+        if self.semantic_cache is not None:
+            self.semantic_cache.load()
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Async context manager exit."""
+        if self.semantic_cache is not None:
+            await self.semantic_cache.drain()
+            self.semantic_cache.save()
+        self.conversations.close()
         await self.ollama_service.__aexit__(exc_type, exc_val, exc_tb)
     
     def _generate_conversation_id(self) -> str:
@@ -37,29 +115,65 @@ class ChatService:
         """
         return str(uuid.uuid4())
     
-    def _get_current_timestamp(self) -> str:
-        """Get current timestamp as ISO string.
+    def get_conversation_history(self, conversation_id: str) -> Sequence[MessageRecord]:
+        """Get conversation history by ID.
         
+        Args:
+            conversation_id: Unique conversation identifier
+            
         Returns:
-            Current timestamp
+            Stored message records in the conversation, oldest first
         """
-        return datetime.utcnow().isoformat()
+        return self.conversations.get(conversation_id)
     
-    def get_conversation_history(self, conversation_id: str) -> List[ChatMessage]:
-        """Get conversation history by ID.
+    async def get_conversation_page(
+        self,
+        conversation_id: str,
+        cursor: int = 0,
+        limit: int = 0
+    ) -> Tuple[List[ChatMessage], Optional[int]]:
+        """Get a page of conversation history as API messages.
         
         Args:
             conversation_id: Unique conversation identifier
+            cursor: Position of the first message to return
+            limit: Maximum messages to return (0 for all remaining)
             
         Returns:
-            List of chat messages in the conversation
+            Tuple of (chat messages, cursor for the next page or None at the end)
         """
-        return self.conversations.get(conversation_id, [])
+        await self.conversations.load(conversation_id)
+        records, next_cursor = self.conversations.page(conversation_id, cursor, limit)
+        return [record.to_message() for record in records], next_cursor
+    
+    async def export_conversations(self) -> AsyncIterator[bytes]:
+        """Export every stored conversation as NDJSON, one conversation per line.
+        
+        Conversations are read from the store one at a time, so memory use
+        stays flat regardless of how many are stored.
+        
+        Yields:
+            Chunks of NDJSON
+        """
+        buffer = bytearray()
+        async for conversation_id, records in self.conversations.iter_conversations():
+            buffer += orjson.dumps({
+                "conversation_id": conversation_id,
+                "messages": [record.to_dict() for record in records],
+            })
+            buffer += b"\n"
+            if len(buffer) >= EXPORT_CHUNK_BYTES:
+                yield bytes(buffer)
+                buffer.clear()
+                # Let other requests run between chunks of a large export
+                await asyncio.sleep(0)
+        if buffer:
+            yield bytes(buffer)
     
     def add_message_to_conversation(
         self, 
         conversation_id: str, 
-        message: ChatMessage
+        message: Union[MessageRecord, ChatMessage]
     ) -> None:
         """Add a message to a conversation.
         
@@ -67,20 +181,17 @@ class ChatService:
             conversation_id: Unique conversation identifier
             message: Message to add to the conversation
         """
-        if conversation_id not in self.conversations:
-            self.conversations[conversation_id] = []
-        
-        # Set timestamp if not provided
-        if not message.timestamp:
-            message.timestamp = self._get_current_timestamp()
+        if isinstance(message, ChatMessage):
+            message = MessageRecord.from_message(message)
         
-        self.conversations[conversation_id].append(message)
+        # Chain the transcript digest so it survives the store's message cap
+        conversation = self.conversations.get(conversation_id)
+        previous_digest = conversation[-1]._digest if conversation else None
+        message._digest = chain_digest(previous_digest, message.role, message.content)
         
-        # Keep only last 50 messages to prevent memory issues
-        if len(self.conversations[conversation_id]) > 50:
-            self.conversations[conversation_id] = self.conversations[conversation_id][-50:]
+        self.conversations.append(conversation_id, message)
     
-    def clear_conversation(self, conversation_id: str) -> bool:
+    async def clear_conversation(self, conversation_id: str) -> bool:
         """Clear a conversation history.
         
         Args:
@@ -89,10 +200,283 @@ class ChatService:
         Returns:
             True if conversation was cleared, False if not found
         """
-        if conversation_id in self.conversations:
-            del self.conversations[conversation_id]
-            return True
-        return False
+        self.prompt_cache.invalidate(conversation_id)
+        await self.conversations.load(conversation_id)
+        return self.conversations.delete(conversation_id)
+    
+    def _on_conversation_evicted(self, conversation_id: str) -> None:
+        """Drop per-conversation caches when the store evicts a conversation.
+        
+        Args:
+            conversation_id: Evicted conversation identifier
+        """
+        self.prompt_cache.invalidate(conversation_id)
+    
+    def conversation_stats(self) -> Dict[str, Any]:
+        """Get conversation store counters.
+        
+        Returns:
+            Conversation count, approximate memory use and eviction counters
+        """
+        return self.conversations.stats()
+    
+    def resolve_model(self, request: ChatRequest) -> str:
+        """Determine the model a request will run on.
+        
+        With PREFER_RESIDENT_MODEL, requests that don't pin a model go to the
+        default model if it is loaded, otherwise to the first loaded model
+        among the preload list, avoiding a cold model load.
+        
+        Args:
+            request: Chat request
+            
+        Returns:
+            Model name
+        """
+        if request.model:
+            return request.model
+        if settings.prefer_resident_model:
+            residency = self.ollama_service.residency
+            for model in settings.preload_models():
+                if residency.is_resident(model):
+                    return model
+        return settings.ollama_model
+    
+    def check_admission(self, request: ChatRequest) -> None:
+        """Reject a request up front if its model's queue is already full.
+        
+        Args:
+            request: Chat request
+            
+        Raises:
+            AdmissionRejected: If the model's wait queue is full
+        """
+        self.admission.check(self.resolve_model(request))
+    
+    def check_upstream(self, request: ChatRequest) -> None:
+        """Reject a request up front if no Ollama backend can serve its model.
+        
+        Args:
+            request: Chat request
+            
+        Raises:
+            NoBackendAvailableError: If every backend is down or its circuit is open
+        """
+        self.ollama_service.check_available(self.resolve_model(request))
+    
+    async def _lookup_context(
+        self,
+        request: ChatRequest,
+        model: str,
+        conversation_history: List[ChatMessage]
+    ) -> Optional[List[int]]:
+        """Find a reusable Ollama context for a conversation history.
+        
+        Contexts that would overflow the token budget are skipped so the
+        history gets trimmed instead.
+        
+        Args:
+            request: Chat request
+            model: Model the request will run on
+            conversation_history: History preceding the current message
+            
+        Returns:
+            Cached context array, or None to fall back to the full history
+        """
+        if not settings.ollama_reuse_context or not conversation_history:
+            return None
+        context = self.context_cache.get(model, transcript_digest(conversation_history))
+        if context and not await self.context_window.fits_context(
+            model, context, request.message, request.max_tokens
+        ):
+            return None
+        return context
+    
+    async def _fit_history(
+        self,
+        request: ChatRequest,
+        model: str,
+        conversation_history: List[ChatMessage],
+        context: Optional[List[int]]
+    ) -> Tuple[List[ChatMessage], str]:
+        """Trim the history and message to the model's token budget.
+        
+        Args:
+            request: Chat request
+            model: Model the request will run on
+            conversation_history: Full history preceding the current message
+            context: Cached Ollama context, if one will be sent
+            
+        Returns:
+            Tuple of (history to send, message to send)
+        """
+        if context:
+            # The context already covers the history; only the new turn is sent
+            return conversation_history, request.message
+        return await self.context_window.fit(
+            model, conversation_history, request.message, request.max_tokens
+        )
+    
+    def _store_context(
+        self,
+        model: str,
+        prompt_digest: str,
+        response: str,
+        final_chunk: Dict[str, Any]
+    ) -> None:
+        """Remember the context Ollama returned for the completed turn.
+        
+        Args:
+            model: Model that generated the response
+            prompt_digest: Digest of the history plus the current user message
+            response: The assistant's response for this turn
+            final_chunk: Final ``done`` chunk returned by Ollama
+        """
+        context = final_chunk.get("context")
+        if not settings.ollama_reuse_context or not context:
+            return
+        digest = chain_digest(prompt_digest, "assistant", response)
+        self.context_cache.put(model, digest, context)
+    
+    def _prompt_prefix(
+        self,
+        request: ChatRequest,
+        conversation_id: str,
+        stored_history: List[ChatMessage],
+        prompt_history: List[ChatMessage],
+        context: Optional[List[int]]
+    ) -> Optional[str]:
+        """Get the memoized serialized history when the stored history is sent as-is.
+        
+        Args:
+            request: Chat request
+            conversation_id: Conversation identifier
+            stored_history: Stored history preceding the current message
+            prompt_history: History that will actually be sent
+            context: Cached Ollama context, if one will be sent
+            
+        Returns:
+            Serialized history, or None if the prompt must be built from scratch
+        """
+        if context or request.conversation_history or prompt_history is not stored_history:
+            return None
+        return self.prompt_cache.get(conversation_id, stored_history)
+    
+    def _is_coalescible(self, request: ChatRequest) -> bool:
+        """Check whether identical requests may share one generation.
+        
+        Only deterministic (temperature 0) requests produce the same output
+        for the same input, so only those are coalesced.
+        
+        Args:
+            request: Chat request
+            
+        Returns:
+            True if the request can join an in-flight generation
+        """
+        return settings.single_flight_enabled and request.temperature == 0
+    
+    async def _semantic_lookup(
+        self,
+        request: ChatRequest,
+        model: str,
+        conversation_history: List[ChatMessage]
+    ) -> Tuple[Optional[str], Optional[List[float]]]:
+        """Look up a semantically similar first-turn question.
+        
+        Args:
+            request: Chat request
+            model: Model the request will run on
+            conversation_history: History preceding the current message
+            
+        Returns:
+            Tuple of (cached answer or None, question embedding or None)
+        """
+        # Cached answers ran to completion, so they'd overrun a length-limited request
+        if (
+            self.semantic_cache is None
+            or conversation_history
+            or request.cache is False
+            or request.max_tokens is not None
+        ):
+            return None, None
+        try:
+            embedding = await self.ollama_service.embed(
+                request.message, settings.semantic_cache_embed_model
+            )
+        except Exception as e:
+            logger.warning(f"Semantic cache embedding failed: {e}")
+            return None, None
+        return self.semantic_cache.lookup(model, embedding), embedding
+    
+    def _semantic_store(
+        self,
+        request: ChatRequest,
+        model: str,
+        embedding: Optional[List[float]],
+        response: str,
+        final_chunk: Dict[str, Any]
+    ) -> None:
+        """Add a freshly generated first-turn answer to the semantic cache.
+        
+        Only answers that ended naturally are kept: one cut off by the request's
+        ``max_tokens`` (``done_reason: "length"``) would be served truncated to
+        later requests without that limit.
+        
+        Args:
+            request: Chat request
+            model: Model that generated the response
+            embedding: Question embedding from the lookup
+            response: Generated response
+            final_chunk: Final ``done`` chunk returned by Ollama
+        """
+        if (
+            embedding is None
+            or final_chunk.get("done_reason") != "stop"
+            or final_chunk.get("cached")
+            or request.max_tokens is not None
+        ):
+            return
+        self.semantic_cache.insert(model, request.message, embedding, response)
+        self.semantic_cache.save_soon()
+    
+    async def _replay(self, response: str) -> AsyncGenerator[str, None]:
+        """Stream a cached response in word-sized pieces."""
+        for piece in ResponseCache.split(response):
+            yield piece
+    
+    @staticmethod
+    def _usage(final_chunk: Dict[str, Any]) -> Usage:
+        """Summarize Ollama's evaluation counters from the final chunk.
+        
+        Answers replayed from a cache have no counters; the cache paths mark
+        them with ``cached`` in the final chunk.
+        """
+        prompt_tokens = final_chunk.get("prompt_eval_count")
+        completion_tokens = final_chunk.get("eval_count")
+        total_tokens = None
+        if prompt_tokens is not None or completion_tokens is not None:
+            total_tokens = (prompt_tokens or 0) + (completion_tokens or 0)
+        
+        def ms(key: str) -> Optional[float]:
+            # Ollama reports durations in nanoseconds
+            value = final_chunk.get(key)
+            return round(value / 1e6, 3) if value is not None else None
+        
+        eval_ms = ms("eval_duration")
+        tokens_per_second = None
+        if completion_tokens and eval_ms:
+            tokens_per_second = round(completion_tokens / (eval_ms / 1000), 2)
+        return Usage(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            total_tokens=total_tokens,
+            cached=bool(final_chunk.get("cached")),
+            load_ms=ms("load_duration"),
+            prompt_eval_ms=ms("prompt_eval_duration"),
+            eval_ms=eval_ms,
+            tokens_per_second=tokens_per_second
+        )
     
     async def process_chat_request(
         self, 
@@ -112,12 +496,11 @@ class ChatService:
         if not conversation_id:
             conversation_id = self._generate_conversation_id()
         
+        # Read a stored conversation back off the event loop before touching it
+        await self.conversations.load(conversation_id)
+        
         # Add user message to conversation
-        user_message = ChatMessage(
-            role="user",
-            content=request.message,
-            timestamp=self._get_current_timestamp()
-        )
+        user_message = MessageRecord("user", request.message)
         self.add_message_to_conversation(conversation_id, user_message)
         
         return conversation_id
@@ -125,112 +508,286 @@ class ChatService:
     async def generate_streaming_response(
         self,
         request: ChatRequest,
-        conversation_id: str
+        conversation_id: str,
+        timer: Optional[StageTimer] = None
     ) -> AsyncGenerator[StreamChunk, None]:
         """Generate a streaming chat response.
         
         Args:
             request: Chat request containing message and parameters
             conversation_id: Conversation identifier
+            timer: Stage timer started when the request arrived
             
         Yields:
             StreamChunk objects with response content
         """
+        # Determine the model to use
+        model = self.resolve_model(request)
+        timer = timer or StageTimer()
+        ticket: Optional[AdmissionTicket] = None
+        chunks: Optional[AsyncIterator[str]] = None
+        complete_response = ""
+        recorded = False
+        completed = False
+        started = time.perf_counter()
+        metrics.streams_in_flight.inc()
+        
         try:
             # Get conversation history (exclude the current user message we just added)
             history = self.get_conversation_history(conversation_id)[:-1]
+            timer.mark("history")
             
             # Use conversation history from request if provided, otherwise use stored history
             conversation_history = request.conversation_history or history
+            prompt_digest = chain_digest(
+                transcript_digest(conversation_history), "user", request.message
+            )
+            final_chunk: Dict[str, Any] = {}
+            embedding: Optional[List[float]] = None
             
-            # Determine the model to use
-            model = request.model or settings.ollama_model
+            # Attach deterministic duplicates to the generation already in flight;
+            # they share its upstream, so they need no slot or prompt of their own
+            flight_key = None
+            if self._is_coalescible(request):
+                flight_key = (model, prompt_digest, request.max_tokens)
+                chunks = self.single_flight.join(flight_key, final_chunk)
             
-            # Generate response using Ollama service
-            complete_response = ""
-            async for chunk in self.ollama_service.generate_response(
-                message=request.message,
-                conversation_history=conversation_history,
-                model=model,
-                temperature=request.temperature,
-                max_tokens=request.max_tokens
-            ):
+            if chunks is None:
+                # Reuse the answer to a near-duplicate first-turn question. The embedding
+                # call runs before queueing so it never holds a generation slot, and a
+                # hit needs no slot at all.
+                cached_answer, embedding = await self._semantic_lookup(
+                    request, model, conversation_history
+                )
+                if cached_answer is not None:
+                    final_chunk.update({"model": model, "done": True, "cached": True})
+                    timer.mark("prompt")
+                    chunks = self._replay(cached_answer)
+            
+            if chunks is None:
+                # Take a concurrency slot for the model, telling queued clients where they stand
+                ticket = self.admission.enter(model)
+                if ticket.position:
+                    yield StreamChunk(
+                        content="",
+                        is_complete=False,
+                        model=model,
+                        queue_position=ticket.position
+                    )
+                    await ticket.wait()
+                timer.mark("queue")
+                
+                # Resume from Ollama's cached context when this transcript was seen before
+                context = await self._lookup_context(request, model, conversation_history)
+                
+                # Keep the prompt within the model's token budget
+                prompt_history, message = await self._fit_history(
+                    request, model, conversation_history, context
+                )
+                prompt_prefix = self._prompt_prefix(
+                    request, conversation_id, history, prompt_history, context
+                )
+                timer.mark("prompt")
+                
+                def upstream(final: Dict[str, Any]) -> AsyncIterator[str]:
+                    return self.ollama_service.generate_response(
+                        message=message,
+                        conversation_history=prompt_history,
+                        model=model,
+                        temperature=request.temperature,
+                        max_tokens=request.max_tokens,
+                        context=context,
+                        final_chunk=final,
+                        use_cache=request.cache,
+                        prompt_prefix=prompt_prefix,
+                        timer=timer
+                    )
+                
+                if flight_key is not None:
+                    # The slot belongs to the shared generation, which outlives this
+                    # request while joiners are still following it
+                    chunks = self.single_flight.stream(
+                        flight_key, upstream, final_chunk, on_done=ticket.release
+                    )
+                    ticket = None
+                else:
+                    chunks = upstream(final_chunk)
+            
+            # Generate response using Ollama service, timing every token
+            first_token: Optional[float] = None
+            last_token: Optional[float] = None
+            gaps: List[float] = []
+            async for chunk in chunks:
+                now = time.perf_counter()
+                if last_token is None:
+                    timer.mark("first_token")
+                    first_token = now
+                else:
+                    gaps.append(now - last_token)
+                last_token = now
                 complete_response += chunk
-                yield StreamChunk(
+                # Skip validation on the per-token hot path; the fields are known good
+                yield StreamChunk.model_construct(
                     content=chunk,
                     is_complete=False,
                     model=model
                 )
+            if ticket is not None:
+                ticket.release()
+            timer.mark("last_token")
+            metrics.duration.observe(time.perf_counter() - started, model, "stream")
+            metrics.observe_generation(model, final_chunk)
+            # Token latencies only describe real generations, not cache replays or error text
+            if first_token is not None and final_chunk.get("done") and not final_chunk.get("cached"):
+                metrics.ttft.observe(first_token - started, model)
+                observe_gap = metrics.inter_token.observe
+                for gap in gaps:
+                    observe_gap(gap, model)
+            
+            # Record the turn before the final chunk; consumers stop reading after it.
+            # The store may have evicted the conversation during a long generation.
+            assistant_message = MessageRecord("assistant", complete_response.strip())
+            await self.conversations.load(conversation_id)
+            self.add_message_to_conversation(conversation_id, assistant_message)
+            recorded = True
+            self._store_context(model, prompt_digest, assistant_message.content, final_chunk)
+            self._semantic_store(request, model, embedding, assistant_message.content, final_chunk)
             
-            # Send final chunk
+            # Send final chunk; consumers may close the stream as soon as they have it
+            completed = True
             yield StreamChunk(
                 content="",
                 is_complete=True,
-                model=model
+                model=model,
+                usage=self._usage(final_chunk),
+                timing=timer.timing()
             )
             
-            # Add assistant response to conversation
-            assistant_message = ChatMessage(
-                role="assistant",
-                content=complete_response.strip(),
-                timestamp=self._get_current_timestamp()
+        except AdmissionRejected as e:
+            yield StreamChunk(
+                content=f"Error: {str(e)}, retry after {e.retry_after}s",
+                is_complete=True,
+                model=model
             )
-            self.add_message_to_conversation(conversation_id, assistant_message)
-            
+        except (asyncio.CancelledError, GeneratorExit):
+            if completed:
+                raise
+            # The client went away mid-generation: keep what it was shown
+            metrics.client_disconnects.inc(model)
+            if not recorded and complete_response.strip():
+                logger.info(f"Generation for conversation {conversation_id} cut short by disconnect")
+                self.add_message_to_conversation(conversation_id, MessageRecord(
+                    "assistant", complete_response.strip(), truncated=True
+                ))
+            raise
         except Exception as e:
             logger.error(f"Error generating streaming response: {e}")
             yield StreamChunk(
                 content=f"Error: {str(e)}",
                 is_complete=True,
-                model=request.model or settings.ollama_model
+                model=model
             )
+        finally:
+            metrics.streams_in_flight.dec()
+            if ticket is not None:
+                ticket.release()
+            # Close the upstream right away instead of leaving it to garbage collection
+            if chunks is not None:
+                await chunks.aclose()
     
     async def generate_complete_response(
         self,
         request: ChatRequest,
-        conversation_id: str
+        conversation_id: str,
+        timer: Optional[StageTimer] = None
     ) -> ChatResponse:
         """Generate a complete (non-streaming) chat response.
         
         Args:
             request: Chat request containing message and parameters
             conversation_id: Conversation identifier
+            timer: Stage timer started when the request arrived
             
         Returns:
             Complete chat response
         """
+        # Determine the model to use
+        model = self.resolve_model(request)
+        timer = timer or StageTimer()
+        
+        # Get conversation history (exclude the current user message we just added)
+        history = self.get_conversation_history(conversation_id)[:-1]
+        timer.mark("history")
+        
+        # Use conversation history from request if provided, otherwise use stored history
+        conversation_history = request.conversation_history or history
+        final_chunk: Dict[str, Any] = {}
+        
+        # Reuse the answer to a near-duplicate first-turn question. The embedding
+        # call runs before queueing so it never holds a generation slot, and a
+        # hit needs no slot at all.
+        cached_answer, embedding = await self._semantic_lookup(
+            request, model, conversation_history
+        )
+        
+        # Take a concurrency slot for the model (rejections propagate as 429s)
+        ticket = self.admission.enter(model) if cached_answer is None else None
+        started = time.perf_counter()
+        
         try:
-            # Get conversation history (exclude the current user message we just added)
-            history = self.get_conversation_history(conversation_id)[:-1]
-            
-            # Use conversation history from request if provided, otherwise use stored history
-            conversation_history = request.conversation_history or history
-            
-            # Determine the model to use
-            model = request.model or settings.ollama_model
-            
             # Generate complete response using Ollama service
-            response_content = await self.ollama_service.generate_complete_response(
-                message=request.message,
-                conversation_history=conversation_history,
-                model=model,
-                temperature=request.temperature,
-                max_tokens=request.max_tokens
-            )
+            if cached_answer is not None:
+                timer.mark("prompt")
+                final_chunk.update({"model": model, "done": True, "cached": True})
+                response_content = cached_answer
+            else:
+                await ticket.wait()
+                timer.mark("queue")
+                
+                # Resume from Ollama's cached context when this transcript was seen before
+                context = await self._lookup_context(request, model, conversation_history)
+                
+                # Keep the prompt within the model's token budget
+                prompt_history, message = await self._fit_history(
+                    request, model, conversation_history, context
+                )
+                prompt_prefix = self._prompt_prefix(
+                    request, conversation_id, history, prompt_history, context
+                )
+                timer.mark("prompt")
+                result = await self.ollama_service.generate_complete_response(
+                    message=message,
+                    conversation_history=prompt_history,
+                    model=model,
+                    temperature=request.temperature,
+                    max_tokens=request.max_tokens,
+                    context=context,
+                    final_chunk=final_chunk,
+                    use_cache=request.cache,
+                    prompt_prefix=prompt_prefix
+                )
+                response_content = result.content
+            timer.mark("last_token")
+            metrics.duration.observe(time.perf_counter() - started, model, "complete")
+            metrics.observe_generation(model, final_chunk)
             
-            # Add assistant response to conversation
-            assistant_message = ChatMessage(
-                role="assistant",
-                content=response_content,
-                timestamp=self._get_current_timestamp()
-            )
+            # Add assistant response to conversation (reloading it if evicted meanwhile)
+            assistant_message = MessageRecord("assistant", response_content)
+            await self.conversations.load(conversation_id)
             self.add_message_to_conversation(conversation_id, assistant_message)
+            prompt_digest = chain_digest(
+                transcript_digest(conversation_history), "user", request.message
+            )
+            self._store_context(model, prompt_digest, response_content, final_chunk)
+            self._semantic_store(request, model, embedding, response_content, final_chunk)
             
             return ChatResponse(
                 message=response_content,
                 role="assistant",
                 model=model,
-                conversation_id=conversation_id
+                conversation_id=conversation_id,
+                usage=self._usage(final_chunk),
+                timing=timer.timing()
             )
             
         except Exception as e:
@@ -238,9 +795,49 @@ class ChatService:
             return ChatResponse(
                 message=f"Error: {str(e)}",
                 role="assistant",
-                model=request.model or settings.ollama_model,
+                model=model,
                 conversation_id=conversation_id
             )
+        finally:
+            if ticket is not None:
+                ticket.release()
+    
+    async def generate_batch_item(self, request: ChatRequest) -> GenerationResult:
+        """Generate a response for one batch request.
+        
+        Batch requests are stateless: only the request's own history is
+        used and nothing is stored. They wait behind interactive requests
+        for a concurrency slot.
+        
+        Args:
+            request: Chat request from the batch
+            
+        Returns:
+            Generated text with Ollama's evaluation statistics
+        """
+        model = self.resolve_model(request)
+        ticket = self.admission.enter(model, batch=True)
+        started = time.perf_counter()
+        try:
+            await ticket.wait()
+            prompt_history, message = await self._fit_history(
+                request, model, request.conversation_history or [], None
+            )
+            final_chunk: Dict[str, Any] = {}
+            result = await self.ollama_service.generate_complete_response(
+                message=message,
+                conversation_history=prompt_history,
+                model=model,
+                temperature=request.temperature,
+                max_tokens=request.max_tokens,
+                final_chunk=final_chunk,
+                use_cache=request.cache
+            )
+            metrics.duration.observe(time.perf_counter() - started, model, "batch")
+            metrics.observe_generation(model, final_chunk)
+            return result
+        finally:
+            ticket.release()
     
     async def health_check(self) -> bool:
         """Check if the chat service is healthy.
@@ -250,6 +847,50 @@ class ChatService:
         """
         return await self.ollama_service.health_check()
     
+    def cache_stats(self) -> Dict[str, Any]:
+        """Get response cache statistics.
+        
+        Returns:
+            Cache counters keyed by cache name
+        """
+        stats = {
+            "response_cache": self.ollama_service.response_cache.stats()
+        }
+        if self.semantic_cache is not None:
+            stats["semantic_cache"] = self.semantic_cache.stats()
+        return stats
+    
+    def render_metrics(self) -> str:
+        """Refresh the state gauges and render all metrics.
+        
+        Returns:
+            Prometheus text exposition
+        """
+        metrics.queue_depth.replace(
+            ((model,), gate["queued"] + gate["batch_queued"])
+            for model, gate in self.admission.stats().items()
+        )
+        store = self.conversations.stats()
+        metrics.conversations.set(store["conversations"])
+        metrics.conversation_bytes.set(store["bytes"])
+        return metrics.render()
+    
+    def upstream_checked_at(self) -> Optional[float]:
+        """Get when the Ollama backend snapshot was last refreshed.
+        
+        Returns:
+            Unix timestamp, or None if Ollama has not been probed yet
+        """
+        return self.ollama_service.last_refresh
+    
+    def model_residency(self) -> Dict[str, Any]:
+        """Get the models currently loaded in Ollama.
+        
+        Returns:
+            Per-model residency details keyed by model name
+        """
+        return self.ollama_service.residency.snapshot()
+    
     async def list_available_models(self) -> List[str]:
         """List available models.
         
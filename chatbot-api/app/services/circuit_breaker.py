@@ -0,0 +1,125 @@
+"""Per-backend circuit breaker for Ollama calls."""
+
+import logging
+import math
+import time
+
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Stops routing to a backend after repeated failures or slow first tokens.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    the backend is skipped. Once ``reset_timeout`` has passed, a single trial
+    request is let through: success closes the circuit, failure re-opens it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        slow_ttft: float = 0.0
+    ):
+        """Initialize the circuit breaker.
+
+        Args:
+            name: Name used in log messages (the backend URL)
+            failure_threshold: Consecutive failures that open the circuit (0 disables)
+            reset_timeout: Seconds the circuit stays open before a trial request
+            slow_ttft: Time to first token counted as a failure (0 disables)
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.slow_ttft = slow_ttft
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the breaker can ever open."""
+        return self.failure_threshold > 0
+
+    def available(self) -> bool:
+        """Check whether a request may be routed through the breaker.
+
+        Returns:
+            True if closed, or open long enough for a trial that isn't running yet
+        """
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            return time.monotonic() - self.opened_at >= self.reset_timeout
+        return not self._trial_in_flight
+
+    def retry_after(self) -> int:
+        """Seconds until the breaker will let a trial request through."""
+        if self.state != OPEN:
+            return 1
+        remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+        return max(1, math.ceil(remaining))
+
+    def begin(self) -> bool:
+        """Mark a request as started.
+
+        Returns:
+            True if the request is the half-open trial
+        """
+        if self.state == CLOSED or not self.available():
+            return False
+        self.state = HALF_OPEN
+        self._trial_in_flight = True
+        return True
+
+    def end_trial(self) -> None:
+        """Release a trial that finished without recording an outcome."""
+        if self.state == HALF_OPEN and self._trial_in_flight:
+            # Let the next request try again straight away
+            self.state = OPEN
+            self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        """Record a successful request."""
+        if self.state != CLOSED:
+            logger.info(f"Circuit for Ollama backend {self.name} closed")
+        self.state = CLOSED
+        self.failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        """Record a failed request, opening the circuit past the threshold."""
+        self.failures += 1
+        if not self.enabled:
+            return
+        if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+            logger.warning(
+                f"Circuit for Ollama backend {self.name} opened after {self.failures} failures"
+            )
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def record_ttft(self, seconds: float) -> None:
+        """Record a request's time to first token.
+
+        Args:
+            seconds: Time from sending the request to the first token
+        """
+        if self.slow_ttft > 0 and seconds > self.slow_ttft:
+            logger.warning(f"Slow first token from Ollama backend {self.name}: {seconds:.2f}s")
+            self.record_failure()
+        else:
+            self.record_success()
+
+    def __repr__(self) -> str:
+        return f"CircuitBreaker({self.name!r}, state={self.state}, failures={self.failures})"
+
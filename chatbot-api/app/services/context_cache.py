@@ -0,0 +1,106 @@
+"""Cache of Ollama context state keyed by conversation transcript."""
+
+import hashlib
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Tuple
+
+
+def chain_digest(previous: Optional[str], role: str, content: str) -> str:
+    """Extend a transcript digest with one more message.
+
+    Args:
+        previous: Digest of the transcript so far (None for an empty transcript)
+        role: Role of the appended message
+        content: Content of the appended message
+
+    Returns:
+        Digest of the extended transcript
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    if previous:
+        hasher.update(previous.encode("ascii"))
+    hasher.update(b"\x00")
+    hasher.update(role.encode("utf-8"))
+    hasher.update(b"\x00")
+    hasher.update(content.strip().encode("utf-8"))
+    return hasher.hexdigest()
+
+
+def transcript_digest(messages: Iterable) -> Optional[str]:
+    """Compute the digest of a full transcript.
+
+    Messages that already carry a cached digest short-circuit the walk,
+    so stored conversations are O(1) and client-supplied history is O(n).
+
+    Args:
+        messages: Messages with ``role`` and ``content`` attributes
+
+    Returns:
+        Transcript digest, or None for an empty transcript
+    """
+    messages = list(messages)
+    if messages and getattr(messages[-1], "_digest", None):
+        return messages[-1]._digest
+
+    digest = None
+    for msg in messages:
+        digest = chain_digest(digest, msg.role, msg.content)
+    return digest
+
+
+class ContextCache:
+    """Bounded LRU cache of Ollama ``context`` arrays.
+
+    Entries are keyed on (model, transcript digest), so a cached context is
+    only reused when the same model sees exactly the same transcript again.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        """Initialize the context cache.
+
+        Args:
+            max_entries: Maximum number of contexts to retain
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], List[int]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, model: str, digest: Optional[str]) -> Optional[List[int]]:
+        """Look up the context for a transcript.
+
+        Args:
+            model: Model the context was produced by
+            digest: Transcript digest
+
+        Returns:
+            Cached context array, or None if missing
+        """
+        if not digest:
+            return None
+        key = (model, digest)
+        context = self._entries.get(key)
+        if context is not None:
+            self._entries.move_to_end(key)
+        return context
+
+    def put(self, model: str, digest: str, context: List[int]) -> None:
+        """Store the context produced after a transcript.
+
+        Args:
+            model: Model that produced the context
+            digest: Digest of the transcript the context covers
+            context: Context array returned by Ollama
+        """
+        if self.max_entries <= 0 or not context:
+            return
+        key = (model, digest)
+        self._entries[key] = context
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all cached contexts."""
+        self._entries.clear()
@@ -0,0 +1,183 @@
+"""Token-budget-aware selection of conversation history."""
+
+import logging
+import math
+from typing import List, Optional, Tuple
+from app.models import ChatMessage
+from app.services.message_ring import MessageRecord
+
+
+logger = logging.getLogger(__name__)
+
+# Rough characters-per-token ratio for English text with BPE tokenizers
+CHARS_PER_TOKEN = 4
+# Per-message framing ("Human: ", separators, template tokens)
+MESSAGE_OVERHEAD_TOKENS = 4
+# Window assumed when Ollama does not report the model's context length
+DEFAULT_CONTEXT_LENGTH = 2048
+TRUNCATION_MARKER = " …[truncated]"
+
+
+def estimate_text_tokens(text: str) -> int:
+    """Estimate the token count of a piece of text.
+
+    Args:
+        text: Text to estimate
+
+    Returns:
+        Estimated number of tokens including message framing
+    """
+    return math.ceil(len(text) / CHARS_PER_TOKEN) + MESSAGE_OVERHEAD_TOKENS
+
+
+def estimate_tokens(message) -> int:
+    """Estimate a message's token count, caching the result on the message.
+
+    Args:
+        message: Message with ``content`` and a ``_token_count`` attribute
+
+    Returns:
+        Estimated number of tokens
+    """
+    count = message._token_count
+    if count is None:
+        count = estimate_text_tokens(message.content)
+        message._token_count = count
+    return count
+
+
+def truncate_text(text: str, max_tokens: int) -> str:
+    """Cut text down to roughly ``max_tokens`` tokens.
+
+    Args:
+        text: Text to truncate
+        max_tokens: Token limit including message framing
+
+    Returns:
+        The original text if it fits, otherwise its head plus a marker
+    """
+    max_chars = max(0, (max_tokens - MESSAGE_OVERHEAD_TOKENS) * CHARS_PER_TOKEN - len(TRUNCATION_MARKER))
+    if len(text) <= max_chars + len(TRUNCATION_MARKER):
+        return text
+    return text[:max_chars] + TRUNCATION_MARKER
+
+
+class ContextWindowManager:
+    """Keeps prompts within each model's context window.
+
+    System messages are always kept; the remaining budget is filled with the
+    most recent messages, and any single message larger than the per-message
+    limit is truncated.
+    """
+
+    def __init__(
+        self,
+        ollama_service,
+        token_budget: int = 4096,
+        reserve_tokens: int = 512,
+        max_message_tokens: int = 0
+    ):
+        """Initialize the context window manager.
+
+        Args:
+            ollama_service: Service used to look up model context lengths
+            token_budget: Upper bound on prompt plus output tokens (0 uses the model window)
+            reserve_tokens: Tokens kept free for output when max_tokens is unset
+            max_message_tokens: Per-message limit (0 uses half the budget)
+        """
+        self.ollama_service = ollama_service
+        self.token_budget = token_budget
+        self.reserve_tokens = reserve_tokens
+        self.max_message_tokens = max_message_tokens
+
+    async def budget(self, model: str, max_tokens: Optional[int] = None) -> int:
+        """Compute the prompt token budget for a model.
+
+        Args:
+            model: Model the request will run on
+            max_tokens: Requested output token limit
+
+        Returns:
+            Tokens available for the prompt
+        """
+        window = await self.ollama_service.get_context_length(model) or DEFAULT_CONTEXT_LENGTH
+        if self.token_budget > 0:
+            window = min(window, self.token_budget)
+        return max(0, window - (max_tokens or self.reserve_tokens))
+
+    async def fits_context(
+        self,
+        model: str,
+        context: List[int],
+        message: str,
+        max_tokens: Optional[int] = None
+    ) -> bool:
+        """Check whether a cached Ollama context still leaves room for a new turn.
+
+        Args:
+            model: Model the request will run on
+            context: Cached context array (one entry per token)
+            message: The current user message
+            max_tokens: Requested output token limit
+
+        Returns:
+            True if the context plus the message fits the budget
+        """
+        return len(context) + estimate_text_tokens(message) <= await self.budget(model, max_tokens)
+
+    async def fit(
+        self,
+        model: str,
+        conversation_history: List[ChatMessage],
+        message: str,
+        max_tokens: Optional[int] = None
+    ) -> Tuple[List[ChatMessage], str]:
+        """Select the history and message text that fit the model's budget.
+
+        Args:
+            model: Model the request will run on
+            conversation_history: Full history preceding the current message
+            message: The current user message
+            max_tokens: Requested output token limit
+
+        Returns:
+            Tuple of (history to send, message to send). The history is the
+            original list object when nothing had to be dropped or truncated.
+        """
+        budget = await self.budget(model, max_tokens)
+        per_message = self.max_message_tokens or max(MESSAGE_OVERHEAD_TOKENS + 1, budget // 2)
+
+        message = truncate_text(message, per_message)
+        remaining = budget - estimate_text_tokens(message)
+
+        # Always keep system messages, then walk back through the most recent turns
+        keep = [msg.role == "system" for msg in conversation_history]
+        for index, msg in enumerate(conversation_history):
+            if keep[index]:
+                remaining -= min(estimate_tokens(msg), per_message)
+        for index in range(len(conversation_history) - 1, -1, -1):
+            if keep[index]:
+                continue
+            cost = min(estimate_tokens(conversation_history[index]), per_message)
+            if cost > remaining:
+                break
+            keep[index] = True
+            remaining -= cost
+
+        changed = not all(keep)
+        selected = []
+        for msg, kept in zip(conversation_history, keep):
+            if not kept:
+                continue
+            if estimate_tokens(msg) > per_message:
+                msg = MessageRecord(msg.role, truncate_text(msg.content, per_message))
+                changed = True
+            selected.append(msg)
+
+        if not changed:
+            return conversation_history, message
+        logger.info(
+            f"Trimmed history from {len(conversation_history)} to {len(selected)} messages "
+            f"to fit {budget} tokens for model {model}"
+        )
+        return selected, message
@@ -0,0 +1,281 @@
+"""Bounded in-memory conversation store with LRU and idle-TTL eviction."""
+
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple, Union
+from app.services.message_ring import MessageRecord, MessageRing
+
+
+logger = logging.getLogger(__name__)
+
+# Approximate memory held by a stored record besides its content (slotted
+# object, float timestamp, digest, ring slot), measured with tracemalloc
+MESSAGE_OVERHEAD_BYTES = 200
+# Approximate memory held by an empty conversation entry
+CONVERSATION_OVERHEAD_BYTES = 300
+
+
+def message_size(message: MessageRecord) -> int:
+    """Estimate the memory held by a stored message.
+
+    Args:
+        message: Stored message
+
+    Returns:
+        Approximate size in bytes
+    """
+    return MESSAGE_OVERHEAD_BYTES + len(message.content)
+
+
+class _Conversation:
+    """A stored conversation and its accounting."""
+
+    __slots__ = ("messages", "size", "last_access", "appended")
+
+    def __init__(self, now: float, messages: MessageRing):
+        self.messages = messages
+        # Messages ever appended, so each one keeps a stable position for cursors
+        self.appended = len(messages)
+        self.size = CONVERSATION_OVERHEAD_BYTES
+        self.last_access = now
+
+
+class ConversationStore:
+    """Conversation histories kept within a global memory budget.
+
+    Conversations are kept in least-recently-used order, so both idle
+    expiry and budget eviction only ever look at the oldest entry and every
+    operation is O(1) amortized.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        idle_ttl: float = 86400.0,
+        max_messages: int = 50,
+        on_evict: Optional[Callable[[str], None]] = None
+    ):
+        """Initialize the conversation store.
+
+        Args:
+            max_bytes: Approximate memory budget for all conversations (0 disables)
+            idle_ttl: Seconds a conversation may go unused before it expires (0 disables)
+            max_messages: Messages kept per conversation; older ones are dropped
+            on_evict: Called with the conversation ID whenever one is evicted or expires
+        """
+        self.max_bytes = max_bytes
+        self.idle_ttl = idle_ttl
+        self.max_messages = max_messages
+        self.on_evict = on_evict
+        self._conversations: "OrderedDict[str, _Conversation]" = OrderedDict()
+        self.total_bytes = 0
+        self.total_messages = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._conversations)
+
+    def __contains__(self, conversation_id: str) -> bool:
+        self._expire(time.monotonic())
+        return conversation_id in self._conversations
+
+    def get(self, conversation_id: str) -> Union[MessageRing, List[MessageRecord]]:
+        """Get a conversation's messages, marking it as recently used.
+
+        Args:
+            conversation_id: Conversation identifier
+
+        Returns:
+            Stored records, oldest first (empty if unknown or expired)
+        """
+        now = time.monotonic()
+        self._expire(now)
+        entry = self._conversations.get(conversation_id)
+        if entry is None:
+            return []
+        entry.last_access = now
+        self._conversations.move_to_end(conversation_id)
+        return entry.messages
+
+    def append(self, conversation_id: str, message: MessageRecord) -> None:
+        """Append a message, creating the conversation if needed.
+
+        Once the conversation holds ``max_messages`` records, the oldest one
+        is overwritten in place.
+
+        Args:
+            conversation_id: Conversation identifier
+            message: Record to store
+        """
+        now = time.monotonic()
+        self._expire(now)
+        entry = self._conversations.get(conversation_id)
+        if entry is None:
+            entry = _Conversation(now, MessageRing(self.max_messages))
+            self._conversations[conversation_id] = entry
+            self.total_bytes += entry.size
+        else:
+            entry.last_access = now
+            self._conversations.move_to_end(conversation_id)
+
+        size = message_size(message)
+        evicted = entry.messages.append(message)
+        entry.appended += 1
+        if evicted is None:
+            self.total_messages += 1
+        else:
+            size -= message_size(evicted)
+        entry.size += size
+        self.total_bytes += size
+
+        self._enforce_budget(conversation_id)
+
+    def page(
+        self,
+        conversation_id: str,
+        cursor: int = 0,
+        limit: int = 0
+    ) -> Tuple[List[MessageRecord], Optional[int]]:
+        """Get a slice of a conversation's messages.
+
+        Cursors are message positions counted from the start of the
+        conversation, so they stay valid as older messages are dropped;
+        a cursor pointing at dropped messages resumes at the oldest one kept.
+
+        Args:
+            conversation_id: Conversation identifier
+            cursor: Position of the first message to return
+            limit: Maximum messages to return (0 for all remaining)
+
+        Returns:
+            Tuple of (records, cursor for the next page or None at the end)
+        """
+        messages = self.get(conversation_id)
+        entry = self._conversations.get(conversation_id)
+        if entry is None:
+            return [], None
+        first = entry.appended - len(messages)
+        start = max(cursor, first) - first
+        end = len(messages) if limit <= 0 else min(len(messages), start + limit)
+        records = [messages[index] for index in range(start, end)]
+        return records, (first + end if end < len(messages) else None)
+
+    async def iter_conversations(self) -> AsyncIterator[Tuple[str, List[MessageRecord]]]:
+        """Walk every stored conversation without changing recency order.
+
+        Only the conversation IDs are snapshotted up front; each
+        conversation's messages are copied as it is reached, and ones
+        deleted in the meantime are skipped.
+
+        Yields:
+            Tuples of (conversation ID, records oldest first)
+        """
+        self._expire(time.monotonic())
+        for conversation_id in list(self._conversations):
+            entry = self._conversations.get(conversation_id)
+            if entry is not None:
+                yield conversation_id, entry.messages.to_list()
+
+    def _adopt(self, conversation_id: str, messages: List[MessageRecord]) -> MessageRing:
+        """Add a conversation loaded from elsewhere as the most recently used.
+
+        Args:
+            conversation_id: Conversation identifier
+            messages: Stored records, oldest first
+
+        Returns:
+            The stored message ring
+        """
+        entry = _Conversation(time.monotonic(), MessageRing(self.max_messages, messages))
+        entry.size += sum(message_size(message) for message in entry.messages)
+        self._conversations[conversation_id] = entry
+        self.total_bytes += entry.size
+        self.total_messages += len(entry.messages)
+        self._enforce_budget(conversation_id)
+        return entry.messages
+
+    async def load(self, conversation_id: str) -> None:
+        """Make a conversation available to the synchronous reads (always true in memory).
+
+        Args:
+            conversation_id: Conversation identifier
+        """
+
+    def start(self) -> None:
+        """Start any background work (nothing for the in-memory store)."""
+
+    def close(self) -> None:
+        """Flush and stop any background work (nothing for the in-memory store)."""
+
+    def delete(self, conversation_id: str) -> bool:
+        """Remove a conversation.
+
+        Args:
+            conversation_id: Conversation identifier
+
+        Returns:
+            True if the conversation existed, False otherwise
+        """
+        entry = self._conversations.pop(conversation_id, None)
+        if entry is None:
+            return False
+        self._forget(entry)
+        return True
+
+    def _forget(self, entry: _Conversation) -> None:
+        """Drop a removed conversation from the totals."""
+        self.total_bytes -= entry.size
+        self.total_messages -= len(entry.messages)
+
+    def _evict_oldest(self) -> str:
+        """Remove the least recently used conversation."""
+        conversation_id, entry = self._conversations.popitem(last=False)
+        self._forget(entry)
+        if self.on_evict is not None:
+            self.on_evict(conversation_id)
+        return conversation_id
+
+    def _expire(self, now: float) -> None:
+        """Remove conversations that have been idle longer than the TTL."""
+        if self.idle_ttl <= 0:
+            return
+        while self._conversations:
+            oldest = next(iter(self._conversations.values()))
+            if now - oldest.last_access < self.idle_ttl:
+                break
+            self._evict_oldest()
+            self.expirations += 1
+
+    def _enforce_budget(self, keep: str) -> None:
+        """Evict least recently used conversations until within the byte budget.
+
+        Args:
+            keep: Conversation that must survive (the one just written)
+        """
+        if self.max_bytes <= 0:
+            return
+        while self.total_bytes > self.max_bytes and len(self._conversations) > 1:
+            if next(iter(self._conversations)) == keep:
+                break
+            evicted = self._evict_oldest()
+            self.evictions += 1
+            logger.debug(f"Evicted conversation {evicted} to stay within memory budget")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return live store counters.
+
+        Returns:
+            Dictionary of conversation, message and byte counts plus eviction counters
+        """
+        self._expire(time.monotonic())
+        return {
+            "conversations": len(self._conversations),
+            "messages": self.total_messages,
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "idle_ttl": self.idle_ttl,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
@@ -0,0 +1,183 @@
+"""Hedged streaming requests: race a backup attempt against a slow first token."""
+
+import asyncio
+import logging
+import math
+from collections import deque
+from typing import AsyncGenerator, Callable, Deque, Dict, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+# Sentinel marking the end of an attempt's stream
+_END = object()
+# Items an attempt reads ahead of its consumer; a slow client then slows the upstream
+ATTEMPT_BUFFER = 32
+
+
+class _Failed:
+    """Error raised by an attempt, passed through its queue."""
+
+    __slots__ = ("error",)
+
+    def __init__(self, error: Exception):
+        self.error = error
+
+
+class TtftTracker:
+    """Rolling window of time-to-first-token samples per model."""
+
+    def __init__(self, window: int = 256):
+        """Initialize the tracker.
+
+        Args:
+            window: Number of recent samples kept per model
+        """
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def record(self, model: str, seconds: float) -> None:
+        """Record a time to first token.
+
+        Args:
+            model: Model the request ran on
+            seconds: Time to first token
+        """
+        samples = self._samples.get(model)
+        if samples is None:
+            samples = self._samples[model] = deque(maxlen=self.window)
+        samples.append(seconds)
+
+    def percentile(self, model: str, percentile: float, min_samples: int = 1) -> Optional[float]:
+        """Get a percentile of a model's recent TTFTs.
+
+        Args:
+            model: Model name
+            percentile: Percentile between 0 and 100
+            min_samples: Samples required before a value is reported
+
+        Returns:
+            TTFT in seconds, or None if there are too few samples
+        """
+        samples = self._samples.get(model)
+        if not samples or len(samples) < min_samples:
+            return None
+        ordered = sorted(samples)
+        index = min(len(ordered) - 1, max(0, math.ceil(percentile / 100 * len(ordered)) - 1))
+        return ordered[index]
+
+
+class _Attempt:
+    """One upstream attempt, pumped into a bounded queue by its own task."""
+
+    def __init__(self, source: AsyncGenerator):
+        self.queue: asyncio.Queue = asyncio.Queue(ATTEMPT_BUFFER)
+        self.task = asyncio.create_task(self._pump(source))
+
+    async def _pump(self, source: AsyncGenerator) -> None:
+        try:
+            async for item in source:
+                await self.queue.put(item)
+        except Exception as e:
+            await self.queue.put(_Failed(e))
+        else:
+            await self.queue.put(_END)
+
+    async def cancel(self) -> None:
+        if not self.task.done():
+            self.task.cancel()
+            try:
+                await self.task
+            except (asyncio.CancelledError, Exception):
+                pass
+
+
+async def hedged_stream(
+    start: Callable[[], AsyncGenerator],
+    delay: float,
+    can_hedge: Callable[[], bool],
+    max_attempts: int = 2
+) -> AsyncGenerator:
+    """Stream from whichever of several identical attempts produces an item first.
+
+    A backup attempt is started when the first item hasn't arrived within
+    ``delay`` seconds, or straight away if the current attempt fails before
+    producing anything. The first attempt to produce an item wins; the
+    others are cancelled, which closes their upstream connections.
+
+    Args:
+        start: Factory returning a new attempt's item stream
+        delay: Seconds to wait for a first item before hedging
+        can_hedge: Whether another attempt can be started right now
+        max_attempts: Maximum number of attempts, including retries after failures
+
+    Yields:
+        Items from the winning attempt
+    """
+    attempts: List[_Attempt] = [_Attempt(start())]
+    launched = 1
+    waiting = True  # Whether the hedge delay still applies
+    getters: Dict[_Attempt, asyncio.Future] = {}
+    winner: Optional[_Attempt] = None
+    first = _END
+    error: Optional[Exception] = None
+
+    def launch() -> bool:
+        nonlocal launched
+        if launched >= max_attempts or not can_hedge():
+            return False
+        attempts.append(_Attempt(start()))
+        launched += 1
+        return True
+
+    try:
+        while winner is None:
+            for attempt in attempts:
+                if attempt not in getters:
+                    getters[attempt] = asyncio.ensure_future(attempt.queue.get())
+            if not getters:
+                raise error
+            timeout = delay if waiting and launched < max_attempts else None
+            done, _ = await asyncio.wait(
+                getters.values(), timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                if launch():
+                    logger.info(f"No first token after {delay:.2f}s, hedging on another backend")
+                else:
+                    waiting = False
+                continue
+            for attempt, getter in list(getters.items()):
+                if getter not in done:
+                    continue
+                del getters[attempt]
+                item = getter.result()
+                if isinstance(item, _Failed):
+                    error = item.error
+                    attempts.remove(attempt)
+                    if not attempts and launch():
+                        logger.info(f"Attempt failed before its first token ({error}), retrying on another backend")
+                    continue
+                winner = attempt
+                first = item
+                break
+
+        # Cancel the losers before streaming the winner
+        for attempt in attempts:
+            if attempt is not winner:
+                await attempt.cancel()
+        for getter in getters.values():
+            getter.cancel()
+        getters.clear()
+
+        item = first
+        while item is not _END:
+            if isinstance(item, _Failed):
+                raise item.error
+            yield item
+            item = await winner.queue.get()
+    finally:
+        for getter in getters.values():
+            getter.cancel()
+        for attempt in attempts:
+            await attempt.cancel()
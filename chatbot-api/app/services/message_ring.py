@@ -0,0 +1,166 @@
+"""Compact internal message records and a fixed-capacity ring buffer to hold them."""
+
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Union
+from app.models import ChatMessage
+
+
+class MessageRecord:
+    """A stored chat message, without the pydantic overhead of ``ChatMessage``.
+
+    Records expose the same ``role``/``content`` attributes and cached
+    ``_digest``/``_token_count`` slots as ``ChatMessage``, so the prompt
+    builder and context window work with either. ``ChatMessage`` objects are
+    only built from records at the API edge.
+    """
+
+    __slots__ = ("role", "content", "timestamp", "truncated", "_digest", "_token_count")
+
+    def __init__(
+        self,
+        role: str,
+        content: str,
+        timestamp: Optional[float] = None,
+        truncated: bool = False
+    ):
+        """Initialize the record.
+
+        Args:
+            role: Message role; interned so every record shares one string per role
+            content: Message content
+            timestamp: Unix time the message was created (defaults to now)
+            truncated: Whether the message was cut short by a disconnect
+        """
+        self.role = sys.intern(role)
+        self.content = content
+        self.timestamp = time.time() if timestamp is None else timestamp
+        self.truncated = truncated
+        self._digest: Optional[str] = None
+        self._token_count: Optional[int] = None
+
+    @classmethod
+    def from_message(cls, message: ChatMessage) -> "MessageRecord":
+        """Build a record from an API message.
+
+        Args:
+            message: Pydantic chat message
+
+        Returns:
+            Equivalent record
+        """
+        timestamp = None
+        if message.timestamp:
+            try:
+                parsed = datetime.fromisoformat(message.timestamp)
+            except ValueError:
+                parsed = None
+            if parsed is not None:
+                if parsed.tzinfo is None:
+                    parsed = parsed.replace(tzinfo=timezone.utc)
+                timestamp = parsed.timestamp()
+        record = cls(message.role, message.content, timestamp, message.truncated)
+        record._digest = message._digest
+        record._token_count = message._token_count
+        return record
+
+    def to_message(self) -> ChatMessage:
+        """Build the API representation of the record.
+
+        Returns:
+            Pydantic chat message with an ISO timestamp
+        """
+        return ChatMessage(**self.to_dict())
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the record with the same fields as ``ChatMessage``.
+
+        Returns:
+            Dictionary with an ISO timestamp
+        """
+        return {
+            "role": self.role,
+            "content": self.content,
+            "timestamp": datetime.utcfromtimestamp(self.timestamp).isoformat(),
+            "truncated": self.truncated,
+        }
+
+    def __repr__(self) -> str:
+        return f"MessageRecord(role={self.role!r}, content={self.content[:40]!r})"
+
+
+class MessageRing:
+    """Fixed-capacity buffer of records, oldest first.
+
+    Appending to a full ring overwrites the oldest record in place, so
+    enforcing the per-conversation message cap is O(1) instead of a list
+    slice. A capacity of 0 means unbounded.
+    """
+
+    __slots__ = ("_items", "_start", "_capacity")
+
+    def __init__(self, capacity: int, records: Optional[List[MessageRecord]] = None):
+        """Initialize the ring.
+
+        Args:
+            capacity: Maximum number of records kept (0 for unbounded)
+            records: Initial records, oldest first; only the newest ``capacity`` are kept
+        """
+        self._capacity = max(0, capacity)
+        self._start = 0
+        records = records or []
+        if self._capacity and len(records) > self._capacity:
+            records = records[-self._capacity:]
+        self._items: List[MessageRecord] = list(records)
+
+    def append(self, record: MessageRecord) -> Optional[MessageRecord]:
+        """Add a record, evicting the oldest one if the ring is full.
+
+        Args:
+            record: Record to add
+
+        Returns:
+            The evicted record, or None if nothing was evicted
+        """
+        items = self._items
+        if not self._capacity or len(items) < self._capacity:
+            items.append(record)
+            return None
+        evicted = items[self._start]
+        items[self._start] = record
+        self._start = (self._start + 1) % self._capacity
+        return evicted
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self) -> Iterator[MessageRecord]:
+        items, start = self._items, self._start
+        if start:
+            yield from items[start:]
+            yield from items[:start]
+        else:
+            yield from items
+
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            return self.to_list()[index]
+        size = len(self._items)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("message ring index out of range")
+        return self._items[(self._start + index) % size]
+
+    def to_list(self) -> List[MessageRecord]:
+        """Copy the records into a list, oldest first.
+
+        Returns:
+            List of records
+        """
+        start = self._start
+        return self._items[start:] + self._items[:start] if start else list(self._items)
+
+    def __repr__(self) -> str:
+        return f"MessageRing({len(self._items)}/{self._capacity or 'unbounded'})"
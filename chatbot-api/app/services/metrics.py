@@ -0,0 +1,278 @@
+"""In-process metrics with Prometheus text exposition.
+
+The metric types are deliberately minimal: recording is a dict lookup plus
+an integer increment, so latency histograms can be observed for every
+streamed token.
+"""
+
+import math
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+
+# Starlette appends the charset to text responses
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# Bucket upper bounds, in seconds unless noted
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+INTER_TOKEN_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.02, 0.035, 0.05, 0.1, 0.25, 0.5, 1.0)
+TOKENS_PER_SECOND_BUCKETS = (1.0, 2.5, 5.0, 10.0, 20.0, 35.0, 50.0, 75.0, 100.0, 150.0, 250.0)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    """Escape a label value for the text exposition format."""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    """Render a ``{name="value",...}`` label set (empty when there are no labels)."""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    """Render a sample value."""
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    """Base class holding a metric's name, help text and label names."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing count per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        super().__init__(name, help_text, label_names)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        """Increase the count for a label set.
+
+        Args:
+            labels: Label values, in the order of ``label_names``
+            amount: Non-negative increment
+        """
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        """Current count for a label set."""
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"
+            for labels, value in self._values.items()
+        ]
+
+
+class Gauge(_Metric):
+    """Value per label set that can go up and down."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        super().__init__(name, help_text, label_names)
+        self._values: Dict[Labels, float] = {}
+
+    def set(self, value: float, *labels: str) -> None:
+        """Set the value for a label set."""
+        self._values[labels] = value
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        """Raise the value for a label set."""
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        """Lower the value for a label set."""
+        self._values[labels] = self._values.get(labels, 0.0) - amount
+
+    def replace(self, values: Iterable[Tuple[Labels, float]]) -> None:
+        """Replace every label set at once, dropping ones no longer reported."""
+        self._values = dict(values)
+
+    def value(self, *labels: str) -> float:
+        """Current value for a label set."""
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"
+            for labels, value in self._values.items()
+        ]
+
+
+class _HistogramSeries:
+    """Bucket counts and sum for one label set."""
+
+    __slots__ = ("counts", "total")
+
+    def __init__(self, buckets: int):
+        # One slot per upper bound plus the implicit +Inf bucket
+        self.counts = [0] * (buckets + 1)
+        self.total = 0.0
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in fixed buckets per label set.
+
+    Bucket counts are stored per bucket and only made cumulative when
+    rendered, so an observation is one bisect and two additions.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Labels, _HistogramSeries] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        """Record one observation.
+
+        Args:
+            value: Observed value
+            labels: Label values, in the order of ``label_names``
+        """
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = _HistogramSeries(len(self.buckets))
+        series.counts[bisect_left(self.buckets, value)] += 1
+        series.total += value
+
+    def count(self, *labels: str) -> int:
+        """Number of observations for a label set."""
+        series = self._series.get(labels)
+        return sum(series.counts) if series is not None else 0
+
+    def render(self) -> List[str]:
+        lines = []
+        bounds = [_format_value(bound) for bound in self.buckets] + ["+Inf"]
+        for labels, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(bounds, series.counts):
+                cumulative += count
+                bucket_labels = _format_labels(self.label_names, labels, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            plain = _format_labels(self.label_names, labels)
+            lines.append(f"{self.name}_sum{plain} {_format_value(series.total)}")
+            lines.append(f"{self.name}_count{plain} {cumulative}")
+        return lines
+
+
+class Metrics:
+    """The service's metrics.
+
+    Latency histograms and counters are recorded as requests run. Gauges
+    describing shared state (queue depth, stored conversations) are set from
+    the owning services when the metrics are scraped.
+    """
+
+    def __init__(self):
+        self.ttft = Histogram(
+            "chatbot_time_to_first_token_seconds",
+            "Time from the start of a streamed generation to its first token, including queueing",
+            ("model",),
+            LATENCY_BUCKETS
+        )
+        self.inter_token = Histogram(
+            "chatbot_inter_token_seconds",
+            "Time between consecutive streamed tokens",
+            ("model",),
+            INTER_TOKEN_BUCKETS
+        )
+        self.duration = Histogram(
+            "chatbot_request_duration_seconds",
+            "Total generation time per chat request",
+            ("model", "mode"),
+            LATENCY_BUCKETS
+        )
+        self.tokens_per_second = Histogram(
+            "chatbot_tokens_per_second",
+            "Generation speed reported by Ollama (eval_count / eval_duration)",
+            ("model",),
+            TOKENS_PER_SECOND_BUCKETS
+        )
+        self.streams_in_flight = Gauge(
+            "chatbot_streams_in_flight",
+            "Streamed generations currently running or queued"
+        )
+        self.queue_depth = Gauge(
+            "chatbot_admission_queue_depth",
+            "Requests waiting for a generation slot",
+            ("model",)
+        )
+        self.conversations = Gauge(
+            "chatbot_conversations",
+            "Conversations held in memory"
+        )
+        self.conversation_bytes = Gauge(
+            "chatbot_conversation_bytes",
+            "Approximate bytes of conversation history held in memory"
+        )
+        self.upstream_errors = Counter(
+            "chatbot_upstream_errors_total",
+            "Failed requests to Ollama",
+            ("model", "reason")
+        )
+        self.client_disconnects = Counter(
+            "chatbot_client_disconnects_total",
+            "Streamed generations stopped because the client went away",
+            ("model",)
+        )
+
+    def observe_generation(self, model: str, final_chunk: Dict[str, Any]) -> None:
+        """Record generation speed from Ollama's final chunk, if it has counters.
+
+        Args:
+            model: Model name
+            final_chunk: Final ``done`` chunk (or non-streaming response body)
+        """
+        eval_count = final_chunk.get("eval_count")
+        eval_duration = final_chunk.get("eval_duration")
+        if eval_count and eval_duration:
+            self.tokens_per_second.observe(eval_count / (eval_duration / 1e9), model)
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format.
+
+        Returns:
+            Exposition text
+        """
+        lines: List[str] = []
+        for metric in vars(self).values():
+            if isinstance(metric, _Metric):
+                lines.extend(metric.header())
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Shared by every service in the process
+metrics = Metrics()
@@ -0,0 +1,187 @@
+"""Keeps models loaded in Ollama and tracks which ones are resident."""
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Set
+import httpx
+from app.services.ollama_pool import OllamaBackend, OllamaPool, normalize_model_name
+
+
+logger = logging.getLogger(__name__)
+
+
+class ModelResidencyManager:
+    """Preloads models at startup and polls Ollama for the resident set.
+
+    Ollama loads a model on its first request and unloads it after
+    ``keep_alive`` of inactivity, so the first request after a deploy (or an
+    idle period) pays the full load time. The manager warms the configured
+    models up front and keeps a per-backend view of what is loaded, which
+    the pool uses to break routing ties and ``/models`` reports.
+    """
+
+    def __init__(
+        self,
+        pool: OllamaPool,
+        client: httpx.AsyncClient,
+        keep_alive: Optional[str] = None,
+        poll_interval: float = 10.0
+    ):
+        """Initialize the residency manager.
+
+        Args:
+            pool: Backend pool whose residency is tracked
+            client: Shared HTTP client
+            keep_alive: How long Ollama keeps models loaded (e.g. "30m", "-1")
+            poll_interval: Seconds between /api/ps polls (0 disables polling)
+        """
+        self.pool = pool
+        self.client = client
+        self.keep_alive = keep_alive or None
+        self.poll_interval = poll_interval
+        self.ready = False
+        # Model name -> details from /api/ps, per backend URL
+        self._details: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._preload_task: Optional[asyncio.Task] = None
+        self._poll_task: Optional[asyncio.Task] = None
+
+    async def start(self, models: List[str]) -> None:
+        """Start preloading models in the background and begin polling.
+
+        Readiness stays False until the preload has finished, so health
+        checks fail instead of routing traffic to a cold instance.
+
+        Args:
+            models: Models to load on every healthy backend that has them
+        """
+        self.ready = not models
+        if models:
+            self._preload_task = asyncio.create_task(self._preload_all(models))
+        if self._poll_task is None and self.poll_interval > 0:
+            self._poll_task = asyncio.create_task(self._poll_loop())
+
+    async def close(self) -> None:
+        """Stop background preloading and polling."""
+        for task in (self._preload_task, self._poll_task):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._preload_task = None
+        self._poll_task = None
+
+    async def preload(self, backend: OllamaBackend, model: str) -> bool:
+        """Load a model on a backend without generating anything.
+
+        Args:
+            backend: Backend to load the model on
+            model: Model name
+
+        Returns:
+            True if the model was loaded, False otherwise
+        """
+        payload: Dict[str, Any] = {"model": model, "prompt": "", "stream": False}
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        try:
+            response = await self.client.post(f"{backend.base_url}/api/generate", json=payload)
+            response.raise_for_status()
+        except Exception as e:
+            logger.warning(f"Failed to preload {model} on {backend.base_url}: {e}")
+            return False
+        backend.resident_models.add(normalize_model_name(model))
+        logger.info(f"Preloaded {model} on {backend.base_url}")
+        return True
+
+    async def _preload_all(self, models: List[str]) -> None:
+        """Preload every model on every healthy backend that has it."""
+        try:
+            await asyncio.gather(*(
+                self.preload(backend, model)
+                for model in models
+                for backend in self.pool.healthy_backends()
+                if backend.has_model(model)
+            ))
+            await self.poll()
+        finally:
+            self.ready = True
+
+    async def poll_backend(self, backend: OllamaBackend) -> None:
+        """Refresh a backend's resident models from /api/ps.
+
+        Args:
+            backend: Backend to poll
+        """
+        try:
+            response = await self.client.get(f"{backend.base_url}/api/ps")
+            response.raise_for_status()
+            running = response.json().get("models", [])
+        except Exception as e:
+            logger.debug(f"Failed to poll running models on {backend.base_url}: {e}")
+            return
+        resident: Set[str] = set()
+        for entry in running:
+            name = normalize_model_name(entry.get("name") or entry.get("model", ""))
+            resident.add(name)
+            self._details.setdefault(name, {})[backend.base_url] = {
+                "expires_at": entry.get("expires_at"),
+                "size_vram": entry.get("size_vram"),
+            }
+        for name, backends in list(self._details.items()):
+            if name not in resident:
+                backends.pop(backend.base_url, None)
+                if not backends:
+                    del self._details[name]
+        backend.resident_models = resident
+
+    async def poll(self) -> None:
+        """Poll every healthy backend concurrently."""
+        await asyncio.gather(*(self.poll_backend(backend) for backend in self.pool.healthy_backends()))
+
+    async def _poll_loop(self) -> None:
+        """Periodically refresh the resident model set."""
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.poll()
+            except Exception as e:
+                logger.error(f"Model residency poll loop failed: {e}")
+
+    def is_resident(self, model: str) -> bool:
+        """Check whether a model is loaded on any healthy backend.
+
+        Args:
+            model: Model name
+
+        Returns:
+            True if the model is resident somewhere
+        """
+        name = normalize_model_name(model)
+        return any(name in backend.resident_models for backend in self.pool.healthy_backends())
+
+    def resident_models(self) -> List[str]:
+        """Return the models loaded on at least one healthy backend."""
+        models: Set[str] = set()
+        for backend in self.pool.healthy_backends():
+            models.update(backend.resident_models)
+        return sorted(models)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return residency details for reporting.
+
+        Returns:
+            Dictionary keyed by resident model name, with per-backend details
+        """
+        resident = self.resident_models()
+        return {
+            model: {
+                "backends": [
+                    {"base_url": backend.base_url, **self._details.get(model, {}).get(backend.base_url, {})}
+                    for backend in self.pool.healthy_backends()
+                    if model in backend.resident_models
+                ]
+            }
+            for model in resident
+        }
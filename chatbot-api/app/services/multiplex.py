@@ -0,0 +1,247 @@
+"""Multiplexed chat streams over a single WebSocket connection."""
+
+import asyncio
+import logging
+from typing import Any, Dict, Optional, Union
+import orjson
+from pydantic import ValidationError
+from starlette.websockets import WebSocket, WebSocketDisconnect
+from app.models import ChatRequest
+from app.services.admission import AdmissionRejected
+from app.services.chat_service import ChatService
+from app.services.ollama_pool import NoBackendAvailableError
+
+
+logger = logging.getLogger(__name__)
+
+
+class _Stream:
+    """One generation on a multiplexed connection and its send credits."""
+
+    __slots__ = ("stream_id", "credits", "granted", "task")
+
+    def __init__(self, stream_id: str, credits: int):
+        self.stream_id = stream_id
+        self.credits = credits
+        self.granted = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    def grant(self, credits: int) -> None:
+        """Add send credits, waking the stream if it was blocked."""
+        self.credits += credits
+        if self.credits > 0:
+            self.granted.set()
+
+    async def take(self, timeout: Optional[float] = None) -> None:
+        """Spend one credit, waiting for the client to grant more if none are left.
+
+        Args:
+            timeout: Seconds to wait for a grant (None waits forever)
+
+        Raises:
+            asyncio.TimeoutError: If no credits were granted in time
+        """
+        while self.credits <= 0:
+            self.granted.clear()
+            await asyncio.wait_for(self.granted.wait(), timeout)
+        self.credits -= 1
+
+
+def _positive_credits(value: Any) -> int:
+    """Parse a credit count from a frame, which must be a positive integer."""
+    credits = int(value)
+    if credits <= 0:
+        raise ValueError("credits must be a positive integer")
+    return credits
+
+
+class ChatMultiplexer:
+    """Serves many concurrent chat streams over one WebSocket.
+
+    Client frames are JSON objects with a ``type`` and a client-chosen
+    stream ``id``:
+
+    - ``chat``: start a generation (``request`` holds the ``ChatRequest``,
+      plus optional ``conversation_id`` and initial ``credits``)
+    - ``cancel``: abort a generation, closing its upstream Ollama stream
+    - ``credit``: allow ``credits`` more chunk frames for a stream
+
+    Every ``chunk`` frame spends one credit; a stream with none left stops
+    reading from Ollama until the client grants more, so a slow client
+    applies backpressure instead of growing a server-side buffer. A stream
+    left without credits for ``credit_timeout`` seconds is ended with an
+    ``error`` frame, so it can't hold its admission slot indefinitely.
+    Control frames (``start``, ``queued``, ``done``, ``error``,
+    ``cancelled``) don't need credits.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        chat_service: ChatService,
+        initial_credits: int = 64,
+        max_streams: int = 16,
+        credit_timeout: float = 30.0
+    ):
+        """Initialize the multiplexer.
+
+        Args:
+            websocket: Accepted WebSocket connection
+            chat_service: Service generating the responses
+            initial_credits: Chunk frames a stream may send before the client grants more
+            max_streams: Concurrent streams allowed on the connection
+            credit_timeout: Seconds a stream may wait for credits before it is ended (0 waits forever)
+        """
+        self.websocket = websocket
+        self.chat_service = chat_service
+        self.initial_credits = initial_credits
+        self.max_streams = max_streams
+        self.credit_timeout = credit_timeout if credit_timeout > 0 else None
+        self._streams: Dict[str, _Stream] = {}
+        self._send_lock = asyncio.Lock()
+        self._closed = False
+
+    async def run(self) -> None:
+        """Serve the connection until the client disconnects."""
+        try:
+            while True:
+                message = await self.websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                await self._handle(message.get("text") or message.get("bytes") or b"")
+        except WebSocketDisconnect:
+            pass
+        finally:
+            self._closed = True
+            tasks = [stream.task for stream in self._streams.values() if stream.task is not None]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _send(self, frame: Dict[str, Any]) -> None:
+        """Send one frame; streams take turns on the shared connection."""
+        async with self._send_lock:
+            await self.websocket.send_text(orjson.dumps(frame).decode("utf-8"))
+
+    async def _handle(self, raw: Union[str, bytes]) -> None:
+        """Dispatch one client frame."""
+        try:
+            frame = orjson.loads(raw)
+        except orjson.JSONDecodeError as e:
+            await self._send({"type": "error", "id": None, "error": f"Invalid frame: {e}"})
+            return
+        if not isinstance(frame, dict):
+            await self._send({"type": "error", "id": None, "error": "Frames must be JSON objects"})
+            return
+
+        kind = frame.get("type")
+        stream_id = frame.get("id")
+        if kind == "chat":
+            await self._start(stream_id, frame)
+            return
+        if kind == "ping":
+            await self._send({"type": "pong", "id": stream_id})
+            return
+        stream = self._streams.get(stream_id)
+        if kind == "cancel":
+            if stream is not None and stream.task is not None:
+                stream.task.cancel()
+        elif kind == "credit":
+            if stream is not None:
+                try:
+                    stream.grant(_positive_credits(frame.get("credits")))
+                except (TypeError, ValueError):
+                    await self._send({
+                        "type": "error", "id": stream_id, "error": "credits must be a positive integer"
+                    })
+        else:
+            await self._send({"type": "error", "id": stream_id, "error": f"Unknown frame type: {kind}"})
+
+    async def _start(self, stream_id: Any, frame: Dict[str, Any]) -> None:
+        """Validate a chat frame and start its generation."""
+        if not isinstance(stream_id, str) or not stream_id:
+            await self._send({"type": "error", "id": stream_id, "error": "chat frames need a string id"})
+            return
+        if stream_id in self._streams:
+            await self._send({"type": "error", "id": stream_id, "error": "Stream id already in use"})
+            return
+        if len(self._streams) >= self.max_streams:
+            await self._send({
+                "type": "error", "id": stream_id, "status": 429,
+                "error": f"At most {self.max_streams} concurrent streams per connection"
+            })
+            return
+        try:
+            request = ChatRequest.model_validate(frame.get("request") or {})
+            credits = _positive_credits(frame.get("credits", self.initial_credits))
+        except (ValidationError, TypeError, ValueError) as e:
+            await self._send({"type": "error", "id": stream_id, "status": 422, "error": str(e)})
+            return
+
+        stream = _Stream(stream_id, credits)
+        self._streams[stream_id] = stream
+        stream.task = asyncio.create_task(self._generate(stream, request, frame.get("conversation_id")))
+
+    async def _generate(self, stream: _Stream, request: ChatRequest, conversation_id: Optional[str]) -> None:
+        """Run one generation through the same ChatService path as SSE."""
+        stream_id = stream.stream_id
+        try:
+            try:
+                self.chat_service.check_admission(request)
+                self.chat_service.check_upstream(request)
+            except AdmissionRejected as e:
+                await self._send({
+                    "type": "error", "id": stream_id, "status": 429,
+                    "error": str(e), "retry_after": e.retry_after
+                })
+                return
+            except NoBackendAvailableError as e:
+                await self._send({
+                    "type": "error", "id": stream_id, "status": 503,
+                    "error": str(e), "retry_after": e.retry_after
+                })
+                return
+
+            conv_id = await self.chat_service.process_chat_request(request, conversation_id)
+            await self._send({"type": "start", "id": stream_id, "conversation_id": conv_id})
+            chunks = self.chat_service.generate_streaming_response(request, conv_id)
+            try:
+                async for chunk in chunks:
+                    if chunk.is_complete:
+                        if chunk.content:
+                            await self._send({"type": "error", "id": stream_id, "error": chunk.content})
+                        else:
+                            await self._send({
+                                "type": "done", "id": stream_id,
+                                "conversation_id": conv_id, "model": chunk.model,
+                                "usage": chunk.usage.model_dump() if chunk.usage is not None else None,
+                                "timing": chunk.timing.model_dump() if chunk.timing is not None else None
+                            })
+                        break
+                    if chunk.queue_position is not None:
+                        await self._send({"type": "queued", "id": stream_id, "position": chunk.queue_position})
+                        continue
+                    # Out of credits: stop pulling from Ollama until the client catches up
+                    await stream.take(self.credit_timeout)
+                    await self._send({"type": "chunk", "id": stream_id, "content": chunk.content})
+            finally:
+                await chunks.aclose()
+        except asyncio.CancelledError:
+            if self._closed:
+                raise
+            logger.info(f"Stream {stream_id} cancelled by client")
+            await self._send({"type": "cancelled", "id": stream_id})
+        except asyncio.TimeoutError:
+            logger.info(f"Stream {stream_id} ended after waiting {self.credit_timeout:g}s for credits")
+            await self._send({
+                "type": "error", "id": stream_id, "status": 408,
+                "error": f"No credits granted for {self.credit_timeout:g}s"
+            })
+        except WebSocketDisconnect:
+            pass
+        except Exception as e:
+            logger.error(f"Error in multiplexed stream {stream_id}: {e}")
+            if not self._closed:
+                await self._send({"type": "error", "id": stream_id, "error": str(e)})
+        finally:
+            self._streams.pop(stream_id, None)
@@ -0,0 +1,304 @@
+"""Pool of Ollama backends with least-outstanding-requests routing."""
+
+import asyncio
+import logging
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Iterable, List, Optional, Set
+import httpx
+from app.services.circuit_breaker import CircuitBreaker
+
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_model_name(name: str) -> str:
+    """Normalize a model name the way Ollama resolves it.
+
+    Args:
+        name: Model name, with or without a tag
+
+    Returns:
+        Model name including its tag (``:latest`` when none is given)
+    """
+    return name if ":" in name else f"{name}:latest"
+
+
+class NoBackendAvailableError(Exception):
+    """Raised when no Ollama backend can serve a request."""
+
+    def __init__(self, message: str, retry_after: int = 5):
+        """Initialize the error.
+
+        Args:
+            message: Error message
+            retry_after: Suggested seconds before retrying
+        """
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class OllamaBackend:
+    """State tracked for a single Ollama host."""
+
+    def __init__(self, base_url: str, breaker: Optional[CircuitBreaker] = None):
+        """Initialize the backend.
+
+        Args:
+            base_url: Base URL of the Ollama API
+            breaker: Circuit breaker guarding the backend
+        """
+        self.base_url = base_url
+        self.breaker = breaker or CircuitBreaker(base_url)
+        self.in_flight = 0
+        self.models: Set[str] = set()
+        # Models currently loaded in memory, as last reported by /api/ps
+        self.resident_models: Set[str] = set()
+        self.healthy = True
+        self.last_error: Optional[str] = None
+
+    def has_model(self, model: str) -> bool:
+        """Check whether the backend can serve a model.
+
+        Backends whose model list has not been probed yet are assumed to
+        have every model, so routing works before the first probe completes.
+
+        Args:
+            model: Model name
+
+        Returns:
+            True if the model is available (or unknown), False otherwise
+        """
+        return not self.models or normalize_model_name(model) in self.models
+
+    def __repr__(self) -> str:
+        return f"OllamaBackend({self.base_url!r}, in_flight={self.in_flight}, healthy={self.healthy})"
+
+
+class OllamaPool:
+    """Routes requests across Ollama backends and keeps their state fresh."""
+
+    def __init__(
+        self,
+        base_urls: List[str],
+        client: httpx.AsyncClient,
+        probe_interval: float = 15.0,
+        probe_jitter: float = 0.2,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        slow_ttft: float = 0.0
+    ):
+        """Initialize the pool.
+
+        Args:
+            base_urls: Base URLs of the Ollama backends
+            client: Shared HTTP client used for probes
+            probe_interval: Seconds between background probes
+            probe_jitter: Random fraction added to or removed from each interval
+            failure_threshold: Consecutive failures that open a backend's circuit (0 disables)
+            reset_timeout: Seconds an open circuit waits before a trial request
+            slow_ttft: Time to first token counted as a failure (0 disables)
+        """
+        if not base_urls:
+            raise ValueError("At least one Ollama base URL is required")
+        self.backends = [
+            OllamaBackend(url, CircuitBreaker(url, failure_threshold, reset_timeout, slow_ttft))
+            for url in base_urls
+        ]
+        self.client = client
+        self.probe_interval = probe_interval
+        self.probe_jitter = probe_jitter
+        # Wall-clock time of the last completed refresh, None before the first one
+        self.last_refresh: Optional[float] = None
+        self._probe_task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Probe all backends once and start the background probe loop."""
+        await self.refresh()
+        if self._probe_task is None and self.probe_interval > 0:
+            self._probe_task = asyncio.create_task(self._probe_loop())
+
+    async def close(self) -> None:
+        """Stop the background probe loop."""
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            try:
+                await self._probe_task
+            except asyncio.CancelledError:
+                pass
+            self._probe_task = None
+
+    async def probe(self, backend: OllamaBackend) -> bool:
+        """Probe a backend and refresh its model list.
+
+        Args:
+            backend: Backend to probe
+
+        Returns:
+            True if the backend is healthy, False otherwise
+        """
+        try:
+            response = await self.client.get(f"{backend.base_url}/api/tags")
+            response.raise_for_status()
+            data = response.json()
+            backend.models = {
+                normalize_model_name(model["name"]) for model in data.get("models", [])
+            }
+            if not backend.healthy:
+                logger.info(f"Ollama backend {backend.base_url} is back online")
+            backend.healthy = True
+            backend.last_error = None
+        except Exception as e:
+            if backend.healthy:
+                logger.warning(f"Ollama backend {backend.base_url} failed probe: {e}")
+            backend.healthy = False
+            backend.last_error = str(e)
+        return backend.healthy
+
+    async def refresh(self) -> None:
+        """Probe every backend concurrently."""
+        await asyncio.gather(*(self.probe(backend) for backend in self.backends))
+        self.last_refresh = time.time()
+
+    @property
+    def refreshing(self) -> bool:
+        """Whether backend state is kept fresh by the background probe loop."""
+        return self._probe_task is not None and not self._probe_task.done()
+
+    async def _probe_loop(self) -> None:
+        """Periodically re-probe ejected backends and refresh model lists."""
+        while True:
+            # Jitter keeps replicas from probing shared backends in lockstep
+            jitter = random.uniform(-self.probe_jitter, self.probe_jitter)
+            await asyncio.sleep(self.probe_interval * (1 + jitter))
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"Ollama backend probe loop failed: {e}")
+
+    def eject(self, backend: OllamaBackend, error: Exception) -> None:
+        """Take a backend out of rotation until the next successful probe.
+
+        Args:
+            backend: Backend that failed
+            error: Error that caused the ejection
+        """
+        if backend.healthy:
+            logger.warning(f"Ejecting Ollama backend {backend.base_url}: {error}")
+        backend.healthy = False
+        backend.last_error = str(error)
+
+    def healthy_backends(self) -> List[OllamaBackend]:
+        """Return the backends currently in rotation."""
+        return [backend for backend in self.backends if backend.healthy]
+
+    def available_models(self) -> List[str]:
+        """Return the models available on at least one healthy backend."""
+        models: Set[str] = set()
+        for backend in self.healthy_backends():
+            models.update(backend.models)
+        return sorted(models)
+
+    def select(self, model: str, exclude: Iterable[OllamaBackend] = ()) -> OllamaBackend:
+        """Pick the least-loaded healthy backend that has a model.
+
+        Ties go to a backend that already has the model loaded. Backends
+        whose circuit is open are skipped.
+
+        Args:
+            model: Model the request will run on
+            exclude: Backends not to pick (e.g. ones already tried)
+
+        Returns:
+            Selected backend
+
+        Raises:
+            NoBackendAvailableError: If every backend is ejected, excluded or open
+        """
+        healthy = [backend for backend in self.healthy_backends() if backend not in exclude]
+        if not healthy:
+            raise NoBackendAvailableError("No Ollama backend is available")
+        # Fall back to any healthy backend so Ollama reports the missing model itself
+        candidates = [backend for backend in healthy if backend.has_model(model)] or healthy
+        closed = [backend for backend in candidates if backend.breaker.available()]
+        if not closed:
+            raise NoBackendAvailableError(
+                "Every Ollama backend for this model is failing, try again later",
+                retry_after=min(backend.breaker.retry_after() for backend in candidates)
+            )
+        name = normalize_model_name(model)
+        return min(
+            closed,
+            key=lambda backend: (backend.in_flight, name not in backend.resident_models)
+        )
+
+    def has_alternative(self, model: str, exclude: Iterable[OllamaBackend]) -> bool:
+        """Check whether another backend could take a request for a model.
+
+        Args:
+            model: Model the request will run on
+            exclude: Backends already in use for the request
+
+        Returns:
+            True if ``select`` would succeed
+        """
+        try:
+            self.select(model, exclude)
+        except NoBackendAvailableError:
+            return False
+        return True
+
+    @asynccontextmanager
+    async def lease(
+        self,
+        model: str,
+        exclude: Iterable[OllamaBackend] = (),
+        track_ttft: bool = False
+    ) -> AsyncIterator[OllamaBackend]:
+        """Reserve a backend for the duration of a request.
+
+        Transport errors and 5xx responses count against the backend's
+        circuit breaker. Only a refused or failed connection ejects it right
+        away: a read timeout on one long generation says little about the
+        host, so the breaker decides after repeated failures instead.
+
+        Args:
+            model: Model the request will run on
+            exclude: Backends not to pick
+            track_ttft: The caller reports success through ``record_ttft``
+                instead of the lease recording it on exit
+
+        Yields:
+            Selected backend
+        """
+        backend = self.select(model, exclude)
+        trial = backend.breaker.begin()
+        backend.in_flight += 1
+        try:
+            yield backend
+        except httpx.TransportError as e:
+            if isinstance(e, httpx.ConnectError):
+                self.eject(backend, e)
+            backend.breaker.record_failure()
+            raise
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code >= 500:
+                backend.breaker.record_failure()
+            raise
+        else:
+            if not track_ttft:
+                backend.breaker.record_success()
+        finally:
+            backend.in_flight -= 1
+            if trial:
+                backend.breaker.end_trial()
+
+    def record_ttft(self, backend: OllamaBackend, seconds: float) -> None:
+        """Report a leased request's time to first token to its circuit breaker.
+
+        Args:
+            backend: Backend the request ran on
+            seconds: Time to first token
+        """
+        backend.breaker.record_ttft(seconds)
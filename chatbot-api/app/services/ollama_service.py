@@ -1,11 +1,20 @@
 """Service for interacting with Ollama API."""
 
-import json
 import logging
-from typing import AsyncGenerator, Dict, Any, List, Optional
+import time
+from typing import AsyncGenerator, Dict, Any, List, Optional, Tuple
 import httpx
+import orjson
 from app.config import settings
-from app.models import ChatMessage
+from app.models import ChatMessage, GenerationResult
+from app.services.hedging import TtftTracker, hedged_stream
+from app.services.metrics import metrics
+from app.services.model_residency import ModelResidencyManager
+from app.services.ollama_pool import OllamaBackend, OllamaPool
+from app.services.prompt_builder import build_prompt
+from app.services.response_cache import ResponseCache
+from app.services.timing import StageTimer
+from app.services.streaming import iter_ndjson
 
 
 logger = logging.getLogger(__name__)
@@ -18,30 +27,73 @@ class OllamaService:
         """Initialize the Ollama service.
         
         Args:
-            base_url: Base URL for Ollama API
+            base_url: Base URL for Ollama API (comma-separated for several backends)
             model: Default model to use
         """
-        self.base_url = base_url or settings.ollama_base_url
+        self.base_urls = settings.parse_base_urls(base_url or settings.ollama_base_url)
+        self.base_url = self.base_urls[0]
         self.model = model or settings.ollama_model
-        self.client = httpx.AsyncClient(timeout=120.0)
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(120.0, connect=settings.ollama_connect_timeout)
+        )
+        self.pool = OllamaPool(
+            self.base_urls,
+            self.client,
+            probe_interval=settings.ollama_probe_interval,
+            probe_jitter=settings.ollama_probe_jitter,
+            failure_threshold=settings.circuit_failure_threshold,
+            reset_timeout=settings.circuit_reset_timeout,
+            slow_ttft=settings.circuit_slow_ttft
+        )
+        self.ttft = TtftTracker()
+        self.residency = ModelResidencyManager(
+            self.pool,
+            self.client,
+            keep_alive=settings.ollama_keep_alive,
+            poll_interval=settings.residency_poll_interval
+        )
+        self._context_lengths: Dict[str, Optional[int]] = {}
+        self.response_cache = ResponseCache(
+            max_entries=settings.response_cache_max_entries,
+            max_bytes=settings.response_cache_max_bytes,
+            ttl=settings.response_cache_ttl
+        )
         
     async def __aenter__(self):
         """Async context manager entry."""
+        await self.pool.start()
+        await self.residency.start(settings.preload_models() if settings.ollama_preload else [])
         return self
         
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Async context manager exit."""
+        await self.residency.close()
+        await self.pool.close()
         await self.client.aclose()
     
+    async def _ensure_snapshot(self) -> None:
+        """Probe backends inline only when no background refresh is running."""
+        if not self.pool.refreshing or self.pool.last_refresh is None:
+            await self.pool.refresh()
+    
+    @property
+    def last_refresh(self) -> Optional[float]:
+        """Wall-clock time the backend snapshot was last refreshed."""
+        return self.pool.last_refresh
+    
     async def health_check(self) -> bool:
         """Check if Ollama service is healthy.
         
+        Served from the background-refreshed backend snapshot, so it does
+        not wait on Ollama while the probe loop is running.
+        
         Returns:
-            True if service is healthy, False otherwise
+            True if at least one backend is healthy and startup preloading
+            has finished, False otherwise
         """
         try:
-            response = await self.client.get(f"{self.base_url}/api/tags")
-            return response.status_code == 200
+            await self._ensure_snapshot()
+            return bool(self.pool.healthy_backends()) and self.residency.ready
         except Exception as e:
             logger.error(f"Health check failed: {e}")
             return False
@@ -49,44 +101,256 @@ class OllamaService:
     async def list_models(self) -> List[str]:
         """List available models from Ollama.
         
+        Served from the background-refreshed backend snapshot.
+        
         Returns:
-            List of available model names
+            List of model names available on at least one healthy backend
         """
         try:
-            response = await self.client.get(f"{self.base_url}/api/tags")
-            response.raise_for_status()
-            data = response.json()
-            return [model["name"] for model in data.get("models", [])]
+            await self._ensure_snapshot()
+            return self.pool.available_models()
         except Exception as e:
             logger.error(f"Failed to list models: {e}")
             return []
     
-    def _build_prompt(self, message: str, conversation_history: List[ChatMessage]) -> str:
+    async def get_context_length(self, model: str) -> Optional[int]:
+        """Get a model's context length from its Ollama metadata.
+        
+        Results are cached per model; failures are not cached so a later
+        call can retry once the model is available.
+        
+        Args:
+            model: Model name
+            
+        Returns:
+            Context length in tokens, or None if unknown
+        """
+        if model in self._context_lengths:
+            return self._context_lengths[model]
+        try:
+            async with self.pool.lease(model) as backend:
+                response = await self.client.post(
+                    f"{backend.base_url}/api/show",
+                    json={"model": model}
+                )
+                response.raise_for_status()
+                data = response.json()
+        except Exception as e:
+            logger.warning(f"Failed to get context length for {model}: {e}")
+            return None
+        
+        context_length = None
+        for key, value in data.get("model_info", {}).items():
+            if key.endswith(".context_length"):
+                context_length = int(value)
+                break
+        # An explicit num_ctx parameter in the Modelfile overrides the architecture limit
+        for line in data.get("parameters", "").splitlines():
+            parts = line.split()
+            if len(parts) == 2 and parts[0] == "num_ctx":
+                context_length = int(parts[1])
+        self._context_lengths[model] = context_length
+        return context_length
+    
+    async def embed(self, text: str, model: str) -> List[float]:
+        """Compute an embedding for a piece of text.
+        
+        Args:
+            text: Text to embed
+            model: Embedding model to use
+            
+        Returns:
+            Embedding vector
+        """
+        async with self.pool.lease(model) as backend:
+            response = await self.client.post(
+                f"{backend.base_url}/api/embeddings",
+                json=self._with_keep_alive({"model": model, "prompt": text})
+            )
+            response.raise_for_status()
+            return response.json()["embedding"]
+    
+    def _with_keep_alive(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Add the configured keep_alive to a request payload."""
+        if self.residency.keep_alive is not None:
+            payload["keep_alive"] = self.residency.keep_alive
+        return payload
+    
+    def _build_prompt(
+        self,
+        message: str,
+        conversation_history: List[ChatMessage],
+        prefix: Optional[str] = None
+    ) -> str:
         """Build a prompt from the message and conversation history.
         
         Args:
             message: The current user message
             conversation_history: Previous messages in the conversation
+            prefix: Pre-serialized history to use instead of formatting it again
             
         Returns:
             Formatted prompt string
         """
-        prompt_parts = []
+        return build_prompt(message, conversation_history, prefix)
+    
+    def _prepare_generation(
+        self,
+        message: str,
+        conversation_history: Optional[List[ChatMessage]],
+        model: Optional[str],
+        temperature: float,
+        max_tokens: Optional[int],
+        context: Optional[List[int]],
+        use_cache: Optional[bool],
+        prompt_prefix: Optional[str],
+        stream: bool
+    ) -> Tuple[str, Dict[str, Any], Optional[str]]:
+        """Build the /api/generate payload and response cache key for a request.
+        
+        Args:
+            message: The user's message
+            conversation_history: Previous messages in the conversation
+            model: Model to use (defaults to configured model)
+            temperature: Sampling temperature
+            max_tokens: Maximum tokens to generate
+            context: Context array returned by a previous generation
+            use_cache: Force the response cache on or off (defaults to temperature == 0)
+            prompt_prefix: Pre-serialized ``conversation_history``, if already available
+            stream: Whether Ollama should stream the response
+            
+        Returns:
+            Tuple of (model, payload, cache key or None if caching is off)
+        """
+        # Use provided model or default
+        selected_model = model or self.model
+        conversation_history = conversation_history or []
+        
+        # Build the prompt (the cached context already holds the history)
+        if context:
+            prompt = self._build_prompt(message, [])
+        else:
+            prompt = self._build_prompt(message, conversation_history, prompt_prefix)
+        
+        # Prepare the request payload
+        payload = {
+            "model": selected_model,
+            "prompt": prompt,
+            "stream": stream,
+            "options": {
+                "temperature": temperature
+            }
+        }
+        
+        if max_tokens:
+            payload["options"]["num_predict"] = max_tokens
         
-        # Add conversation history
-        for msg in conversation_history:
-            if msg.role == "user":
-                prompt_parts.append(f"Human: {msg.content}")
-            elif msg.role == "assistant":
-                prompt_parts.append(f"Assistant: {msg.content}")
-            elif msg.role == "system":
-                prompt_parts.append(f"System: {msg.content}")
+        if context:
+            payload["context"] = context
         
-        # Add current message
-        prompt_parts.append(f"Human: {message}")
-        prompt_parts.append("Assistant:")
+        self._with_keep_alive(payload)
         
-        return "\n\n".join(prompt_parts)
+        # Repeated deterministic prompts can be served from the response cache
+        cache_key = None
+        if use_cache is None:
+            use_cache = temperature == 0
+        if use_cache and self.response_cache.enabled:
+            full_prompt = self._build_prompt(message, conversation_history) if context else prompt
+            cache_key = self.response_cache.make_key(
+                selected_model, full_prompt, payload["options"]
+            )
+        return selected_model, payload, cache_key
+    
+    def check_available(self, model: str) -> None:
+        """Fail fast when no backend can take a request for a model.
+        
+        Args:
+            model: Model the request will run on
+            
+        Raises:
+            NoBackendAvailableError: If every backend is ejected or its circuit is open
+        """
+        self.pool.select(model)
+    
+    def _hedge_delay(self, model: str) -> Optional[float]:
+        """Get how long to wait for a first token before hedging, or None to not hedge."""
+        if not settings.ollama_hedge_enabled or len(self.pool.backends) < 2:
+            return None
+        delay = self.ttft.percentile(
+            model, settings.ollama_hedge_percentile, settings.ollama_hedge_min_samples
+        )
+        if delay is None:
+            return None
+        return max(delay, settings.ollama_hedge_min_delay)
+    
+    async def _stream_generate(
+        self,
+        model: str,
+        payload: Dict[str, Any],
+        claimed: List[OllamaBackend],
+        timer: Optional[StageTimer] = None
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """Stream /api/generate chunks from one backend.
+        
+        Args:
+            model: Model the request runs on
+            payload: Request payload
+            claimed: Backends already used for this request; the selected one is appended
+            timer: Stage timer marked when the response headers arrive
+            
+        Yields:
+            Decoded NDJSON chunks
+        """
+        async with self.pool.lease(model, exclude=claimed, track_ttft=True) as backend:
+            claimed.append(backend)
+            started = time.monotonic()
+            async with self.client.stream(
+                "POST",
+                f"{backend.base_url}/api/generate",
+                json=payload,
+                headers={"Content-Type": "application/json"}
+            ) as response:
+                if response.is_error:
+                    # Read the body so the error can be logged
+                    await response.aread()
+                response.raise_for_status()
+                if timer is not None:
+                    timer.mark("connect")
+                
+                first = True
+                async for chunk_data in iter_ndjson(response.aiter_bytes()):
+                    if first:
+                        first = False
+                        ttft = time.monotonic() - started
+                        self.pool.record_ttft(backend, ttft)
+                        self.ttft.record(model, ttft)
+                    yield chunk_data
+    
+    def _generate_chunks(
+        self,
+        model: str,
+        payload: Dict[str, Any],
+        timer: Optional[StageTimer] = None
+    ) -> AsyncGenerator[Dict[str, Any], None]:
+        """Stream /api/generate chunks, hedged across backends when enabled.
+        
+        Args:
+            model: Model the request runs on
+            payload: Request payload
+            timer: Stage timer marked when the first backend starts responding
+            
+        Returns:
+            Stream of decoded NDJSON chunks
+        """
+        claimed: List[OllamaBackend] = []
+        delay = self._hedge_delay(model)
+        if delay is None:
+            return self._stream_generate(model, payload, claimed, timer)
+        return hedged_stream(
+            lambda: self._stream_generate(model, payload, claimed, timer),
+            delay,
+            lambda: self.pool.has_alternative(model, claimed)
+        )
     
     async def generate_response(
         self,
@@ -94,74 +358,82 @@ class OllamaService:
         conversation_history: Optional[List[ChatMessage]] = None,
         model: Optional[str] = None,
         temperature: float = 0.7,
-        max_tokens: Optional[int] = None
+        max_tokens: Optional[int] = None,
+        context: Optional[List[int]] = None,
+        final_chunk: Optional[Dict[str, Any]] = None,
+        use_cache: Optional[bool] = None,
+        prompt_prefix: Optional[str] = None,
+        timer: Optional[StageTimer] = None
     ) -> AsyncGenerator[str, None]:
         """Generate a streaming response from Ollama.
         
+        When ``context`` is given it must cover ``conversation_history``; only
+        the new turn is then sent and Ollama resumes from the cached state.
+        Deterministic (temperature 0) requests are served from the response
+        cache when possible, unless ``use_cache`` says otherwise.
+        
         Args:
             message: The user's message
             conversation_history: Previous messages in the conversation
             model: Model to use (defaults to configured model)
             temperature: Sampling temperature
             max_tokens: Maximum tokens to generate
+            context: Context array returned by a previous generation
+            final_chunk: Optional dict updated with Ollama's final ``done`` chunk
+            use_cache: Force the response cache on or off (defaults to temperature == 0)
+            prompt_prefix: Pre-serialized ``conversation_history``, if already available
+            timer: Stage timer marked when Ollama starts responding
             
         Yields:
             Response content chunks
         """
+        selected_model = model or self.model
         try:
-            # Use provided model or default
-            selected_model = model or self.model
-            conversation_history = conversation_history or []
-            
-            # Build the prompt
-            prompt = self._build_prompt(message, conversation_history)
-            
-            # Prepare the request payload
-            payload = {
-                "model": selected_model,
-                "prompt": prompt,
-                "stream": True,
-                "options": {
-                    "temperature": temperature
-                }
-            }
+            selected_model, payload, cache_key = self._prepare_generation(
+                message, conversation_history, model, temperature, max_tokens,
+                context, use_cache, prompt_prefix, stream=True
+            )
             
-            if max_tokens:
-                payload["options"]["num_predict"] = max_tokens
+            if cache_key:
+                cached = self.response_cache.get(cache_key)
+                if cached is not None:
+                    logger.info(f"Serving cached response for model: {selected_model}")
+                    for piece in self.response_cache.split(cached):
+                        yield piece
+                    if final_chunk is not None:
+                        final_chunk.update({"model": selected_model, "done": True, "cached": True})
+                    return
             
             logger.info(f"Generating response with model: {selected_model}")
             
-            # Make the streaming request
-            async with self.client.stream(
-                "POST",
-                f"{self.base_url}/api/generate",
-                json=payload,
-                headers={"Content-Type": "application/json"}
-            ) as response:
-                response.raise_for_status()
-                
-                async for line in response.aiter_lines():
-                    if line.strip():
-                        try:
-                            chunk_data = json.loads(line)
-                            if "response" in chunk_data:
-                                content = chunk_data["response"]
-                                if content:  # Only yield non-empty content
-                                    yield content
-                                    
-                                # Check if this is the final chunk
-                                if chunk_data.get("done", False):
-                                    break
-                                    
-                        except json.JSONDecodeError as e:
-                            logger.warning(f"Failed to parse chunk: {line}, error: {e}")
-                            continue
+            # Stream from the least-loaded backend, hedging onto another if it is slow
+            chunks = self._generate_chunks(selected_model, payload, timer)
+            try:
+                response_parts = []
+                async for chunk_data in chunks:
+                    if "response" in chunk_data:
+                        content = chunk_data["response"]
+                        if content:  # Only yield non-empty content
+                            response_parts.append(content)
+                            yield content
                             
+                        # Check if this is the final chunk
+                        if chunk_data.get("done", False):
+                            if final_chunk is not None:
+                                final_chunk.update(chunk_data)
+                            if cache_key:
+                                self.response_cache.put(cache_key, "".join(response_parts))
+                            break
+            finally:
+                await chunks.aclose()
+            
         except httpx.HTTPStatusError as e:
             logger.error(f"HTTP error from Ollama: {e.response.status_code} - {e.response.text}")
+            metrics.upstream_errors.inc(selected_model, f"http_{e.response.status_code}")
             yield f"Error: Failed to generate response (HTTP {e.response.status_code})"
         except Exception as e:
             logger.error(f"Error generating response: {e}")
+            metrics.upstream_errors.inc(selected_model, type(e).__name__)
             yield f"Error: {str(e)}"
     
     async def generate_complete_response(
@@ -170,23 +442,84 @@ class OllamaService:
         conversation_history: Optional[List[ChatMessage]] = None,
         model: Optional[str] = None,
         temperature: float = 0.7,
-        max_tokens: Optional[int] = None
-    ) -> str:
+        max_tokens: Optional[int] = None,
+        context: Optional[List[int]] = None,
+        final_chunk: Optional[Dict[str, Any]] = None,
+        use_cache: Optional[bool] = None,
+        prompt_prefix: Optional[str] = None
+    ) -> GenerationResult:
         """Generate a complete (non-streaming) response from Ollama.
         
+        Sends a single ``stream: false`` request and parses one response
+        body, so no per-token framing is paid. Caching, backend selection and
+        context reuse behave exactly as in ``generate_response``.
+        
         Args:
             message: The user's message
             conversation_history: Previous messages in the conversation
             model: Model to use (defaults to configured model)
             temperature: Sampling temperature
             max_tokens: Maximum tokens to generate
+            context: Context array returned by a previous generation
+            final_chunk: Optional dict updated with Ollama's response body (minus the text)
+            use_cache: Force the response cache on or off (defaults to temperature == 0)
+            prompt_prefix: Pre-serialized ``conversation_history``, if already available
             
         Returns:
-            Complete response content
+            Generated text with Ollama's evaluation statistics
         """
-        complete_response = ""
-        async for chunk in self.generate_response(
-            message, conversation_history, model, temperature, max_tokens
-        ):
-            complete_response += chunk
-        return complete_response.strip() 
\ No newline at end of file
+        selected_model = model or self.model
+        try:
+            selected_model, payload, cache_key = self._prepare_generation(
+                message, conversation_history, model, temperature, max_tokens,
+                context, use_cache, prompt_prefix, stream=False
+            )
+            
+            if cache_key:
+                cached = self.response_cache.get(cache_key)
+                if cached is not None:
+                    logger.info(f"Serving cached response for model: {selected_model}")
+                    if final_chunk is not None:
+                        final_chunk.update({"model": selected_model, "done": True, "cached": True})
+                    return GenerationResult(content=cached.strip(), model=selected_model, cached=True)
+            
+            logger.info(f"Generating complete response with model: {selected_model}")
+            
+            async with self.pool.lease(selected_model) as backend:
+                response = await self.client.post(
+                    f"{backend.base_url}/api/generate",
+                    json=payload,
+                    headers={"Content-Type": "application/json"}
+                )
+                response.raise_for_status()
+            data = orjson.loads(response.content)
+            
+        except httpx.HTTPStatusError as e:
+            logger.error(f"HTTP error from Ollama: {e.response.status_code} - {e.response.text}")
+            metrics.upstream_errors.inc(selected_model, f"http_{e.response.status_code}")
+            return GenerationResult(
+                content=f"Error: Failed to generate response (HTTP {e.response.status_code})",
+                model=selected_model,
+                error=f"HTTP {e.response.status_code}"
+            )
+        except Exception as e:
+            logger.error(f"Error generating response: {e}")
+            metrics.upstream_errors.inc(selected_model, type(e).__name__)
+            return GenerationResult(content=f"Error: {str(e)}", model=selected_model, error=str(e))
+        
+        content = data.pop("response", "")
+        if final_chunk is not None:
+            final_chunk.update(data)
+        if cache_key and data.get("done", False):
+            self.response_cache.put(cache_key, content)
+        
+        return GenerationResult(
+            content=content.strip(),
+            model=data.get("model", selected_model),
+            prompt_eval_count=data.get("prompt_eval_count"),
+            eval_count=data.get("eval_count"),
+            total_duration=data.get("total_duration"),
+            load_duration=data.get("load_duration"),
+            prompt_eval_duration=data.get("prompt_eval_duration"),
+            eval_duration=data.get("eval_duration")
+        )
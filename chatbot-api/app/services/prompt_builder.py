@@ -0,0 +1,163 @@
+"""Prompt formatting and per-conversation memoized prompt prefixes."""
+
+from collections import OrderedDict, deque
+from typing import Deque, List, Optional
+
+
+ROLE_PREFIXES = {
+    "user": "Human: ",
+    "assistant": "Assistant: ",
+    "system": "System: ",
+}
+SEPARATOR = "\n\n"
+
+
+def format_message(role: str, content: str) -> Optional[str]:
+    """Format a single message for the prompt.
+
+    Args:
+        role: Message role
+        content: Message content
+
+    Returns:
+        Formatted message, or None for roles that are not sent to the model
+    """
+    prefix = ROLE_PREFIXES.get(role)
+    if prefix is None:
+        return None
+    return prefix + content
+
+
+def build_prompt(message: str, conversation_history: List, prefix: Optional[str] = None) -> str:
+    """Build a prompt from the message and conversation history.
+
+    Args:
+        message: The current user message
+        conversation_history: Previous messages (ignored when ``prefix`` is given)
+        prefix: Pre-serialized history, as returned by ``PromptPrefixCache``
+
+    Returns:
+        Formatted prompt string
+    """
+    tail = f"Human: {message}{SEPARATOR}Assistant:"
+    if prefix is None:
+        parts = [format_message(msg.role, msg.content) for msg in conversation_history]
+        prefix = SEPARATOR.join(part for part in parts if part is not None)
+    if not prefix:
+        return tail
+    return prefix + SEPARATOR + tail
+
+
+class _PromptPrefix:
+    """Serialized history of one conversation and the messages it covers."""
+
+    __slots__ = ("text", "messages", "ends", "base")
+
+    def __init__(self):
+        self.text = ""
+        # Messages covered so far, and where each one ends in ``text``
+        # (offsets are absolute; ``base`` is the offset of the current start)
+        self.messages: Deque = deque()
+        self.ends: Deque[int] = deque()
+        self.base = 0
+
+    def drop_front(self, count: int) -> None:
+        """Forget the oldest ``count`` messages."""
+        for _ in range(count):
+            self.messages.popleft()
+            end = self.ends.popleft()
+        # Skipped roles add no text, so their offsets can lag behind the start
+        end = max(end, self.base)
+        text = self.text[end - self.base:]
+        if text.startswith(SEPARATOR):
+            text = text[len(SEPARATOR):]
+            end += len(SEPARATOR)
+        self.text = text
+        self.base = end
+
+    def append(self, message) -> None:
+        """Serialize one more message onto the end."""
+        part = format_message(message.role, message.content)
+        if part is not None:
+            if self.text:
+                self.text += SEPARATOR
+            self.text += part
+        self.messages.append(message)
+        self.ends.append(self.base + len(self.text))
+
+
+class PromptPrefixCache:
+    """Append-only serialized prompt prefixes, one per conversation.
+
+    A prefix is extended in place as new turns are stored and trimmed at the
+    front when the conversation's message cap drops old turns. Any other
+    change to the history (clearing, replacement) rebuilds it from scratch.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        """Initialize the prefix cache.
+
+        Args:
+            max_entries: Maximum number of conversations to keep prefixes for
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, _PromptPrefix]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, conversation_id: str, conversation_history: List) -> str:
+        """Get the serialized prefix for a conversation's stored history.
+
+        Args:
+            conversation_id: Conversation identifier
+            conversation_history: The conversation's stored messages, oldest first
+
+        Returns:
+            Serialized history, equivalent to formatting every message
+        """
+        entry = self._entries.get(conversation_id)
+        if entry is None or not self._align(entry, conversation_history):
+            entry = _PromptPrefix()
+            self._entries[conversation_id] = entry
+        self._entries.move_to_end(conversation_id)
+
+        for message in conversation_history[len(entry.messages):]:
+            entry.append(message)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry.text
+
+    @staticmethod
+    def _align(entry: _PromptPrefix, conversation_history: List) -> bool:
+        """Drop messages the history no longer has; False if it diverged."""
+        if not entry.messages:
+            return True
+        if not conversation_history:
+            return False
+
+        # Find where the history now starts within the covered messages
+        first = conversation_history[0]
+        dropped = 0
+        for message in entry.messages:
+            if message is first:
+                break
+            dropped += 1
+        else:
+            return False
+
+        covered = len(entry.messages) - dropped
+        if covered > len(conversation_history) or conversation_history[covered - 1] is not entry.messages[-1]:
+            return False
+        if dropped:
+            entry.drop_front(dropped)
+        return True
+
+    def invalidate(self, conversation_id: str) -> None:
+        """Forget a conversation's prefix.
+
+        Args:
+            conversation_id: Conversation identifier
+        """
+        self._entries.pop(conversation_id, None)
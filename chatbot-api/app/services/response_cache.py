@@ -0,0 +1,155 @@
+"""Exact-match response cache for deterministic generations."""
+
+import hashlib
+import json
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# Splits cached text into word-sized pieces so replays stream like live output
+_PIECE_PATTERN = re.compile(r"\s*\S+\s*|\s+")
+
+
+class ResponseCache:
+    """LRU + TTL cache of complete responses bounded by entries and bytes."""
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 16 * 1024 * 1024, ttl: float = 3600.0):
+        """Initialize the response cache.
+
+        Args:
+            max_entries: Maximum number of cached responses
+            max_bytes: Maximum total size of cached responses in bytes
+            ttl: Seconds a cached response stays valid (0 disables expiry)
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        # key -> (response, expires_at, size)
+        self._entries: "OrderedDict[str, Tuple[str, float, int]]" = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the cache stores anything at all."""
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def make_key(model: str, prompt: str, options: Dict[str, Any]) -> str:
+        """Build a cache key from the generation inputs.
+
+        Whitespace in the prompt is normalized so formatting-only
+        differences still hit the same entry.
+
+        Args:
+            model: Model name
+            prompt: Full prompt sent to the model
+            options: Generation options
+
+        Returns:
+            Cache key
+        """
+        normalized = " ".join(prompt.split())
+        hasher = hashlib.blake2b(digest_size=20)
+        hasher.update(model.encode("utf-8"))
+        hasher.update(b"\x00")
+        hasher.update(json.dumps(options, sort_keys=True).encode("utf-8"))
+        hasher.update(b"\x00")
+        hasher.update(normalized.encode("utf-8"))
+        return hasher.hexdigest()
+
+    @staticmethod
+    def split(response: str) -> List[str]:
+        """Split a cached response into stream-sized pieces.
+
+        Args:
+            response: Cached response text
+
+        Returns:
+            Pieces that concatenate back to the response
+        """
+        return _PIECE_PATTERN.findall(response)
+
+    def get(self, key: str) -> Optional[str]:
+        """Look up a cached response.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Cached response, or None on a miss
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        response, expires_at, _ = entry
+        if self.ttl > 0 and expires_at <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return response
+
+    def put(self, key: str, response: str) -> None:
+        """Store a response, evicting least-recently-used entries as needed.
+
+        Args:
+            key: Cache key
+            response: Complete response text
+        """
+        size = len(response.encode("utf-8"))
+        if not self.enabled or size > self.max_bytes:
+            return
+
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (response, time.monotonic() + self.ttl, size)
+        self.total_bytes += size
+
+        while len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        """Drop an entry and update the byte accounting."""
+        _, _, size = self._entries.pop(key)
+        self.total_bytes -= size
+
+    def clear(self) -> None:
+        """Drop all cached responses."""
+        self._entries.clear()
+        self.total_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache counters.
+
+        Returns:
+            Dictionary of cache size and hit/miss/eviction counters
+        """
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
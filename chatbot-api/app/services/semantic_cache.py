@@ -0,0 +1,242 @@
+"""Semantic response cache backed by an in-memory embedding matrix."""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticCache:
+    """Reuses answers for questions whose embeddings are close enough.
+
+    Embeddings are L2-normalized and stored in a preallocated matrix so a
+    lookup is a single matrix-vector product over the occupied rows. When
+    the matrix is full the least-recently-used row is overwritten.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 4096,
+        threshold: float = 0.92,
+        path: Optional[str] = None,
+        save_every: int = 0
+    ):
+        """Initialize the semantic cache.
+
+        Args:
+            capacity: Maximum number of cached answers
+            threshold: Minimum cosine similarity for a hit
+            path: Optional .npz file used to persist the index
+            save_every: Save in the background after this many inserts (0 = only on request)
+        """
+        self.capacity = capacity
+        self.threshold = threshold
+        self.path = path
+        self.save_every = save_every
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._size = 0
+        # Allocated on first insert, once the embedding dimension is known
+        self._vectors: Optional[np.ndarray] = None
+        self._last_used = np.zeros(capacity, dtype=np.float64)
+        self._model_ids = np.full(capacity, -1, dtype=np.int32)
+        self._models: List[str] = []
+        self._queries: List[Optional[str]] = [None] * capacity
+        self._answers: List[Optional[str]] = [None] * capacity
+        self._unsaved = 0
+        self._save_task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> Optional[np.ndarray]:
+        """Convert an embedding to a unit-length float32 vector."""
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        if vector.ndim != 1 or norm == 0.0:
+            return None
+        return vector / norm
+
+    def _model_id(self, model: str, create: bool = False) -> int:
+        """Map a model name to the small integer stored per row."""
+        try:
+            return self._models.index(model)
+        except ValueError:
+            if not create:
+                return -1
+            self._models.append(model)
+            return len(self._models) - 1
+
+    def lookup(self, model: str, embedding: List[float]) -> Optional[str]:
+        """Find a cached answer for a semantically similar question.
+
+        Args:
+            model: Model the answer must have been generated by
+            embedding: Embedding of the incoming question
+
+        Returns:
+            Cached answer, or None if nothing is similar enough
+        """
+        vector = self._normalize(embedding)
+        model_id = self._model_id(model)
+        if (
+            vector is None
+            or model_id < 0
+            or self._vectors is None
+            or vector.shape[0] != self._vectors.shape[1]
+        ):
+            self.misses += 1
+            return None
+
+        scores = self._vectors[:self._size] @ vector
+        scores[self._model_ids[:self._size] != model_id] = -1.0
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._last_used[best] = time.time()
+        return self._answers[best]
+
+    def insert(self, model: str, query: str, embedding: List[float], answer: str) -> None:
+        """Add an answer to the index, evicting the least-recently-used row if full.
+
+        Args:
+            model: Model that generated the answer
+            query: Question the answer responds to
+            embedding: Embedding of the question
+            answer: Generated answer
+        """
+        vector = self._normalize(embedding)
+        if vector is None or self.capacity <= 0:
+            return
+        if self._vectors is None:
+            self._vectors = np.zeros((self.capacity, vector.shape[0]), dtype=np.float32)
+        elif vector.shape[0] != self._vectors.shape[1]:
+            logger.warning("Ignoring embedding with mismatched dimension for semantic cache")
+            return
+
+        if self._size < self.capacity:
+            slot = self._size
+            self._size += 1
+        else:
+            slot = int(np.argmin(self._last_used[:self._size]))
+            self.evictions += 1
+
+        self._vectors[slot] = vector
+        self._last_used[slot] = time.time()
+        self._model_ids[slot] = self._model_id(model, create=True)
+        self._queries[slot] = query
+        self._answers[slot] = answer
+        self._unsaved += 1
+
+    def _snapshot(self) -> Dict[str, np.ndarray]:
+        """Copy the occupied rows so they can be written while inserts continue."""
+        self._unsaved = 0
+        meta = {
+            "models": list(self._models),
+            "queries": self._queries[:self._size],
+            "answers": self._answers[:self._size],
+        }
+        return {
+            "vectors": self._vectors[:self._size].copy(),
+            "last_used": self._last_used[:self._size].copy(),
+            "model_ids": self._model_ids[:self._size].copy(),
+            "meta": np.array(json.dumps(meta)),
+        }
+
+    def _write(self, snapshot: Dict[str, np.ndarray]) -> None:
+        """Write a snapshot to ``path``, atomically replacing any old file."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Worker processes share the path, so each writes its own temporary file
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **snapshot)
+        os.replace(tmp_path, self.path)
+        logger.info(f"Saved {len(snapshot['vectors'])} semantic cache entries to {self.path}")
+
+    def save(self) -> None:
+        """Persist the index to ``path`` (atomically replacing any old file)."""
+        if not self.path or self._vectors is None:
+            return
+        self._write(self._snapshot())
+
+    def save_soon(self) -> None:
+        """Save in a background thread once ``save_every`` answers were added since the last save.
+
+        Must be called from the event loop. At most one background save runs at a time.
+        """
+        if not self.path or self.save_every <= 0 or self._unsaved < self.save_every:
+            return
+        if self._save_task is not None and not self._save_task.done():
+            return
+        snapshot = self._snapshot()
+        self._save_task = asyncio.create_task(asyncio.to_thread(self._write, snapshot))
+        self._save_task.add_done_callback(self._log_save_error)
+
+    def _log_save_error(self, task: asyncio.Task) -> None:
+        """Report a failed background save (the next one retries)."""
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Failed to save semantic cache to {self.path}: {task.exception()}")
+
+    async def drain(self) -> None:
+        """Wait for a background save in progress, so a final save doesn't race it."""
+        if self._save_task is not None:
+            await asyncio.gather(self._save_task, return_exceptions=True)
+
+    def load(self) -> None:
+        """Load a previously saved index from ``path`` if it exists."""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                vectors = data["vectors"]
+                last_used = data["last_used"]
+                model_ids = data["model_ids"]
+                meta = json.loads(str(data["meta"]))
+        except Exception as e:
+            logger.error(f"Failed to load semantic cache from {self.path}: {e}")
+            return
+
+        # Keep the most recently used rows if the capacity shrank
+        keep = np.argsort(last_used)[::-1][:self.capacity]
+        self._size = len(keep)
+        if self._size == 0:
+            return
+        self._vectors = np.zeros((self.capacity, vectors.shape[1]), dtype=np.float32)
+        self._vectors[:self._size] = vectors[keep]
+        self._last_used[:self._size] = last_used[keep]
+        self._model_ids[:self._size] = model_ids[keep]
+        self._models = meta["models"]
+        for slot, index in enumerate(keep):
+            self._queries[slot] = meta["queries"][index]
+            self._answers[slot] = meta["answers"][index]
+        logger.info(f"Loaded {self._size} semantic cache entries from {self.path}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache counters.
+
+        Returns:
+            Dictionary of cache size and hit/miss/eviction counters
+        """
+        lookups = self.hits + self.misses
+        return {
+            "entries": self._size,
+            "capacity": self.capacity,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,152 @@
+"""Single-flight coalescing of identical in-flight generations."""
+
+import asyncio
+import logging
+from typing import Any, AsyncGenerator, AsyncIterator, Callable, Dict, Hashable, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+# Factory that starts an upstream generation, filling the given dict with the final chunk
+UpstreamFactory = Callable[[Dict[str, Any]], AsyncIterator[str]]
+
+
+class _Flight:
+    """A shared upstream generation and the chunks it has produced so far."""
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.final_chunk: Dict[str, Any] = {}
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self._event = asyncio.Event()
+
+    def notify(self) -> None:
+        """Wake every subscriber waiting for new chunks."""
+        event, self._event = self._event, asyncio.Event()
+        event.set()
+
+
+class SingleFlight:
+    """Attaches identical requests to one running upstream stream.
+
+    The first caller for a key starts the upstream generation in a
+    background task; later callers replay the chunks produced so far and
+    then follow the live tail. The upstream is cancelled once every
+    subscriber has gone away.
+    """
+
+    def __init__(self):
+        """Initialize the single-flight group."""
+        self._flights: Dict[Hashable, _Flight] = {}
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    def stream(
+        self,
+        key: Hashable,
+        factory: UpstreamFactory,
+        final_chunk: Optional[Dict[str, Any]] = None,
+        on_done: Optional[Callable[[], None]] = None
+    ) -> AsyncGenerator[str, None]:
+        """Stream the generation for a key, starting it if needed.
+
+        Args:
+            key: Identity of the generation
+            factory: Starts the upstream generation when no flight exists
+            final_chunk: Optional dict updated with the upstream final chunk
+            on_done: Called once the upstream generation ends, however it ends,
+                even if the caller that started it has gone away (e.g. to release
+                its concurrency slot). Called right away when joining a flight.
+
+        Returns:
+            Stream of response content chunks
+        """
+        joined = self.join(key, final_chunk)
+        if joined is not None:
+            if on_done is not None:
+                on_done()
+            return joined
+        flight = _Flight()
+        self._flights[key] = flight
+        flight.task = asyncio.create_task(self._pump(key, flight, factory))
+        if on_done is not None:
+            flight.task.add_done_callback(lambda task: on_done())
+        return self._follow(key, flight, final_chunk)
+
+    def join(
+        self,
+        key: Hashable,
+        final_chunk: Optional[Dict[str, Any]] = None
+    ) -> Optional[AsyncGenerator[str, None]]:
+        """Attach to the generation for a key only if one is already running.
+
+        Joiners don't need an upstream of their own, so callers can skip
+        preparing one (and taking a concurrency slot for it). Iterate the
+        returned stream without awaiting anything first, or the flight may
+        finish in between.
+
+        Args:
+            key: Identity of the generation
+            final_chunk: Optional dict updated with the upstream final chunk
+
+        Returns:
+            Stream of response content chunks, or None if nothing is in flight
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            return None
+        logger.info("Attaching request to in-flight generation")
+        return self._follow(key, flight, final_chunk)
+
+    async def _follow(
+        self,
+        key: Hashable,
+        flight: _Flight,
+        final_chunk: Optional[Dict[str, Any]]
+    ) -> AsyncGenerator[str, None]:
+        """Replay a flight's chunks so far, then follow its live tail."""
+        flight.subscribers += 1
+        index = 0
+        try:
+            while True:
+                while index < len(flight.chunks):
+                    yield flight.chunks[index]
+                    index += 1
+                if flight.done:
+                    break
+                await flight._event.wait()
+
+            if flight.error is not None:
+                raise flight.error
+            if final_chunk is not None:
+                final_chunk.update(flight.final_chunk)
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.done:
+                flight.task.cancel()
+                self._forget(key, flight)
+
+    async def _pump(self, key: Hashable, flight: _Flight, factory: UpstreamFactory) -> None:
+        """Copy the upstream stream into the shared flight."""
+        try:
+            async for chunk in factory(flight.final_chunk):
+                flight.chunks.append(chunk)
+                flight.notify()
+        except asyncio.CancelledError:
+            flight.error = asyncio.CancelledError()
+            raise
+        except Exception as e:
+            flight.error = e
+        finally:
+            flight.done = True
+            flight.notify()
+            self._forget(key, flight)
+
+    def _forget(self, key: Hashable, flight: _Flight) -> None:
+        """Remove a flight so new requests start a fresh generation."""
+        if self._flights.get(key) is flight:
+            del self._flights[key]
@@ -0,0 +1,443 @@
+"""SQLite-backed conversation store with a hot in-memory cache and write-behind."""
+
+import asyncio
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
+from app.services.context_cache import chain_digest
+from app.services.conversation_store import ConversationStore
+from app.services.message_ring import MessageRecord, MessageRing
+
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    id TEXT PRIMARY KEY,
+    updated_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    conversation_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    timestamp REAL,
+    truncated INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS messages_by_conversation ON messages (conversation_id, id);
+"""
+
+# Queue sentinel asking the writer thread to exit
+_STOP = ("stop",)
+# Seconds between sweeps for persisted conversations past the idle TTL
+SWEEP_INTERVAL = 60.0
+# Conversation IDs read per query while exporting
+EXPORT_BATCH = 100
+# Conversation IDs remembered as absent from the database, and for how long
+MISSING_CACHE_SIZE = 4096
+MISSING_TTL = 30.0
+# Reads of a conversation that keeps receiving writes before giving up
+LOAD_ATTEMPTS = 3
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """Open a WAL-mode connection to the conversation database.
+
+    Args:
+        path: Database file path
+
+    Returns:
+        SQLite connection
+    """
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+    return conn
+
+
+class SQLiteConversationStore(ConversationStore):
+    """Conversation store persisted to SQLite, with the in-memory store as a hot cache.
+
+    Writes go to the hot cache immediately and are queued for a single
+    writer thread, which commits them in batched transactions. The
+    synchronous methods only touch the hot cache: await ``load`` first to
+    bring back a conversation that was evicted or written by another
+    process, which reads the database in a worker thread. An append to a
+    conversation that isn't loaded is only persisted, so the next ``load``
+    still sees its complete history.
+
+    IDs found in neither place are remembered for ``MISSING_TTL`` seconds so
+    a new conversation is looked up only once. This is per process: rows
+    another process writes in that window are found once the entry expires.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        flush_interval: float = 0.05,
+        flush_batch: int = 256,
+        **kwargs
+    ):
+        """Initialize the SQLite conversation store.
+
+        Args:
+            path: Database file path
+            flush_interval: Seconds the writer waits to fill a batch
+            flush_batch: Maximum writes per transaction
+            **kwargs: Hot cache options passed to ``ConversationStore``
+        """
+        super().__init__(**kwargs)
+        self.path = path
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self._queue: "queue.SimpleQueue[Tuple]" = queue.SimpleQueue()
+        self._reader: Optional[sqlite3.Connection] = None
+        # The reader is shared by the event loop and worker threads
+        self._read_lock = threading.Lock()
+        # Monotonic time each ID was found absent, oldest first
+        self._missing: "OrderedDict[str, float]" = OrderedDict()
+        self._writer: Optional[threading.Thread] = None
+        # Conversations with writes the writer thread hasn't committed yet
+        self._pending: Dict[str, int] = {}
+        self._pending_lock = threading.Lock()
+        self.batches = 0
+        self.writes = 0
+        self.write_errors = 0
+
+    def start(self) -> None:
+        """Create the schema and start the writer thread."""
+        if self._writer is not None:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._reader = connect(self.path)
+        self._reader.executescript(SCHEMA)
+        self._writer = threading.Thread(target=self._write_loop, name="conversation-writer", daemon=True)
+        self._writer.start()
+        logger.info(f"Conversation store persisting to {self.path}")
+
+    def close(self) -> None:
+        """Flush queued writes and stop the writer thread."""
+        if self._writer is None:
+            return
+        self._queue.put(_STOP)
+        self._writer.join()
+        self._writer = None
+        self._reader.close()
+        self._reader = None
+
+    def flush(self) -> None:
+        """Block until every queued write has been committed."""
+        if self._writer is not None:
+            done = threading.Event()
+            self._queue.put(("flush", done))
+            done.wait()
+
+    async def load(self, conversation_id: str) -> None:
+        """Bring an evicted or unknown conversation into the hot cache from a worker thread.
+
+        Args:
+            conversation_id: Conversation identifier
+        """
+        if (
+            self._reader is None
+            or conversation_id in self._conversations
+            or self._known_missing(conversation_id)
+        ):
+            return
+        for _ in range(LOAD_ATTEMPTS):
+            loaded = await asyncio.to_thread(self._load, conversation_id)
+            # Another load may have finished first
+            if conversation_id in self._conversations:
+                return
+            # Read again if an append was queued while the read ran
+            if conversation_id not in self._pending:
+                self._loaded(conversation_id, loaded)
+                return
+        # Still being written to: leave it unloaded rather than adopt a stale copy
+        logger.warning(f"Conversation {conversation_id} kept changing while loading it")
+
+    def _loaded(
+        self,
+        conversation_id: str,
+        messages: List[MessageRecord]
+    ) -> Union[MessageRing, List[MessageRecord]]:
+        """Adopt messages read from the database, or remember that there were none."""
+        if messages:
+            self._missing.pop(conversation_id, None)
+            return self._adopt(conversation_id, messages)
+        self._missing[conversation_id] = time.monotonic()
+        self._missing.move_to_end(conversation_id)
+        if len(self._missing) > MISSING_CACHE_SIZE:
+            self._missing.popitem(last=False)
+        return messages
+
+    def _known_missing(self, conversation_id: str) -> bool:
+        """Whether the ID was recently found absent from the database."""
+        found_at = self._missing.get(conversation_id)
+        if found_at is None:
+            return False
+        if time.monotonic() - found_at > MISSING_TTL:
+            del self._missing[conversation_id]
+            return False
+        return True
+
+    def _enqueue(self, conversation_id: str, operation: Tuple) -> None:
+        """Queue a write for the writer thread."""
+        with self._pending_lock:
+            self._pending[conversation_id] = self._pending.get(conversation_id, 0) + 1
+        self._queue.put(operation)
+
+    def append(self, conversation_id: str, message: MessageRecord) -> None:
+        """Append a message to the hot cache and queue it for the database.
+
+        Never reads the database; await ``load`` first to keep the hot cache
+        complete for a conversation that may have been evicted.
+
+        Args:
+            conversation_id: Conversation identifier
+            message: Record to store
+        """
+        if (
+            self._reader is None
+            or conversation_id in self._conversations
+            or self._known_missing(conversation_id)
+        ):
+            super().append(conversation_id, message)
+        else:
+            # Not loaded: a partial copy in memory would hide the older messages
+            logger.debug(f"Persisting message for unloaded conversation {conversation_id}")
+        self._missing.pop(conversation_id, None)
+        self._enqueue(conversation_id, (
+            "append", conversation_id, time.time(),
+            (conversation_id, message.role, message.content, message.timestamp, int(message.truncated))
+        ))
+
+    def delete(self, conversation_id: str) -> bool:
+        """Remove a conversation from the hot cache and the database.
+
+        Args:
+            conversation_id: Conversation identifier
+
+        Returns:
+            True if the conversation existed, False otherwise
+        """
+        # Without a prior ``load`` an unknown ID is assumed to exist on disk
+        existed = super().delete(conversation_id) or (
+            self._reader is not None and not self._known_missing(conversation_id)
+        )
+        self._enqueue(conversation_id, ("delete", conversation_id))
+        self._loaded(conversation_id, [])
+        return existed
+
+    async def iter_conversations(self) -> AsyncIterator[Tuple[str, List[MessageRecord]]]:
+        """Walk every persisted conversation, including ones evicted from the hot cache.
+
+        Conversations are read from the database in ID order, a batch at a
+        time, so memory use doesn't grow with the number stored. The flush
+        and the reads run in worker threads.
+
+        Yields:
+            Tuples of (conversation ID, records oldest first)
+        """
+        if self._reader is None:
+            async for item in super().iter_conversations():
+                yield item
+            return
+        await asyncio.to_thread(self.flush)
+        last = ""
+        while True:
+            ids = await asyncio.to_thread(self._read_ids, last)
+            if not ids:
+                return
+            for conversation_id in ids:
+                entry = self._conversations.get(conversation_id)
+                if entry is not None:
+                    messages = entry.messages.to_list()
+                else:
+                    messages = await asyncio.to_thread(self._load, conversation_id)
+                if messages:
+                    yield conversation_id, messages
+            last = ids[-1]
+
+    def _read_ids(self, after: str) -> List[str]:
+        """Read the next batch of conversation IDs in ID order."""
+        with self._read_lock:
+            return [row[0] for row in self._reader.execute(
+                "SELECT id FROM conversations WHERE id > ? ORDER BY id LIMIT ?",
+                (after, EXPORT_BATCH)
+            )]
+
+    def _load(self, conversation_id: str) -> List[MessageRecord]:
+        """Read a conversation's most recent messages from the database.
+
+        Blocks while the conversation has queued writes, so call it from a
+        worker thread (see ``load``) where possible.
+        """
+        if self._reader is None:
+            return []
+        if conversation_id in self._pending:
+            # Don't read past writes still sitting in the queue
+            self.flush()
+        with self._read_lock:
+            rows = self._reader.execute(
+                "SELECT role, content, timestamp, truncated FROM messages "
+                "WHERE conversation_id = ? ORDER BY id DESC LIMIT ?",
+                (conversation_id, self.max_messages if self.max_messages > 0 else -1)
+            ).fetchall()
+        messages = []
+        digest = None
+        for role, content, timestamp, truncated in reversed(rows):
+            message = MessageRecord(role, content, timestamp, bool(truncated))
+            digest = chain_digest(digest, role, content)
+            message._digest = digest
+            messages.append(message)
+        return messages
+
+    def _write_loop(self) -> None:
+        """Drain the write queue in batched transactions (writer thread)."""
+        conn = connect(self.path)
+        last_sweep = time.monotonic()
+        try:
+            while True:
+                try:
+                    first = self._queue.get(timeout=SWEEP_INTERVAL)
+                except queue.Empty:
+                    first = None
+                if time.monotonic() - last_sweep >= SWEEP_INTERVAL:
+                    last_sweep = time.monotonic()
+                    self._sweep(conn)
+                if first is None:
+                    continue
+                batch = [first]
+                deadline = time.monotonic() + self.flush_interval
+                while len(batch) < self.flush_batch and batch[-1][0] not in ("flush", "stop"):
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(self._queue.get(timeout=timeout))
+                    except queue.Empty:
+                        break
+                # Flush requests and the stop sentinel end a batch
+                marker = batch.pop() if batch[-1][0] in ("flush", "stop") else None
+                try:
+                    self._write(conn, batch)
+                except sqlite3.Error as e:
+                    self.write_errors += 1
+                    logger.error(f"Failed to persist {len(batch)} conversation writes: {e}")
+                finally:
+                    self._settle(batch)
+                if marker is _STOP:
+                    break
+                if marker is not None:
+                    marker[1].set()
+        finally:
+            conn.close()
+
+    def _write(self, conn: sqlite3.Connection, operations: List[Tuple]) -> None:
+        """Apply a batch of queued writes in one transaction."""
+        if not operations:
+            return
+        touched: Dict[str, float] = {}
+        rows: List[Tuple] = []
+        conn.execute("BEGIN")
+        try:
+            for operation in operations:
+                if operation[0] == "append":
+                    _, conversation_id, written_at, row = operation
+                    rows.append(row)
+                    touched[conversation_id] = written_at
+                    continue
+                # Deletes must apply after the appends queued before them
+                self._insert_rows(conn, rows)
+                rows = []
+                conversation_id = operation[1]
+                conn.execute("DELETE FROM messages WHERE conversation_id = ?", (conversation_id,))
+                conn.execute("DELETE FROM conversations WHERE id = ?", (conversation_id,))
+                touched.pop(conversation_id, None)
+            self._insert_rows(conn, rows)
+            conn.executemany(
+                "INSERT INTO conversations (id, updated_at) VALUES (?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET updated_at = excluded.updated_at",
+                touched.items()
+            )
+            if self.max_messages > 0:
+                # Apply the per-conversation message cap on disk as well
+                conn.executemany(
+                    "DELETE FROM messages WHERE conversation_id = ? AND id <= ("
+                    "SELECT id FROM messages WHERE conversation_id = ? "
+                    "ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                    [(conversation_id, conversation_id, self.max_messages) for conversation_id in touched]
+                )
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
+        self.batches += 1
+        self.writes += len(operations)
+
+    @staticmethod
+    def _insert_rows(conn: sqlite3.Connection, rows: List[Tuple]) -> None:
+        """Insert message rows in one statement."""
+        if rows:
+            conn.executemany(
+                "INSERT INTO messages (conversation_id, role, content, timestamp, truncated) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+
+    def _sweep(self, conn: sqlite3.Connection) -> None:
+        """Delete persisted conversations that have been idle past the TTL."""
+        if self.idle_ttl <= 0:
+            return
+        cutoff = time.time() - self.idle_ttl
+        try:
+            conn.execute("BEGIN")
+            conn.execute(
+                "DELETE FROM messages WHERE conversation_id IN "
+                "(SELECT id FROM conversations WHERE updated_at < ?)",
+                (cutoff,)
+            )
+            deleted = conn.execute("DELETE FROM conversations WHERE updated_at < ?", (cutoff,)).rowcount
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            conn.execute("ROLLBACK")
+            logger.error(f"Failed to expire persisted conversations: {e}")
+            return
+        if deleted:
+            logger.info(f"Expired {deleted} persisted conversations")
+
+    def _settle(self, operations: List[Tuple]) -> None:
+        """Mark queued writes as no longer pending."""
+        with self._pending_lock:
+            for operation in operations:
+                conversation_id = operation[1]
+                remaining = self._pending.get(conversation_id, 0) - 1
+                if remaining > 0:
+                    self._pending[conversation_id] = remaining
+                else:
+                    self._pending.pop(conversation_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hot cache counters plus persistence counters.
+
+        Returns:
+            Dictionary of store counters
+        """
+        stats = super().stats()
+        stats.update({
+            "backend": "sqlite",
+            "queued_writes": self._queue.qsize(),
+            "committed_writes": self.writes,
+            "batches": self.batches,
+            "write_errors": self.write_errors,
+        })
+        return stats
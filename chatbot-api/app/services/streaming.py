@@ -0,0 +1,285 @@
+"""Streaming helpers: NDJSON ingestion, chunk coalescing, disconnect handling and SSE encoding."""
+
+import asyncio
+import logging
+import zlib
+from typing import Any, AsyncGenerator, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+import orjson
+from app.models import StreamChunk
+
+
+logger = logging.getLogger(__name__)
+
+SSE_DONE = b"data: [DONE]\n\n"
+
+# Stream formats for /chat/stream; "full" is the default StreamChunk-per-event format
+STREAM_FORMATS = ("full", "compact")
+
+# Sentinels passed through the coalescer's queue
+_END = object()
+_DISCONNECTED = object()
+
+
+class _Flush:
+    """Timer marker asking the coalescer to flush a specific buffer window."""
+
+    __slots__ = ("window",)
+
+    def __init__(self, window: int):
+        self.window = window
+
+
+async def iter_ndjson(byte_stream: AsyncIterator[bytes]) -> AsyncGenerator[Dict[str, Any], None]:
+    """Parse newline-delimited JSON straight from raw bytes.
+
+    Args:
+        byte_stream: Response body chunks
+
+    Yields:
+        Decoded JSON objects, one per non-empty line
+    """
+    buffer = b""
+    async for data in byte_stream:
+        buffer += data
+        if b"\n" not in data:
+            continue
+        lines = buffer.split(b"\n")
+        buffer = lines.pop()
+        for line in lines:
+            if line.strip():
+                try:
+                    yield orjson.loads(line)
+                except orjson.JSONDecodeError as e:
+                    logger.warning(f"Failed to parse chunk: {line!r}, error: {e}")
+    if buffer.strip():
+        try:
+            yield orjson.loads(buffer)
+        except orjson.JSONDecodeError as e:
+            logger.warning(f"Failed to parse chunk: {buffer!r}, error: {e}")
+
+
+def _is_plain(chunk: StreamChunk) -> bool:
+    """Whether a chunk carries nothing but incremental content."""
+    return not chunk.is_complete and chunk.queue_position is None
+
+
+def encode_sse(chunk: StreamChunk) -> bytes:
+    """Encode a chunk as a Server-Sent Events frame.
+
+    Plain content chunks skip pydantic serialization; the output matches
+    ``model_dump_json(exclude_none=True)`` byte for byte.
+
+    Args:
+        chunk: Chunk to encode
+
+    Returns:
+        SSE frame
+    """
+    if _is_plain(chunk):
+        payload = orjson.dumps({"content": chunk.content, "is_complete": False, "model": chunk.model})
+    else:
+        payload = chunk.model_dump_json(exclude_none=True).encode("utf-8")
+    return b"data: " + payload + b"\n\n"
+
+
+def encode_sse_event(event: str, data: Any) -> bytes:
+    """Encode a named Server-Sent Events frame with a JSON payload.
+
+    Args:
+        event: SSE event name
+        data: JSON-serializable payload
+
+    Returns:
+        SSE frame
+    """
+    return b"event: " + event.encode("utf-8") + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
+def encode_delta(content: str) -> bytes:
+    """Encode a content delta for the compact stream format.
+
+    Deltas are unnamed events whose data is just the JSON string, so the
+    model and completion flag aren't repeated for every token.
+
+    Args:
+        content: Incremental content
+
+    Returns:
+        SSE frame
+    """
+    return b"data:" + orjson.dumps(content) + b"\n\n"
+
+
+def negotiate_stream_format(requested: Optional[str], accept: Optional[str]) -> str:
+    """Pick the stream format from a query parameter or the Accept header.
+
+    The query parameter wins. Otherwise the compact format is used when the
+    client accepts ``text/event-stream`` with a ``format=compact`` parameter.
+
+    Args:
+        requested: Value of the ``format`` query parameter
+        accept: Accept header
+
+    Returns:
+        One of ``STREAM_FORMATS``
+
+    Raises:
+        ValueError: If the requested format is unknown
+    """
+    if requested:
+        if requested not in STREAM_FORMATS:
+            raise ValueError(f"Unknown stream format {requested!r}, expected one of {', '.join(STREAM_FORMATS)}")
+        return requested
+    for media_range in (accept or "").split(","):
+        media_type, _, params = media_range.partition(";")
+        if media_type.strip().lower() != "text/event-stream":
+            continue
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "format" and value.strip().strip('"') == "compact":
+                return "compact"
+    return "full"
+
+
+async def gzip_stream(chunks: AsyncIterator[bytes], level: int = 6) -> AsyncGenerator[bytes, None]:
+    """Gzip a byte stream incrementally.
+
+    Args:
+        chunks: Uncompressed byte chunks
+        level: zlib compression level
+
+    Yields:
+        Gzip-framed compressed bytes
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+async def coalesce_chunks(
+    chunks: AsyncIterator[StreamChunk],
+    flush_interval: float = 0.02,
+    flush_bytes: int = 512,
+    is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+    disconnect_poll_interval: float = 0.25
+) -> AsyncGenerator[StreamChunk, None]:
+    """Merge bursts of content chunks into fewer, larger chunks.
+
+    The first content chunk is passed through immediately to keep time to
+    first token low. After that, content is buffered and flushed when
+    ``flush_interval`` seconds have passed since the buffer was started or
+    it reaches ``flush_bytes``. Any other chunk (queue position, completion)
+    flushes the buffer and is passed through unchanged.
+
+    When ``is_disconnected`` is given it is polled in the background; once
+    the client is gone the stream ends and the source is cancelled, which
+    closes the upstream generation even while it is waiting for a token.
+
+    Args:
+        chunks: Source chunk stream
+        flush_interval: Maximum seconds content may wait in the buffer (0 disables coalescing)
+        flush_bytes: Buffer size that triggers an immediate flush
+        is_disconnected: Async check for whether the client has gone away
+        disconnect_poll_interval: Seconds between disconnect checks
+
+    Yields:
+        Stream chunks
+    """
+    if flush_interval <= 0 and is_disconnected is None:
+        async for chunk in chunks:
+            yield chunk
+        return
+
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def pump():
+        try:
+            async for chunk in chunks:
+                queue.put_nowait(chunk)
+        except Exception as e:
+            queue.put_nowait(e)
+        finally:
+            queue.put_nowait(_END)
+
+    async def watch():
+        try:
+            while not await is_disconnected():
+                await asyncio.sleep(disconnect_poll_interval)
+        except Exception as e:
+            logger.warning(f"Disconnect check failed, no longer watching: {e}")
+            return
+        queue.put_nowait(_DISCONNECTED)
+
+    pump_task = asyncio.create_task(pump())
+    watch_task = asyncio.create_task(watch()) if is_disconnected is not None else None
+    buffer: List[str] = []
+    buffered_bytes = 0
+    model: Optional[str] = None
+    window = 0
+    timer: Optional[asyncio.TimerHandle] = None
+    # With coalescing disabled every chunk is passed straight through
+    first_sent = False
+    passthrough = flush_interval <= 0
+
+    def take_buffer() -> StreamChunk:
+        nonlocal buffer, buffered_bytes, window, timer
+        merged = StreamChunk.model_construct(content="".join(buffer), is_complete=False, model=model)
+        buffer = []
+        buffered_bytes = 0
+        window += 1
+        if timer is not None:
+            timer.cancel()
+            timer = None
+        return merged
+
+    try:
+        while True:
+            item = await queue.get()
+            if item is _END:
+                break
+            if item is _DISCONNECTED:
+                logger.info("Client disconnected, stopping generation")
+                return
+            if isinstance(item, _Flush):
+                if item.window == window and buffer:
+                    yield take_buffer()
+                continue
+            if isinstance(item, Exception):
+                raise item
+
+            chunk: StreamChunk = item
+            if not _is_plain(chunk):
+                if buffer:
+                    yield take_buffer()
+                yield chunk
+                continue
+            if passthrough or not first_sent:
+                first_sent = True
+                yield chunk
+                continue
+
+            model = chunk.model
+            buffer.append(chunk.content)
+            buffered_bytes += len(chunk.content)
+            if buffered_bytes >= flush_bytes:
+                yield take_buffer()
+            elif timer is None:
+                timer = loop.call_later(flush_interval, queue.put_nowait, _Flush(window))
+
+        if buffer:
+            yield take_buffer()
+    finally:
+        if timer is not None:
+            timer.cancel()
+        if watch_task is not None:
+            watch_task.cancel()
+        if not pump_task.done():
+            pump_task.cancel()
+            try:
+                await pump_task
+            except (asyncio.CancelledError, Exception):
+                pass
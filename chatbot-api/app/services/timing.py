@@ -0,0 +1,106 @@
+"""Per-request stage timings, reported in responses and the Server-Timing header."""
+
+import time
+from typing import Dict, List, Optional
+from starlette.requests import Request
+from app.models import Timing
+
+
+# Stages in the order they happen; each is timed from the end of the previous one
+STAGES = ("parse", "history", "queue", "prompt", "connect", "first_token", "last_token")
+
+# Key under which the arrival time is kept in the ASGI scope state
+ARRIVAL_KEY = "received_at"
+
+
+class RequestArrivalMiddleware:
+    """Record when each HTTP request arrived, before its body is read and parsed."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "http":
+            scope.setdefault("state", {})[ARRIVAL_KEY] = time.perf_counter()
+        await self.app(scope, receive, send)
+
+
+class StageTimer:
+    """Marks the end of each request stage.
+
+    Only the first mark of a stage counts, so a hedged request reports the
+    connection that answered first. Stages that didn't happen (a duplicate
+    that joined a generation already in flight, a cached answer that never
+    reached Ollama) are left out and the next stage is timed from the
+    previous one that did.
+    """
+
+    __slots__ = ("started", "marks")
+
+    def __init__(self, started: Optional[float] = None):
+        """Initialize the timer.
+
+        Args:
+            started: ``time.perf_counter()`` value the request started at (defaults to now)
+        """
+        self.started = time.perf_counter() if started is None else started
+        self.marks: Dict[str, float] = {}
+
+    @classmethod
+    def from_request(cls, request: Request) -> "StageTimer":
+        """Start a timer at the request's arrival and mark parsing as done.
+
+        Args:
+            request: Incoming request (its arrival is recorded by ``RequestArrivalMiddleware``)
+
+        Returns:
+            Timer with the ``parse`` stage marked
+        """
+        received_at = request.scope.get("state", {}).get(ARRIVAL_KEY)
+        timer = cls(received_at)
+        if received_at is not None:
+            timer.mark("parse")
+        return timer
+
+    def mark(self, stage: str) -> None:
+        """Record that a stage has just finished.
+
+        Args:
+            stage: One of ``STAGES``
+        """
+        if stage not in self.marks:
+            self.marks[stage] = time.perf_counter()
+
+    def durations(self) -> Dict[str, float]:
+        """Get the duration of every stage that happened, in milliseconds.
+
+        Returns:
+            Stage durations keyed by stage name, plus ``total``
+        """
+        durations: Dict[str, float] = {}
+        previous = self.started
+        for stage in STAGES:
+            at = self.marks.get(stage)
+            if at is None:
+                continue
+            durations[stage] = round((at - previous) * 1000, 3)
+            previous = at
+        durations["total"] = round((previous - self.started) * 1000, 3)
+        return durations
+
+    def timing(self) -> Timing:
+        """Build the response timing block.
+
+        Returns:
+            Stage durations in milliseconds
+        """
+        return Timing(**{f"{stage}_ms": ms for stage, ms in self.durations().items()})
+
+    def server_timing(self) -> str:
+        """Format the stage durations as a ``Server-Timing`` header value.
+
+        Returns:
+            Header value, e.g. ``parse;dur=0.4, queue;dur=0, ...``
+        """
+        entries: List[str] = [f"{stage};dur={ms:g}" for stage, ms in self.durations().items()]
+        return ", ".join(entries)
@@ -0,0 +1,522 @@
+"""Multi-process serving: a supervisor that routes requests to workers by conversation."""
+
+import asyncio
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+import zlib
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+import httpx
+import orjson
+
+
+logger = logging.getLogger(__name__)
+
+# Paths whose POST creates state, and the query parameter naming it (assigned here if missing)
+OWNING_PATHS = {
+    "/api/v1/chat": "conversation_id",
+    "/api/v1/chat/stream": "conversation_id",
+    "/api/v1/chat/batch": "batch_id",
+}
+# Path prefixes followed by the ID of the state they address
+OWNED_PATH_PREFIXES = ("/api/v1/conversation/", "/api/v1/chat/batch/")
+ROUTING_PARAMS = ("conversation_id", "batch_id")
+WORKERS_PATH = "/api/v1/workers"
+# Paths answered by concatenating every worker's response body (NDJSON and gzip both allow it)
+FAN_OUT_PATHS = ("/api/v1/conversations/export",)
+# Per-process stats answered with every worker's numbers, labelled by worker
+METRICS_PATH = "/metrics"
+MERGED_PATHS = (METRICS_PATH, "/api/v1/cache/stats", "/api/v1/conversations/stats")
+METRICS_CONTENT_TYPE = b"text/plain; version=0.0.4; charset=utf-8"
+# Headers that describe a single connection and must not be forwarded
+HOP_BY_HOP_HEADERS = {
+    b"connection", b"keep-alive", b"proxy-authenticate", b"proxy-authorization",
+    b"te", b"trailer", b"transfer-encoding", b"upgrade",
+}
+# Response headers the supervisor's own server sets
+SERVER_HEADERS = {b"date", b"server"}
+# A worker that stays up this long has its restart backoff reset
+STABLE_UPTIME = 30.0
+MIN_RESTART_BACKOFF = 0.5
+MAX_RESTART_BACKOFF = 30.0
+
+
+def routing_key(path: str, query: List[Tuple[str, str]]) -> Optional[str]:
+    """Find the conversation or batch a request belongs to.
+
+    Args:
+        path: Request path
+        query: Parsed query string
+
+    Returns:
+        Conversation or batch ID, or None if the request isn't tied to one
+    """
+    for key, value in query:
+        if key in ROUTING_PARAMS and value:
+            return value
+    for prefix in OWNED_PATH_PREFIXES:
+        if path.startswith(prefix):
+            return path[len(prefix):].split("/", 1)[0] or None
+    return None
+
+
+def worker_index(key: str, workers: int) -> int:
+    """Map a conversation or batch to the worker that owns it.
+
+    Args:
+        key: Conversation or batch ID
+        workers: Number of workers
+
+    Returns:
+        Worker index, stable for the life of the supervisor
+    """
+    return zlib.crc32(key.encode("utf-8")) % workers
+
+
+def label_sample(line: str, worker: int) -> str:
+    """Add a ``worker`` label to one Prometheus sample line.
+
+    Args:
+        line: Sample line, e.g. ``name{model="m"} 1.0``
+        worker: Worker index
+
+    Returns:
+        The line with ``worker="N"`` added to its label set
+    """
+    label = f'worker="{worker}"'
+    name_end = min(i for i in (line.find("{"), line.find(" "), len(line)) if i >= 0)
+    if line[name_end:name_end + 1] == "{":
+        # Label values may contain braces, but the sample value after the set can't
+        close = line.rfind("}")
+        return f"{line[:close]},{label}{line[close:]}"
+    return f"{line[:name_end]}{{{label}}}{line[name_end:]}"
+
+
+def merge_metrics(bodies: Dict[int, bytes]) -> str:
+    """Merge the workers' Prometheus expositions into one.
+
+    Every sample gets a ``worker`` label, and each metric family keeps one
+    HELP/TYPE header with all of its samples after it, as the format requires.
+
+    Args:
+        bodies: Exposition text keyed by worker index
+
+    Returns:
+        Merged exposition text
+    """
+    families: Dict[str, Tuple[List[str], List[str]]] = {}
+    for worker, body in bodies.items():
+        family = None
+        for line in body.decode("utf-8").splitlines():
+            if not line:
+                continue
+            if line.startswith("#"):
+                parts = line.split(" ", 3)
+                if len(parts) >= 3 and parts[1] in ("HELP", "TYPE"):
+                    family = parts[2]
+                    headers, _ = families.setdefault(family, ([], []))
+                    if line not in headers:
+                        headers.append(line)
+                continue
+            families.setdefault(family, ([], []))[1].append(label_sample(line, worker))
+    lines: List[str] = []
+    for headers, samples in families.values():
+        lines.extend(headers)
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
+
+
+class Worker:
+    """One uvicorn worker process serving the app on a Unix socket."""
+
+    def __init__(self, index: int, socket_path: str, log_level: str):
+        """Initialize the worker handle.
+
+        Args:
+            index: Worker number
+            socket_path: Unix socket the worker listens on
+            log_level: uvicorn log level
+        """
+        self.index = index
+        self.socket_path = socket_path
+        self.log_level = log_level
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.restarts = 0
+        self.started_at = 0.0
+        self.client = httpx.AsyncClient(
+            transport=httpx.AsyncHTTPTransport(uds=socket_path),
+            base_url="http://worker",
+            timeout=httpx.Timeout(None, connect=5.0)
+        )
+
+    @property
+    def alive(self) -> bool:
+        """Whether the worker process is running."""
+        return self.process is not None and self.process.returncode is None
+
+    async def spawn(self) -> None:
+        """Start the worker process."""
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        env = dict(os.environ, API_WORKERS="1")
+        self.process = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--uds", self.socket_path,
+            "--log-level", self.log_level,
+            env=env
+        )
+        self.started_at = time.monotonic()
+        logger.info(f"Started worker {self.index} (pid {self.process.pid})")
+
+    async def wait_ready(self, timeout: float) -> bool:
+        """Wait until the worker answers requests.
+
+        Args:
+            timeout: Seconds to wait
+
+        Returns:
+            True if the worker became ready in time
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and self.alive:
+            try:
+                response = await self.client.get("/")
+                if response.status_code == 200:
+                    return True
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.1)
+        return False
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Terminate the worker process, killing it if it doesn't exit in time.
+
+        Args:
+            timeout: Seconds to wait for a clean shutdown
+        """
+        if self.alive:
+            self.process.terminate()
+            try:
+                await asyncio.wait_for(self.process.wait(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Worker {self.index} did not exit, killing it")
+                self.process.kill()
+                await self.process.wait()
+        await self.client.aclose()
+
+    def status(self) -> Dict:
+        """Describe the worker for the status endpoint."""
+        return {
+            "index": self.index,
+            "pid": self.process.pid if self.process else None,
+            "alive": self.alive,
+            "restarts": self.restarts,
+            "uptime_seconds": round(time.monotonic() - self.started_at, 1) if self.alive else 0.0,
+        }
+
+
+class Supervisor:
+    """ASGI front end that owns N worker processes and routes by conversation.
+
+    Each conversation is pinned to one worker by hashing its ID, so its
+    history lives in exactly one process and needs no shared store or
+    locking. Requests without a conversation are spread round-robin.
+    Workers that exit are restarted with exponential backoff; the
+    conversations they held in memory are lost unless the SQLite
+    conversation backend is in use.
+    """
+
+    def __init__(self, workers: int, log_level: str = "info", start_timeout: float = 60.0):
+        """Initialize the supervisor.
+
+        Args:
+            workers: Number of worker processes
+            log_level: uvicorn log level for the workers
+            start_timeout: Seconds to wait for each worker to become ready
+        """
+        self.socket_dir = tempfile.mkdtemp(prefix="chatbot-workers-")
+        self.workers = [
+            Worker(index, os.path.join(self.socket_dir, f"worker-{index}.sock"), log_level)
+            for index in range(workers)
+        ]
+        self.start_timeout = start_timeout
+        self._monitors: List[asyncio.Task] = []
+        self._running = False
+        self._next = 0
+
+    async def start(self) -> None:
+        """Start every worker and wait for them to become ready."""
+        self._running = True
+        await asyncio.gather(*(worker.spawn() for worker in self.workers))
+        ready = await asyncio.gather(*(worker.wait_ready(self.start_timeout) for worker in self.workers))
+        for worker, ok in zip(self.workers, ready):
+            if not ok:
+                logger.warning(f"Worker {worker.index} not ready after {self.start_timeout}s")
+        self._monitors = [asyncio.create_task(self._monitor(worker)) for worker in self.workers]
+        logger.info(f"Supervisor routing to {len(self.workers)} workers")
+
+    async def stop(self) -> None:
+        """Stop the workers and remove their sockets."""
+        self._running = False
+        for task in self._monitors:
+            task.cancel()
+        await asyncio.gather(*self._monitors, return_exceptions=True)
+        await asyncio.gather(*(worker.stop() for worker in self.workers))
+        shutil.rmtree(self.socket_dir, ignore_errors=True)
+
+    async def _monitor(self, worker: Worker) -> None:
+        """Restart a worker whenever it exits, retrying until a restart succeeds."""
+        backoff = MIN_RESTART_BACKOFF
+        while self._running:
+            returncode = await worker.process.wait()
+            if not self._running:
+                return
+            if time.monotonic() - worker.started_at >= STABLE_UPTIME:
+                backoff = MIN_RESTART_BACKOFF
+            logger.warning(
+                f"Worker {worker.index} exited with code {returncode}, restarting in {backoff:.1f}s"
+            )
+            while self._running:
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, MAX_RESTART_BACKOFF)
+                worker.restarts += 1
+                try:
+                    await worker.spawn()
+                except Exception as e:
+                    # e.g. fork failing under memory pressure; the old process is
+                    # still the exited one, so keep trying rather than end the monitor
+                    logger.error(
+                        f"Failed to restart worker {worker.index}: {e}, retrying in {backoff:.1f}s"
+                    )
+                    continue
+                break
+            else:
+                return
+            await worker.wait_ready(self.start_timeout)
+
+    def _pick(self, key: Optional[str]) -> Worker:
+        """Choose the worker for a request from its conversation or batch ID."""
+        if key is not None:
+            return self.workers[worker_index(key, len(self.workers))]
+        worker = self.workers[self._next % len(self.workers)]
+        self._next += 1
+        return worker
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._proxy(scope, receive, send)
+        elif scope["type"] == "websocket":
+            # One connection multiplexes many conversations, so it can't be
+            # pinned to the worker that owns each of them
+            await receive()
+            await send({"type": "websocket.close", "code": 1003})
+
+    async def _lifespan(self, receive, send) -> None:
+        """Start and stop the workers with the supervisor's own server."""
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    await self.start()
+                except Exception as e:
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.stop()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _proxy(self, scope, receive, send) -> None:
+        """Forward one HTTP request to its worker and relay the response."""
+        path = scope["path"]
+        if path == WORKERS_PATH:
+            await self._respond(send, 200, {"workers": [worker.status() for worker in self.workers]})
+            return
+        if path in MERGED_PATHS and scope["method"] == "GET":
+            await self._merged(scope, send)
+            return
+
+        body = b""
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+        query = parse_qsl(scope["query_string"].decode("latin-1"), keep_blank_values=True)
+        key = routing_key(path, query)
+        assigned = None
+        if key is None and scope["method"] == "POST" and path in OWNING_PATHS:
+            # Pick the ID here so the new state lands on the worker that will own it
+            key = assigned = str(uuid.uuid4())
+            query.append((OWNING_PATHS[path], assigned))
+        if path in FAN_OUT_PATHS:
+            targets = list(self.workers)
+        else:
+            targets = [self._pick(key)]
+        worker = targets[0]
+
+        headers = [
+            (name, value) for name, value in scope["headers"]
+            if name.lower() not in HOP_BY_HOP_HEADERS
+        ]
+        client = scope.get("client")
+        if client:
+            headers.append((b"x-forwarded-for", client[0].encode("latin-1")))
+        target = path + ("?" + urlencode(query) if query else "")
+        request = worker.client.build_request(scope["method"], target, headers=headers, content=body)
+        try:
+            response = await worker.client.send(request, stream=True)
+        except httpx.TransportError as e:
+            logger.warning(f"Worker {worker.index} unreachable: {e}")
+            await self._respond(
+                send, 503, {"detail": "Worker restarting, try again shortly"}, {"retry-after": "1"}
+            )
+            return
+
+        try:
+            response_headers = [
+                (name, value) for name, value in response.headers.raw
+                if name.lower() not in HOP_BY_HOP_HEADERS and name.lower() not in SERVER_HEADERS
+            ]
+            if assigned is not None and OWNING_PATHS[path] == "conversation_id":
+                response_headers.append((b"x-conversation-id", assigned.encode("ascii")))
+            more = []
+            if len(targets) > 1 and response.status_code == 200:
+                more = [(other, other.client.build_request(scope["method"], target, headers=headers, content=body))
+                        for other in targets[1:]]
+                response_headers = [(name, value) for name, value in response_headers
+                                    if name.lower() != b"content-length"]
+            await send({
+                "type": "http.response.start",
+                "status": response.status_code,
+                "headers": response_headers,
+            })
+            relay = asyncio.create_task(self._relay(response, more, send))
+            watch = asyncio.create_task(self._watch_disconnect(receive))
+            done, _ = await asyncio.wait({relay, watch}, return_when=asyncio.FIRST_COMPLETED)
+            for task in (relay, watch):
+                if task not in done:
+                    task.cancel()
+                    try:
+                        await task
+                    except (asyncio.CancelledError, Exception):
+                        pass
+            if relay in done:
+                relay.result()
+        finally:
+            # Closing mid-stream drops the worker connection, which stops its generation
+            await response.aclose()
+
+    async def _merged(self, scope, send) -> None:
+        """Answer a per-process stats endpoint with every worker's numbers.
+
+        Round-robin would report a different worker on each scrape, which
+        makes counters jump around and breaks Prometheus ``rate()``.
+        """
+        path = scope["path"]
+        query = scope["query_string"].decode("latin-1")
+        target = path + ("?" + query if query else "")
+        bodies = await asyncio.gather(*(self._fetch(worker, target) for worker in self.workers))
+        by_worker = {
+            worker.index: body for worker, body in zip(self.workers, bodies) if body is not None
+        }
+        if not by_worker:
+            await self._respond(
+                send, 503, {"detail": "Worker restarting, try again shortly"}, {"retry-after": "1"}
+            )
+            return
+        if path == METRICS_PATH:
+            body = merge_metrics(by_worker).encode("utf-8")
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", METRICS_CONTENT_TYPE),
+                    (b"content-length", str(len(body)).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+        await self._respond(send, 200, {
+            "workers": {str(index): orjson.loads(body) for index, body in by_worker.items()}
+        })
+
+    @staticmethod
+    async def _fetch(worker: Worker, target: str) -> Optional[bytes]:
+        """GET a path from one worker, or None if it can't answer right now."""
+        try:
+            response = await worker.client.get(target)
+        except httpx.TransportError as e:
+            logger.warning(f"Skipping worker {worker.index}, unreachable: {e}")
+            return None
+        if response.status_code != 200:
+            logger.warning(f"Skipping worker {worker.index}, status {response.status_code}")
+            return None
+        return response.content
+
+    @staticmethod
+    async def _relay(
+        response: httpx.Response,
+        more: List[Tuple[Worker, httpx.Request]],
+        send
+    ) -> None:
+        """Copy a worker's response body to the client, followed by any fanned-out ones."""
+        async for chunk in response.aiter_raw():
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        for worker, request in more:
+            try:
+                extra = await worker.client.send(request, stream=True)
+            except httpx.TransportError as e:
+                logger.warning(f"Skipping worker {worker.index}, unreachable: {e}")
+                continue
+            try:
+                if extra.status_code != 200:
+                    logger.warning(f"Skipping worker {worker.index}, status {extra.status_code}")
+                    continue
+                async for chunk in extra.aiter_raw():
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            finally:
+                await extra.aclose()
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    @staticmethod
+    async def _watch_disconnect(receive) -> None:
+        """Return once the client disconnects."""
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+    @staticmethod
+    async def _respond(send, status: int, payload: Dict, headers: Optional[Dict[str, str]] = None) -> None:
+        """Send a small JSON response generated by the supervisor itself."""
+        body = orjson.dumps(payload)
+        raw_headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        raw_headers += [(name.encode(), value.encode()) for name, value in (headers or {}).items()]
+        await send({"type": "http.response.start", "status": status, "headers": raw_headers})
+        await send({"type": "http.response.body", "body": body})
+
+
+def run(workers: int, host: str, port: int, log_level: str = "info", start_timeout: float = 60.0) -> None:
+    """Serve the app with a supervisor in front of ``workers`` processes.
+
+    Args:
+        workers: Number of worker processes
+        host: Address the supervisor listens on
+        port: Port the supervisor listens on
+        log_level: uvicorn log level
+        start_timeout: Seconds to wait for each worker to become ready
+    """
+    import uvicorn
+
+    supervisor = Supervisor(workers, log_level=log_level, start_timeout=start_timeout)
+    uvicorn.run(supervisor, host=host, port=port, log_level=log_level, lifespan="on")
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Microbenchmark: memory held by stored conversations, pydantic messages vs. compact records."""
+
+import sys
+import timeit
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+# Add the app directory to the path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.models import ChatMessage
+from app.services.context_cache import chain_digest
+from app.services.conversation_store import ConversationStore
+from app.services.message_ring import MessageRecord, MessageRing
+
+
+CONVERSATIONS = 1000
+MESSAGES = 50
+MESSAGE_CHARS = 200
+APPENDS = 100_000
+
+
+def content(conversation: int, index: int) -> str:
+    """Build a distinct message body of roughly MESSAGE_CHARS characters."""
+    prefix = f"Conversation {conversation}, message {index}: "
+    return prefix + "x" * (MESSAGE_CHARS - len(prefix))
+
+
+def fill_pydantic() -> dict:
+    """Store conversations the old way: lists of ChatMessage, capped by slicing."""
+    conversations = {}
+    for c in range(CONVERSATIONS):
+        messages = conversations.setdefault(f"conversation-{c}", [])
+        digest = None
+        for i in range(MESSAGES):
+            role = "user" if i % 2 == 0 else "assistant"
+            message = ChatMessage(role=role, content=content(c, i), timestamp=datetime.utcnow().isoformat())
+            digest = chain_digest(digest, role, message.content)
+            message._digest = digest
+            messages.append(message)
+            if len(messages) > MESSAGES:
+                conversations[f"conversation-{c}"] = messages = messages[-MESSAGES:]
+    return conversations
+
+
+def fill_records() -> ConversationStore:
+    """Store conversations as MessageRecords in per-conversation rings."""
+    store = ConversationStore(max_bytes=0, idle_ttl=0, max_messages=MESSAGES)
+    for c in range(CONVERSATIONS):
+        conversation_id = f"conversation-{c}"
+        digest = None
+        for i in range(MESSAGES):
+            record = MessageRecord("user" if i % 2 == 0 else "assistant", content(c, i))
+            digest = chain_digest(digest, record.role, record.content)
+            record._digest = digest
+            store.append(conversation_id, record)
+    return store
+
+
+def measure(fill) -> int:
+    """Return the bytes still allocated after ``fill`` builds its structure."""
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    kept = fill()
+    used = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    del kept
+    return used
+
+
+def main():
+    """Run the benchmark and print memory per 1k conversations."""
+    content_bytes = sum(
+        sys.getsizeof(content(c, i)) for c in range(CONVERSATIONS) for i in range(MESSAGES)
+    )
+    before = measure(fill_pydantic)
+    after = measure(fill_records)
+    messages = CONVERSATIONS * MESSAGES
+
+    # Appending past the cap: list slice vs. ring overwrite
+    record = MessageRecord("user", "x")
+    capped = [record] * MESSAGES
+    ring = MessageRing(MESSAGES, capped)
+
+    def slice_append():
+        nonlocal capped
+        capped.append(record)
+        if len(capped) > MESSAGES:
+            capped = capped[-MESSAGES:]
+
+    sliced = timeit.timeit(slice_append, number=APPENDS)
+    ringed = timeit.timeit(lambda: ring.append(record), number=APPENDS)
+
+    print(f"{CONVERSATIONS} conversations x {MESSAGES} messages of {MESSAGE_CHARS} chars")
+    print(f"  message content alone:  {content_bytes / 2**20:8.2f} MiB")
+    print(f"  pydantic ChatMessage:   {before / 2**20:8.2f} MiB "
+          f"({(before - content_bytes) / messages:5.0f} B/message overhead)")
+    print(f"  MessageRecord ring:     {after / 2**20:8.2f} MiB "
+          f"({(after - content_bytes) / messages:5.0f} B/message overhead)")
+    print(f"  saved:                  {(before - after) / 2**20:8.2f} MiB per 1k conversations")
+    print(f"Append at the {MESSAGES}-message cap ({APPENDS} appends)")
+    print(f"  list slice:             {sliced / APPENDS * 1e6:8.2f} us/append")
+    print(f"  ring overwrite:         {ringed / APPENDS * 1e6:8.2f} us/append")
+
+
+if __name__ == "__main__":
+    main()
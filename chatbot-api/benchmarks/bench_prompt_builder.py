@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""Microbenchmark: full prompt rebuild vs. memoized per-conversation prefix."""
+
+import sys
+import timeit
+from pathlib import Path
+
+# Add the app directory to the path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.models import ChatMessage
+from app.services.prompt_builder import PromptPrefixCache, build_prompt
+
+
+MESSAGE_COUNT = 50
+MESSAGE_CHARS = 400
+ITERATIONS = 2000
+
+
+def make_history(count: int) -> list:
+    """Build a conversation of alternating user/assistant messages."""
+    return [
+        ChatMessage(
+            role="user" if i % 2 == 0 else "assistant",
+            content=f"Message {i}: " + "lorem ipsum " * (MESSAGE_CHARS // 12)
+        )
+        for i in range(count)
+    ]
+
+
+def main():
+    """Run the benchmark and print per-turn timings."""
+    history = make_history(MESSAGE_COUNT)
+    cache = PromptPrefixCache()
+    cache.get("bench", history)
+
+    full = timeit.timeit(lambda: build_prompt("next question", history), number=ITERATIONS)
+    memoized = timeit.timeit(
+        lambda: build_prompt("next question", history, cache.get("bench", history)),
+        number=ITERATIONS
+    )
+
+    # Steady state at the message cap: one new message in, the oldest one out
+    rolling = list(history)
+    steady_cache = PromptPrefixCache()
+    steady_cache.get("bench", rolling)
+    extra = iter(make_history(ITERATIONS))
+
+    def rolling_turn():
+        rolling.append(next(extra))
+        del rolling[0]
+        return build_prompt("next question", rolling, steady_cache.get("bench", rolling))
+
+    steady = timeit.timeit(rolling_turn, number=ITERATIONS)
+
+    assert build_prompt("q", history) == build_prompt("q", history, cache.get("bench", history))
+
+    print(f"Prompt assembly for a {MESSAGE_COUNT}-message conversation ({ITERATIONS} turns)")
+    print(f"  full rebuild:         {full / ITERATIONS * 1e6:8.1f} us/turn")
+    print(f"  memoized prefix:      {memoized / ITERATIONS * 1e6:8.1f} us/turn")
+    print(f"  memoized, at the cap: {steady / ITERATIONS * 1e6:8.1f} us/turn")
+    print(f"  speedup:              {full / memoized:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""Local stand-in for Ollama, for load tests that run without a model.
+
+Streams NDJSON from /api/generate at a configurable speed (tokens/sec,
+time to first token, jitter and error rate), or replays streams recorded
+from a real Ollama:
+
+    curl -sN http://localhost:11434/api/generate \\
+      -d '{"model": "qwen3:1.7b", "prompt": "Tell me a story"}' > streams/story.ndjson
+    python benchmarks/fake_ollama.py --replay streams/
+
+Replayed streams keep their recorded pacing (from the final chunk's
+durations) unless --tokens-per-second or --ttft are given.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import itertools
+import json
+import random
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, AsyncGenerator, Dict, List, Optional
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+WORDS = (
+    "the quick brown fox jumps over a lazy dog while streaming tokens arrive at "
+    "a steady pace so that latency percentiles mean something under load"
+).split()
+EMBEDDING_DIMENSIONS = 64
+
+
+@dataclass
+class Recording:
+    """A recorded /api/generate stream."""
+
+    tokens: List[str]
+    final: Dict[str, Any]
+
+    @classmethod
+    def load(cls, path: Path) -> "Recording":
+        """Parse an NDJSON stream saved from Ollama."""
+        tokens: List[str] = []
+        final: Dict[str, Any] = {}
+        for line in path.read_text().splitlines():
+            if not line.strip():
+                continue
+            chunk = json.loads(line)
+            if chunk.get("done"):
+                final = chunk
+            elif chunk.get("response"):
+                tokens.append(chunk["response"])
+        return cls(tokens, final)
+
+
+@dataclass
+class FakeOllamaConfig:
+    """Behaviour of the fake server."""
+
+    model: str = "qwen3:1.7b"
+    tokens: int = 64
+    tokens_per_second: Optional[float] = None
+    ttft: Optional[float] = None
+    jitter: float = 0.1
+    error_rate: float = 0.0
+    context_length: int = 8192
+    recordings: List[Recording] = field(default_factory=list)
+    seed: Optional[int] = None
+
+    # Pacing used when neither the options nor a recording say otherwise
+    DEFAULT_TOKENS_PER_SECOND = 50.0
+    DEFAULT_TTFT = 0.2
+
+
+class FakeOllama:
+    """Generates token streams according to a ``FakeOllamaConfig``."""
+
+    def __init__(self, config: FakeOllamaConfig):
+        self.config = config
+        self.random = random.Random(config.seed)
+        self._recordings = itertools.cycle(config.recordings) if config.recordings else None
+        self.requests = 0
+        self.errors = 0
+
+    def _jittered(self, seconds: float) -> float:
+        """Spread a delay by up to ``jitter`` of its length either way."""
+        jitter = self.config.jitter
+        if jitter <= 0:
+            return seconds
+        return max(0.0, seconds * (1 + self.random.uniform(-jitter, jitter)))
+
+    def _plan(self, body: Dict[str, Any]):
+        """Choose the tokens, TTFT and token interval for one generation."""
+        config = self.config
+        limit = (body.get("options") or {}).get("num_predict")
+        tokens_per_second = config.tokens_per_second
+        ttft = config.ttft
+        if self._recordings is not None:
+            recording = next(self._recordings)
+            tokens = recording.tokens
+            final = recording.final
+            # Fall back to the recorded pace for whatever wasn't set explicitly
+            if tokens_per_second is None and final.get("eval_count") and final.get("eval_duration"):
+                tokens_per_second = final["eval_count"] / (final["eval_duration"] / 1e9)
+            if ttft is None and final.get("prompt_eval_duration") is not None:
+                ttft = (final.get("load_duration", 0) + final["prompt_eval_duration"]) / 1e9
+        else:
+            tokens = [WORDS[i % len(WORDS)] + " " for i in range(config.tokens)]
+        if limit:
+            tokens = tokens[:limit]
+        tokens_per_second = tokens_per_second or config.DEFAULT_TOKENS_PER_SECOND
+        ttft = config.DEFAULT_TTFT if ttft is None else ttft
+        return tokens, ttft, 1.0 / tokens_per_second
+
+    def _final(self, body: Dict[str, Any], tokens: int, started: float, first_at: float) -> Dict[str, Any]:
+        """Build the closing chunk with Ollama's evaluation counters."""
+        now = time.perf_counter()
+        prompt = body.get("prompt", "")
+        return {
+            "model": body.get("model", self.config.model),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "response": "",
+            "done": True,
+            "done_reason": "stop",
+            "context": [1, 2, 3],
+            "total_duration": int((now - started) * 1e9),
+            "load_duration": 0,
+            "prompt_eval_count": max(1, len(prompt) // 4),
+            "prompt_eval_duration": int((first_at - started) * 1e9),
+            "eval_count": tokens,
+            "eval_duration": int((now - first_at) * 1e9),
+        }
+
+    def should_fail(self) -> bool:
+        """Roll for an injected upstream error."""
+        self.requests += 1
+        if self.config.error_rate > 0 and self.random.random() < self.config.error_rate:
+            self.errors += 1
+            return True
+        return False
+
+    async def stream(self, body: Dict[str, Any]) -> AsyncGenerator[bytes, None]:
+        """Stream NDJSON chunks at the planned pace."""
+        tokens, ttft, interval = self._plan(body)
+        model = body.get("model", self.config.model)
+        started = time.perf_counter()
+        # Schedule against absolute deadlines so sleep overshoot doesn't accumulate
+        deadline = started + self._jittered(ttft)
+        first_at = deadline
+        for index, token in enumerate(tokens):
+            delay = deadline - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if index == 0:
+                first_at = time.perf_counter()
+            yield (json.dumps({"model": model, "response": token, "done": False}) + "\n").encode()
+            deadline += self._jittered(interval)
+        yield (json.dumps(self._final(body, len(tokens), started, first_at)) + "\n").encode()
+
+    async def complete(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """Wait as long as the stream would take and return it in one body."""
+        started = time.perf_counter()
+        if not body.get("prompt"):
+            # Preload request: the model is always "loaded"
+            return self._final(body, 0, started, started)
+        tokens, ttft, interval = self._plan(body)
+        await asyncio.sleep(self._jittered(ttft))
+        first_at = time.perf_counter()
+        await asyncio.sleep(sum(self._jittered(interval) for _ in tokens))
+        final = self._final(body, len(tokens), started, first_at)
+        final["response"] = "".join(tokens)
+        return final
+
+
+def create_app(config: FakeOllamaConfig) -> FastAPI:
+    """Build the fake Ollama application."""
+    fake = FakeOllama(config)
+    app = FastAPI(title="Fake Ollama")
+    model_entry = {"name": config.model, "model": config.model, "size": 0, "size_vram": 0}
+
+    @app.get("/")
+    async def root():
+        return "Ollama is running"
+
+    @app.get("/api/tags")
+    async def tags():
+        return {"models": [model_entry]}
+
+    @app.get("/api/ps")
+    async def ps():
+        return {"models": [{**model_entry, "expires_at": "2099-01-01T00:00:00Z"}]}
+
+    @app.post("/api/show")
+    async def show():
+        return {"model_info": {"general.architecture": "fake", "fake.context_length": config.context_length}}
+
+    @app.post("/api/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        digest = hashlib.sha256(body.get("prompt", "").encode("utf-8")).digest()
+        return {"embedding": [digest[i % len(digest)] / 255 - 0.5 for i in range(EMBEDDING_DIMENSIONS)]}
+
+    @app.post("/api/generate")
+    async def generate(request: Request):
+        body = await request.json()
+        if fake.should_fail():
+            return JSONResponse({"error": "injected failure"}, status_code=500)
+        if not body.get("stream", True):
+            return await fake.complete(body)
+        return StreamingResponse(fake.stream(body), media_type="application/x-ndjson")
+
+    @app.get("/stats")
+    async def stats():
+        return {"requests": fake.requests, "errors": fake.errors}
+
+    return app
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Command-line options, shared with the load test's --spawn mode."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--model", default=FakeOllamaConfig.model, help="Model name to advertise")
+    parser.add_argument("--tokens", type=int, default=FakeOllamaConfig.tokens, help="Tokens per response")
+    parser.add_argument("--tokens-per-second", type=float, default=None,
+                        help=f"Generation speed (default {FakeOllamaConfig.DEFAULT_TOKENS_PER_SECOND:g})")
+    parser.add_argument("--ttft", type=float, default=None,
+                        help=f"Seconds before the first token (default {FakeOllamaConfig.DEFAULT_TTFT:g})")
+    parser.add_argument("--jitter", type=float, default=FakeOllamaConfig.jitter,
+                        help="Random spread of every delay, as a fraction of it")
+    parser.add_argument("--error-rate", type=float, default=FakeOllamaConfig.error_rate,
+                        help="Fraction of generate requests answered with HTTP 500")
+    parser.add_argument("--replay", type=Path, default=None,
+                        help="NDJSON file, or directory of *.ndjson files, recorded from Ollama")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for jitter and error injection")
+    return parser
+
+
+def config_from_args(args: argparse.Namespace) -> FakeOllamaConfig:
+    """Turn parsed options into a server config."""
+    recordings: List[Recording] = []
+    if args.replay is not None:
+        paths = sorted(args.replay.glob("*.ndjson")) if args.replay.is_dir() else [args.replay]
+        recordings = [Recording.load(path) for path in paths]
+        if not recordings:
+            raise SystemExit(f"No recorded streams found in {args.replay}")
+    return FakeOllamaConfig(
+        model=args.model,
+        tokens=args.tokens,
+        tokens_per_second=args.tokens_per_second,
+        ttft=args.ttft,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        recordings=recordings,
+        seed=args.seed,
+    )
+
+
+def main():
+    """Run the fake server."""
+    args = build_parser().parse_args()
+    app = create_app(config_from_args(args))
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning", access_log=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""Load test: drive /chat, /chat/stream and /models at a fixed concurrency.
+
+Reports requests/sec, latency, time to first token and inter-token
+percentiles, plus the API process's CPU and RSS. With --spawn, a fake
+Ollama (benchmarks/fake_ollama.py) and the API are started locally, so the
+whole run is offline:
+
+    python benchmarks/load_test.py --spawn --concurrency 32 --duration 30 \\
+        --api-env ADMISSION_MAX_CONCURRENCY=32
+    python benchmarks/load_test.py --url http://localhost:8000 --api-pid 1234
+
+Use --json to save the report for comparing runs.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+import httpx
+
+
+ROOT = Path(__file__).parent.parent
+DEFAULT_MIX = "stream=6,chat=3,models=1"
+PROMPTS = (
+    "Explain how a hash map works",
+    "Write a haiku about latency",
+    "What is the capital of Australia?",
+    "Summarize the plot of Hamlet in two sentences",
+    "Give me three tips for writing clean Python",
+)
+CONVERSATIONS = 200
+
+
+def percentile(values: Sequence[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of a sample (None when it is empty)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+@dataclass
+class Results:
+    """Measurements collected across all workers."""
+
+    latencies: Dict[str, List[float]] = field(default_factory=lambda: defaultdict(list))
+    errors: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    ttft: List[float] = field(default_factory=list)
+    inter_token: List[float] = field(default_factory=list)
+
+
+class ProcessSampler:
+    """Samples CPU time and RSS of a process and its children from /proc (Linux only)."""
+
+    def __init__(self, pid: int, interval: float = 0.25):
+        self.pid = pid
+        self.interval = interval
+        self.ticks = os.sysconf("SC_CLK_TCK")
+        self.page_size = os.sysconf("SC_PAGE_SIZE")
+        self.rss_samples: List[int] = []
+        self._cpu_start = 0.0
+        self._wall_start = 0.0
+        self.cpu_seconds = 0.0
+        self.wall_seconds = 0.0
+
+    def _tree(self) -> List[int]:
+        """The process and its descendants (supervisor workers included)."""
+        children: Dict[int, List[int]] = defaultdict(list)
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                stat = Path(f"/proc/{entry}/stat").read_text()
+            except OSError:
+                continue
+            ppid = int(stat.rsplit(")", 1)[1].split()[1])
+            children[ppid].append(int(entry))
+        tree, todo = [], [self.pid]
+        while todo:
+            pid = todo.pop()
+            tree.append(pid)
+            todo.extend(children.get(pid, ()))
+        return tree
+
+    def _read(self) -> Tuple[float, int]:
+        """Total CPU seconds and RSS bytes of the process tree."""
+        cpu, rss = 0.0, 0
+        for pid in self._tree():
+            try:
+                fields = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+            except OSError:
+                continue
+            # utime and stime are fields 14 and 15 of /proc/<pid>/stat, rss is 24
+            cpu += (int(fields[11]) + int(fields[12])) / self.ticks
+            rss += int(fields[21]) * self.page_size
+        return cpu, rss
+
+    def start(self) -> None:
+        self._cpu_start, _ = self._read()
+        self._wall_start = time.perf_counter()
+
+    async def run(self, stop: asyncio.Event) -> None:
+        """Sample until ``stop`` is set."""
+        while not stop.is_set():
+            _, rss = self._read()
+            self.rss_samples.append(rss)
+            try:
+                await asyncio.wait_for(stop.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+        cpu, _ = self._read()
+        self.cpu_seconds = cpu - self._cpu_start
+        self.wall_seconds = time.perf_counter() - self._wall_start
+
+    def report(self) -> Dict[str, Optional[float]]:
+        return {
+            "cpu_percent": round(100 * self.cpu_seconds / self.wall_seconds, 1) if self.wall_seconds else None,
+            "rss_mib_mean": round(sum(self.rss_samples) / len(self.rss_samples) / 2**20, 1) if self.rss_samples else None,
+            "rss_mib_peak": round(max(self.rss_samples) / 2**20, 1) if self.rss_samples else None,
+        }
+
+
+def parse_mix(mix: str) -> List[Tuple[str, int]]:
+    """Parse ``stream=6,chat=3,models=1`` into weighted request kinds."""
+    weights = []
+    for part in mix.split(","):
+        kind, _, weight = part.partition("=")
+        kind = kind.strip()
+        if kind not in ("stream", "chat", "models"):
+            raise SystemExit(f"Unknown request kind in --mix: {kind}")
+        weights.append((kind, int(weight or 1)))
+    return weights
+
+
+async def run_stream(client: httpx.AsyncClient, payload: dict, conversation_id: str, results: Results) -> None:
+    """One /chat/stream request, timing the first and every later content frame."""
+    started = time.perf_counter()
+    last: Optional[float] = None
+    async with client.stream(
+        "POST", "/api/v1/chat/stream", json=payload, params={"conversation_id": conversation_id}
+    ) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line.startswith("data: ") or line == "data: [DONE]":
+                continue
+            chunk = json.loads(line[6:])
+            if chunk.get("is_complete"):
+                if chunk.get("content"):
+                    raise RuntimeError(chunk["content"])
+                break
+            if not chunk.get("content"):
+                continue
+            now = time.perf_counter()
+            if last is None:
+                # Upstream failures are streamed back as an error message
+                if chunk["content"].startswith("Error:"):
+                    raise RuntimeError(chunk["content"])
+                results.ttft.append(now - started)
+            else:
+                results.inter_token.append(now - last)
+            last = now
+
+
+async def worker(
+    client: httpx.AsyncClient,
+    kinds: List[str],
+    deadline: float,
+    remaining: List[int],
+    results: Results,
+    rng: random.Random
+) -> None:
+    """Issue requests back to back until the deadline or request budget runs out."""
+    while time.perf_counter() < deadline:
+        if remaining[0] == 0:
+            return
+        remaining[0] -= 1
+        kind = rng.choice(kinds)
+        payload = {"message": rng.choice(PROMPTS)}
+        conversation_id = f"load-{rng.randrange(CONVERSATIONS)}"
+        started = time.perf_counter()
+        try:
+            if kind == "stream":
+                await run_stream(client, payload, conversation_id, results)
+            elif kind == "chat":
+                response = await client.post(
+                    "/api/v1/chat", json=payload, params={"conversation_id": conversation_id}
+                )
+                response.raise_for_status()
+                if response.json()["message"].startswith("Error:"):
+                    raise RuntimeError(response.json()["message"])
+            else:
+                response = await client.get("/api/v1/models")
+                response.raise_for_status()
+        except Exception:
+            results.errors[kind] += 1
+            continue
+        results.latencies[kind].append(time.perf_counter() - started)
+
+
+def summarize(values: Sequence[float]) -> Dict[str, Optional[float]]:
+    """p50/p95/p99 in milliseconds."""
+    return {
+        f"p{pct}": round(percentile(values, pct) * 1000, 2) if values else None
+        for pct in (50, 95, 99)
+    }
+
+
+async def run_load(args: argparse.Namespace, api_pid: Optional[int]) -> dict:
+    """Drive the API and build the report."""
+    kinds = [kind for kind, weight in parse_mix(args.mix) for _ in range(weight)]
+    results = Results()
+    rng = random.Random(args.seed)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    sampler = ProcessSampler(api_pid) if api_pid and Path("/proc").is_dir() else None
+    stop = asyncio.Event()
+
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        # Warm up connections and the API's model/context caches
+        for _ in range(min(args.concurrency, 4)):
+            await worker(client, kinds, time.perf_counter() + 60, [1], Results(), rng)
+        if sampler is not None:
+            sampler.start()
+        sampling = asyncio.create_task(sampler.run(stop)) if sampler is not None else None
+        remaining = [args.requests if args.requests else -1]
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            worker(client, kinds, started + args.duration, remaining, results, random.Random(rng.random()))
+            for _ in range(args.concurrency)
+        ))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        if sampling is not None:
+            await sampling
+
+    report = {
+        "concurrency": args.concurrency,
+        "elapsed_seconds": round(elapsed, 2),
+        "requests_per_second": round(sum(len(v) for v in results.latencies.values()) / elapsed, 2),
+        "endpoints": {
+            kind: {
+                "requests": len(results.latencies[kind]),
+                "errors": results.errors[kind],
+                "requests_per_second": round(len(results.latencies[kind]) / elapsed, 2),
+                "latency_ms": summarize(results.latencies[kind]),
+            }
+            for kind in sorted(set(kinds))
+        },
+        "ttft_ms": summarize(results.ttft),
+        "inter_token_ms": summarize(results.inter_token),
+        "api_process": sampler.report() if sampler is not None else None,
+    }
+    return report
+
+
+def print_report(report: dict) -> None:
+    """Print the report as a table."""
+    def row(label: str, stats: Dict[str, Optional[float]]) -> str:
+        cells = "".join(f"{('-' if v is None else f'{v:.1f}'):>10}" for v in stats.values())
+        return f"  {label:<30}{cells}"
+
+    print(f"{report['concurrency']} concurrent clients for {report['elapsed_seconds']} s: "
+          f"{report['requests_per_second']} req/s")
+    print(f"  {'':<30}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for kind, endpoint in report["endpoints"].items():
+        label = f"{kind} ({endpoint['requests_per_second']} req/s, {endpoint['errors']} err)"
+        print(row(label, endpoint["latency_ms"]))
+    print(row("time to first token", report["ttft_ms"]))
+    print(row("inter-token", report["inter_token_ms"]))
+    process = report["api_process"]
+    if process:
+        print(f"  API process: {process['cpu_percent']}% CPU, "
+              f"RSS {process['rss_mib_mean']} MiB mean / {process['rss_mib_peak']} MiB peak")
+
+
+async def wait_until_up(url: str, timeout: float) -> None:
+    """Poll a URL until it answers."""
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(timeout=2) as client:
+        while True:
+            try:
+                await client.get(url)
+                return
+            except httpx.TransportError:
+                if time.monotonic() > deadline:
+                    raise SystemExit(f"{url} did not come up within {timeout:.0f} s")
+                await asyncio.sleep(0.2)
+
+
+def spawn(args: argparse.Namespace) -> List[subprocess.Popen]:
+    """Start a fake Ollama and the API against it."""
+    fake_args = [
+        sys.executable, str(ROOT / "benchmarks" / "fake_ollama.py"),
+        "--port", str(args.fake_port),
+        "--tokens", str(args.tokens),
+        "--jitter", str(args.jitter),
+        "--error-rate", str(args.error_rate),
+    ]
+    # Left unset, replayed streams keep their recorded pace
+    if args.tokens_per_second is not None:
+        fake_args += ["--tokens-per-second", str(args.tokens_per_second)]
+    if args.ttft is not None:
+        fake_args += ["--ttft", str(args.ttft)]
+    if args.replay:
+        fake_args += ["--replay", str(args.replay)]
+    fake = subprocess.Popen(fake_args)
+    env = {
+        **os.environ,
+        "OLLAMA_BASE_URL": f"http://127.0.0.1:{args.fake_port}",
+        "API_HOST": "127.0.0.1",
+        "API_PORT": str(args.api_port),
+        "LOG_LEVEL": "WARNING",
+        **dict(setting.split("=", 1) for setting in args.api_env),
+    }
+    # The API logs to stdout; keep its request logs out of the report
+    api = subprocess.Popen([sys.executable, "-m", "app.main"], cwd=ROOT, env=env, stdout=subprocess.DEVNULL)
+    args.url = f"http://127.0.0.1:{args.api_port}"
+    return [api, fake]
+
+
+def main():
+    """Parse options, run the load test and print (or save) the report."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000", help="API base URL")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds to run")
+    parser.add_argument("--requests", type=int, default=0, help="Stop after this many requests (0 = no limit)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Weighted request kinds (default {DEFAULT_MIX})")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--api-pid", type=int, default=None, help="Process to sample CPU and RSS from")
+    parser.add_argument("--json", type=Path, default=None, help="Also write the report to this file")
+    spawned = parser.add_argument_group("spawned servers (--spawn)")
+    spawned.add_argument("--spawn", action="store_true", help="Start a fake Ollama and the API locally")
+    spawned.add_argument("--api-port", type=int, default=8765)
+    spawned.add_argument("--fake-port", type=int, default=11435)
+    spawned.add_argument("--tokens", type=int, default=64)
+    spawned.add_argument("--tokens-per-second", type=float, default=None, help="Fake generation speed (default 50)")
+    spawned.add_argument("--ttft", type=float, default=None, help="Fake time to first token (default 0.2 s)")
+    spawned.add_argument("--jitter", type=float, default=0.1)
+    spawned.add_argument("--error-rate", type=float, default=0.0)
+    spawned.add_argument("--replay", type=Path, default=None, help="Recorded streams for the fake Ollama")
+    spawned.add_argument("--api-env", action="append", default=[], metavar="KEY=VALUE",
+                         help="Setting for the API, e.g. ADMISSION_MAX_CONCURRENCY=32 (repeatable)")
+    args = parser.parse_args()
+
+    processes: List[subprocess.Popen] = []
+    api_pid = args.api_pid
+    try:
+        if args.spawn:
+            processes = spawn(args)
+            api_pid = processes[0].pid
+            asyncio.run(wait_until_up(f"{args.url}/", 60))
+        report = asyncio.run(run_load(args, api_pid))
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    print_report(report)
+    if args.json is not None:
+        args.json.write_text(json.dumps(report, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""Test that admission slots are always given back, and how batch work shares them."""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# Add the app directory to the path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.services.admission import AdmissionController
+
+
+async def hand_over_then_abandon():
+    """Release a queued ticket after a slot was handed to it but before it waited."""
+    controller = AdmissionController(max_concurrency=1, max_queue=4)
+    first = controller.enter("model")
+    second = controller.enter("model")
+    assert second.position == 1
+
+    # Freeing the first slot hands it to the queued ticket...
+    first.release()
+    assert controller.stats()["model"]["active"] == 1
+    # ...which is abandoned without ever waiting (e.g. a cancelled stream)
+    second.release()
+    return controller.stats()["model"]
+
+
+async def cancel_while_queued():
+    """Cancel a ticket that is still waiting for a slot."""
+    controller = AdmissionController(max_concurrency=1, max_queue=4)
+    first = controller.enter("model")
+    second = controller.enter("model")
+    waiting = asyncio.create_task(second.wait())
+    await asyncio.sleep(0)
+    waiting.cancel()
+    await asyncio.gather(waiting, return_exceptions=True)
+    first.release()
+    return controller.stats()["model"]
+
+
+async def single_slot_batch():
+    """Mix batch and interactive work on a model with one slot."""
+    controller = AdmissionController(max_concurrency=1, max_queue=4)
+    steps = []
+
+    # An idle model runs a batch item
+    batch = controller.enter("model", batch=True)
+    steps.append(batch.position)
+    # An interactive request waits behind that one item only
+    interactive = controller.enter("model")
+    next_batch = controller.enter("model", batch=True)
+    steps.append((interactive.position, next_batch.position))
+    batch.release()
+    await interactive.wait()
+    stats = controller.stats()["model"]
+    steps.append((stats["active"], stats["batch_active"], stats["batch_queued"]))
+    # Batch work resumes once the model is idle again
+    interactive.release()
+    await next_batch.wait()
+    steps.append(controller.stats()["model"]["batch_active"])
+    next_batch.release()
+    return steps
+
+
+async def multi_slot_batch():
+    """Fill a two-slot model with batch work."""
+    controller = AdmissionController(max_concurrency=2, max_queue=4)
+    first = controller.enter("model", batch=True)
+    second = controller.enter("model", batch=True)
+    interactive = controller.enter("model")
+    positions = (first.position, second.position, interactive.position)
+    for ticket in (first, second, interactive):
+        ticket.release()
+    return positions
+
+
+def test_batch_waits_for_idle_single_slot():
+    """With one slot, batch work runs only while the model is otherwise idle."""
+    steps = asyncio.run(single_slot_batch())
+    assert steps == [0, (1, 1), (1, 0, 1), 1]
+
+
+def test_batch_leaves_a_slot_free():
+    """With several slots, batch work leaves one free for interactive requests."""
+    assert asyncio.run(multi_slot_batch()) == (0, 1, 0)
+
+
+def test_slot_returned_when_handed_over_ticket_is_abandoned():
+    """A slot handed to a queued ticket is freed when the ticket is released unused."""
+    stats = asyncio.run(hand_over_then_abandon())
+    assert stats["active"] == 0
+    assert stats["queued"] == 0
+
+
+def test_slot_returned_when_queued_ticket_is_cancelled():
+    """Cancelling a queued ticket leaves no slot held and nothing queued."""
+    stats = asyncio.run(cancel_while_queued())
+    assert stats["active"] == 0
+    assert stats["queued"] == 0
+
+
+if __name__ == "__main__":
+    test_slot_returned_when_handed_over_ticket_is_abandoned()
+    test_slot_returned_when_queued_ticket_is_cancelled()
+    test_batch_waits_for_idle_single_slot()
+    test_batch_leaves_a_slot_free()
+    print("✅ Admission slots are returned")
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Test that batch claims are exclusive and always given back."""
+
+import asyncio
+import sys
+from pathlib import Path
+import httpx
+
+# Add the app directory to the path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.api import routes
+from app.main import app
+from app.models import ChatRequest, GenerationResult
+
+
+async def slow_item(request: ChatRequest) -> GenerationResult:
+    await asyncio.sleep(0.1)
+    return GenerationResult(content=f"re: {request.message}", model="batch-model")
+
+
+def batch_scope(batch_id: str):
+    path = f"/api/v1/chat/batch/{batch_id}"
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0", "spec_version": "2.3"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"testserver")],
+        "client": ("127.0.0.1", 12345),
+        "server": ("testserver", 80),
+    }
+
+
+async def concurrent_resumes(batch_id: str):
+    """Resume the same batch twice at once, then once more after both finish."""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        first, second = await asyncio.gather(
+            client.get(f"/api/v1/chat/batch/{batch_id}"),
+            client.get(f"/api/v1/chat/batch/{batch_id}")
+        )
+        again = await client.get(f"/api/v1/chat/batch/{batch_id}")
+    return sorted([first.status_code, second.status_code]), again.status_code
+
+
+async def client_gone_before_start(batch_id: str) -> None:
+    """Resume a batch for a client whose connection fails as the response starts."""
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            raise OSError("connection reset")
+
+    try:
+        await app(batch_scope(batch_id), receive, send)
+    except OSError:
+        pass
+
+
+def test_concurrent_resumes_are_exclusive():
+    """Only one of two simultaneous resumes runs the batch; the claim is then released."""
+    routes.chat_service.batches.run_item = slow_item
+    batch_id = routes.chat_service.batches.create([ChatRequest(message="a")], "exclusive-batch")
+
+    statuses, again = asyncio.run(concurrent_resumes(batch_id))
+
+    assert statuses == [200, 409]
+    assert again == 200
+    assert not routes.chat_service.batches.get(batch_id).running
+
+
+def test_claim_released_when_body_never_starts():
+    """A response that fails before its body starts doesn't leave the batch busy."""
+    routes.chat_service.batches.run_item = slow_item
+    batch_id = routes.chat_service.batches.create([ChatRequest(message="b")], "abandoned-batch")
+
+    asyncio.run(client_gone_before_start(batch_id))
+
+    assert not routes.chat_service.batches.get(batch_id).running
+
+
+if __name__ == "__main__":
+    test_concurrent_resumes_are_exclusive()
+    test_claim_released_when_body_never_starts()
+    print("✅ Batch claims are exclusive and released")
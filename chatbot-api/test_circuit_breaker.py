@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""Test the circuit breaker state machine and how the pool uses it to eject backends."""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import httpx
+
+# Add the app directory to the path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from app.services.ollama_pool import NoBackendAvailableError, OllamaPool
+
+
+def expire(breaker: CircuitBreaker) -> None:
+    """Pretend the breaker has been open for its whole reset timeout."""
+    breaker.opened_at -= breaker.reset_timeout
+
+
+def test_opens_after_threshold():
+    """Consecutive failures open the circuit only once the threshold is reached."""
+    breaker = CircuitBreaker("backend", failure_threshold=3, reset_timeout=30.0)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    assert breaker.available()
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.available()
+    assert breaker.retry_after() > 1
+
+
+def test_success_resets_failure_count():
+    """A success in between failures starts the count again."""
+    breaker = CircuitBreaker("backend", failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+
+def test_half_open_trial_success_closes():
+    """After the timeout one trial is let through, and its success closes the circuit."""
+    breaker = CircuitBreaker("backend", failure_threshold=1)
+    breaker.record_failure()
+    expire(breaker)
+    assert breaker.available()
+
+    assert breaker.begin() is True
+    assert breaker.state == HALF_OPEN
+    # Only one trial at a time
+    assert not breaker.available()
+    assert breaker.begin() is False
+
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.begin() is False
+
+
+def test_half_open_trial_failure_reopens():
+    """A failed trial re-opens the circuit for another full timeout."""
+    breaker = CircuitBreaker("backend", failure_threshold=5)
+    for _ in range(5):
+        breaker.record_failure()
+    expire(breaker)
+    assert breaker.begin() is True
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.available()
+
+
+def test_end_trial_without_outcome():
+    """A trial that ends without an outcome lets the next request try straight away."""
+    breaker = CircuitBreaker("backend", failure_threshold=1)
+    breaker.record_failure()
+    expire(breaker)
+    assert breaker.begin() is True
+
+    breaker.end_trial()
+    assert breaker.state == OPEN
+    assert breaker.available()
+    assert breaker.begin() is True
+
+
+def test_slow_first_token_counts_as_failure():
+    """A first token slower than ``slow_ttft`` counts against the backend."""
+    breaker = CircuitBreaker("backend", failure_threshold=2, slow_ttft=1.0)
+    breaker.record_ttft(0.5)
+    breaker.record_ttft(2.0)
+    assert breaker.state == CLOSED
+    breaker.record_ttft(2.0)
+    assert breaker.state == OPEN
+
+
+def test_disabled_breaker_never_opens():
+    """A zero threshold disables the breaker."""
+    breaker = CircuitBreaker("backend", failure_threshold=0)
+    for _ in range(10):
+        breaker.record_failure()
+    assert breaker.state == CLOSED
+    assert breaker.available()
+
+
+async def fail_lease(pool: OllamaPool, backend, error: Exception) -> None:
+    """Raise an error inside a lease on one backend, as a failed request would."""
+    exclude = [other for other in pool.backends if other is not backend]
+    try:
+        async with pool.lease("llama2", exclude) as leased:
+            assert leased is backend
+            raise error
+    except type(error):
+        pass
+
+
+async def lease_errors():
+    """Fail leases with a read timeout and a refused connection."""
+    async with httpx.AsyncClient() as client:
+        pool = OllamaPool(["http://a", "http://b"], client, failure_threshold=2)
+        first, second = pool.backends
+
+        # A read timeout counts against the breaker but doesn't eject
+        await fail_lease(pool, first, httpx.ReadTimeout("slow"))
+        assert first.healthy
+        assert first.breaker.failures == 1
+        assert first.in_flight == 0
+
+        # A refused connection ejects the backend right away
+        await fail_lease(pool, second, httpx.ConnectError("refused"))
+        assert not second.healthy
+        assert second.breaker.failures == 1
+
+        # A second read timeout on the remaining backend opens its circuit
+        await fail_lease(pool, first, httpx.ReadTimeout("slow"))
+        assert first.healthy
+        assert first.breaker.state == OPEN
+        try:
+            pool.select("llama2")
+        except NoBackendAvailableError as e:
+            return e.retry_after
+        raise AssertionError("select() should fail with every backend out")
+
+
+def test_pool_ejects_only_on_connect_errors():
+    """Only connection errors eject a backend; other failures go through the breaker."""
+    retry_after = asyncio.run(lease_errors())
+    assert retry_after >= 1
+
+
+if __name__ == "__main__":
+    test_opens_after_threshold()
+    test_success_resets_failure_count()
+    test_half_open_trial_success_closes()
+    test_half_open_trial_failure_reopens()
+    test_end_trial_without_outcome()
+    test_slow_first_token_counts_as_failure()
+    test_disabled_breaker_never_opens()
+    test_pool_ejects_only_on_connect_errors()
+    print("✅ Circuit breaker works")
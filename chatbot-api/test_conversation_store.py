@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Test conversation store eviction: LRU order, idle TTL, byte budget and per-conversation caps."""
+
+import sys
+from pathlib import Path
+
+# Add the app directory to the path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.services.conversation_store import (
+    CONVERSATION_OVERHEAD_BYTES,
+    ConversationStore,
+    message_size,
+)
+from app.services.message_ring import MessageRecord
+
+
+def record(content: str, role: str = "user") -> MessageRecord:
+    return MessageRecord(role, content)
+
+
+def age(store: ConversationStore, conversation_id: str, seconds: float) -> None:
+    """Pretend a conversation was last used ``seconds`` ago."""
+    store._conversations[conversation_id].last_access -= seconds
+
+
+def test_byte_accounting():
+    """Totals follow appends and deletes exactly."""
+    store = ConversationStore(max_bytes=0, idle_ttl=0)
+    store.append("a", record("hello"))
+    store.append("a", record("world!"))
+    expected = CONVERSATION_OVERHEAD_BYTES + message_size(record("hello")) + message_size(record("world!"))
+    assert store.total_bytes == expected
+    assert store.total_messages == 2
+
+    assert store.delete("a") is True
+    assert store.delete("a") is False
+    assert (store.total_bytes, store.total_messages) == (0, 0)
+
+
+def test_budget_evicts_least_recently_used():
+    """Going over budget evicts the conversation used longest ago, not the oldest created."""
+    evicted = []
+    one = CONVERSATION_OVERHEAD_BYTES + message_size(record("x" * 100))
+    store = ConversationStore(max_bytes=3 * one, idle_ttl=0, on_evict=evicted.append)
+    for conversation_id in ("a", "b", "c"):
+        store.append(conversation_id, record("x" * 100))
+    # Reading "a" makes "b" the least recently used
+    store.get("a")
+
+    store.append("d", record("x" * 100))
+    assert evicted == ["b"]
+    assert "b" not in store
+    assert store.stats()["evictions"] == 1
+    assert store.total_bytes <= store.max_bytes
+
+
+def test_budget_keeps_the_conversation_just_written():
+    """A single conversation larger than the budget is kept rather than evicted on write."""
+    store = ConversationStore(max_bytes=100, idle_ttl=0)
+    store.append("other", record("x"))
+    store.append("big", record("x" * 1000))
+    assert "other" not in store
+    assert [message.content for message in store.get("big")] == ["x" * 1000]
+
+
+def test_idle_conversations_expire():
+    """Conversations idle past the TTL are dropped; recently used ones are kept."""
+    evicted = []
+    store = ConversationStore(max_bytes=0, idle_ttl=60, on_evict=evicted.append)
+    store.append("idle", record("old"))
+    store.append("busy", record("new"))
+    age(store, "idle", 61)
+    age(store, "busy", 30)
+
+    assert store.get("idle") == []
+    assert [message.content for message in store.get("busy")] == ["new"]
+    assert evicted == ["idle"]
+    stats = store.stats()
+    assert (stats["conversations"], stats["expirations"], stats["messages"]) == (1, 1, 1)
+
+
+def test_message_cap_overwrites_oldest():
+    """A full conversation drops its oldest message and keeps its byte count in step."""
+    store = ConversationStore(max_bytes=0, idle_ttl=0, max_messages=3)
+    for content in ("1", "22", "333", "4444", "55555"):
+        store.append("a", record(content))
+
+    assert [message.content for message in store.get("a")] == ["333", "4444", "55555"]
+    expected = CONVERSATION_OVERHEAD_BYTES + sum(
+        message_size(record(content)) for content in ("333", "4444", "55555")
+    )
+    assert store.total_bytes == expected
+    assert store.total_messages == 3
+
+
+def test_adopted_conversation_counts_against_budget():
+    """A conversation loaded from elsewhere is capped, counted and can push others out."""
+    one = CONVERSATION_OVERHEAD_BYTES + message_size(record("x" * 100))
+    store = ConversationStore(max_bytes=2 * one, idle_ttl=0, max_messages=2)
+    store.append("a", record("x" * 100))
+    store.append("b", record("x" * 100))
+
+    store._adopt("loaded", [record("x" * 100) for _ in range(5)])
+    assert len(store.get("loaded")) == 2
+    assert "a" not in store and "b" not in store
+    assert store.total_messages == 2
+
+
+if __name__ == "__main__":
+    test_byte_accounting()
+    test_budget_evicts_least_recently_used()
+    test_budget_keeps_the_conversation_just_written()
+    test_idle_conversations_expire()
+    test_message_cap_overwrites_oldest()
+    test_adopted_conversation_counts_against_budget()
+    print("✅ Conversation store stays within its bounds")
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Test that a client disconnect stops the upstream Ollama generation."""
+
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+import httpx
+
+# Add the app directory to the path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.api import routes
+from app.main import app
+
+
+TOKEN_INTERVAL = 0.05
+TOKEN_COUNT = 400  # ~20 s of generation if nothing stops it
+MAX_CLOSE_DELAY = 1.0
+
+
+class SlowUpstream:
+    """Fake Ollama that streams tokens slowly and records when it is closed."""
+
+    def __init__(self):
+        self.tokens_sent = 0
+        self.closed_at = None
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        if request.url.path != "/api/generate":
+            return httpx.Response(404)
+        return httpx.Response(200, content=self.generate())
+
+    async def generate(self):
+        try:
+            for _ in range(TOKEN_COUNT):
+                await asyncio.sleep(TOKEN_INTERVAL)
+                self.tokens_sent += 1
+                yield (json.dumps({"response": "token ", "done": False}) + "\n").encode()
+            yield (json.dumps({"response": "", "done": True}) + "\n").encode()
+        finally:
+            self.closed_at = time.monotonic()
+
+
+async def stream_then_disconnect(upstream: SlowUpstream, conversation_id: str) -> float:
+    """Start a streaming chat over ASGI and drop the client after a few frames.
+
+    Returns:
+        Time at which the client disconnected
+    """
+    service = routes.chat_service
+    client = httpx.AsyncClient(transport=httpx.MockTransport(upstream.handler))
+    service.ollama_service.client = client
+    service.ollama_service.pool.client = client
+
+    body = json.dumps({"message": "Tell me a long story", "model": "slow-model"}).encode()
+    disconnect = asyncio.Event()
+    disconnected_at = None
+    frames = []
+    body_sent = False
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal disconnected_at
+        if message["type"] == "http.response.body" and message.get("body"):
+            frames.append(message["body"])
+            if len(frames) == 3:
+                disconnected_at = time.monotonic()
+                disconnect.set()
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0", "spec_version": "2.3"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/api/v1/chat/stream",
+        "raw_path": b"/api/v1/chat/stream",
+        "query_string": f"conversation_id={conversation_id}".encode(),
+        "root_path": "",
+        "headers": [(b"host", b"testserver"), (b"content-type", b"application/json")],
+        "client": ("127.0.0.1", 12345),
+        "server": ("testserver", 80),
+    }
+    try:
+        await asyncio.wait_for(app(scope, receive, send), timeout=10)
+    finally:
+        await client.aclose()
+    return disconnected_at
+
+
+def test_upstream_closed_on_client_disconnect():
+    """The upstream stream is closed promptly and the partial reply is kept."""
+    upstream = SlowUpstream()
+    conversation_id = "disconnect-test"
+
+    disconnected_at = asyncio.run(stream_then_disconnect(upstream, conversation_id))
+
+    assert disconnected_at is not None, "client never received enough frames"
+    assert upstream.closed_at is not None, "upstream stream was never closed"
+    assert upstream.closed_at - disconnected_at < MAX_CLOSE_DELAY
+    assert upstream.tokens_sent < TOKEN_COUNT
+
+    history = routes.chat_service.get_conversation_history(conversation_id)
+    assert [message.role for message in history] == ["user", "assistant"]
+    assert history[-1].truncated
+    assert history[-1].content.startswith("token")
+
+
+if __name__ == "__main__":
+    test_upstream_closed_on_client_disconnect()
+    print("✅ Upstream closed on client disconnect")
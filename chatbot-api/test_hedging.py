@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""Test hedged streaming: winner selection, cancelling losers and backpressure."""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# Add the app directory to the path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.services import hedging
+from app.services.hedging import hedged_stream
+
+
+class FakeUpstream:
+    """Hands out attempts with scripted delays and records how each one ended."""
+
+    def __init__(self, scripts):
+        self.scripts = list(scripts)
+        self.started = 0
+        self.closed = []
+        self.produced = []
+
+    def start(self):
+        index = self.started
+        self.started += 1
+        self.produced.append(0)
+        return self._attempt(index, self.scripts[index])
+
+    async def _attempt(self, index, script):
+        first_delay, items, error = script
+        try:
+            await asyncio.sleep(first_delay)
+            if error is not None:
+                raise error
+            for item in items:
+                self.produced[index] += 1
+                yield f"{index}:{item}"
+                await asyncio.sleep(0)
+        finally:
+            self.closed.append(index)
+
+
+async def collect(upstream, delay, can_hedge=lambda: True, max_attempts=2):
+    return [item async for item in hedged_stream(upstream.start, delay, can_hedge, max_attempts)]
+
+
+def test_fast_hedge_wins_and_loser_is_cancelled():
+    """A slow first attempt is hedged, beaten, and its stream is closed."""
+    upstream = FakeUpstream([
+        (5.0, ["a", "b"], None),
+        (0.0, ["a", "b", "c"], None),
+    ])
+    items = asyncio.run(collect(upstream, delay=0.05))
+    assert items == ["1:a", "1:b", "1:c"]
+    assert upstream.started == 2
+    assert sorted(upstream.closed) == [0, 1]
+    assert upstream.produced[0] == 0
+
+
+def test_no_hedge_when_first_token_is_fast():
+    """An attempt that answers within the delay is never hedged."""
+    upstream = FakeUpstream([(0.0, ["a", "b"], None), (0.0, ["x"], None)])
+    items = asyncio.run(collect(upstream, delay=1.0))
+    assert items == ["0:a", "0:b"]
+    assert upstream.started == 1
+
+
+def test_no_hedge_without_spare_backend():
+    """With nowhere to hedge to, the slow attempt is waited on."""
+    upstream = FakeUpstream([(0.1, ["a"], None), (0.0, ["x"], None)])
+    items = asyncio.run(collect(upstream, delay=0.01, can_hedge=lambda: False))
+    assert items == ["0:a"]
+    assert upstream.started == 1
+
+
+def test_failure_before_first_token_retries():
+    """An attempt failing before its first item is retried on another attempt."""
+    upstream = FakeUpstream([
+        (0.0, [], ConnectionError("refused")),
+        (0.0, ["a"], None),
+    ])
+    items = asyncio.run(collect(upstream, delay=1.0))
+    assert items == ["1:a"]
+    assert upstream.started == 2
+
+
+def test_every_attempt_failing_raises_last_error():
+    """When every attempt fails the last error is raised to the caller."""
+    upstream = FakeUpstream([
+        (0.0, [], ConnectionError("first")),
+        (0.0, [], ConnectionError("second")),
+    ])
+    try:
+        asyncio.run(collect(upstream, delay=1.0))
+    except ConnectionError as e:
+        assert str(e) == "second"
+    else:
+        raise AssertionError("hedged_stream should re-raise the failure")
+
+
+async def read_slowly(upstream):
+    """Take one item from a long stream, then stall like a slow client."""
+    stream = hedged_stream(upstream.start, 1.0, lambda: True)
+    first = await stream.__anext__()
+    await asyncio.sleep(0.1)
+    produced = upstream.produced[0]
+    await stream.aclose()
+    return first, produced
+
+
+def test_slow_consumer_backpressures_winner():
+    """The winner reads at most a bounded buffer ahead of a stalled consumer."""
+    upstream = FakeUpstream([(0.0, range(10 * hedging.ATTEMPT_BUFFER), None)])
+    first, produced = asyncio.run(read_slowly(upstream))
+    assert first == "0:0"
+    assert produced <= hedging.ATTEMPT_BUFFER + 2
+    assert upstream.closed == [0]
+
+
+if __name__ == "__main__":
+    test_fast_hedge_wins_and_loser_is_cancelled()
+    test_no_hedge_when_first_token_is_fast()
+    test_no_hedge_without_spare_backend()
+    test_failure_before_first_token_retries()
+    test_every_attempt_failing_raises_last_error()
+    test_slow_consumer_backpressures_winner()
+    print("✅ Hedged streaming works")
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Test paging through conversation history with cursors, and the NDJSON export."""
+
+import asyncio
+import gzip
+import sys
+from pathlib import Path
+import httpx
+import orjson
+
+# Add the app directory to the path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.api import routes
+from app.main import app
+from app.services.message_ring import MessageRecord
+
+
+def seed(conversation_id: str, count: int) -> None:
+    """Store ``count`` messages whose content is their position."""
+    for index in range(count):
+        role = "user" if index % 2 == 0 else "assistant"
+        routes.chat_service.add_message_to_conversation(conversation_id, MessageRecord(role, str(index)))
+
+
+async def read_pages(conversation_id: str, limit: int, cursor=None):
+    """Follow next_cursor from ``cursor`` until the last page."""
+    pages = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        while True:
+            params = {"limit": limit}
+            if cursor is not None:
+                params["cursor"] = cursor
+            response = await client.get(f"/api/v1/conversation/{conversation_id}", params=params)
+            assert response.status_code == 200
+            data = response.json()
+            pages.append([message["content"] for message in data["messages"]])
+            cursor = data["next_cursor"]
+            if cursor is None:
+                return pages, data["message_count"]
+
+
+async def get(path: str, **params) -> httpx.Response:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        return await client.get(path, params=params)
+
+
+def test_cursor_pages_cover_history_once():
+    """Following cursors returns every message once, in order."""
+    seed("paged-conversation", 7)
+    pages, count = asyncio.run(read_pages("paged-conversation", 3))
+    assert pages == [["0", "1", "2"], ["3", "4", "5"], ["6"]]
+    assert count == 7
+
+
+def test_cursor_survives_dropped_messages():
+    """A cursor into messages dropped by the cap resumes at the oldest one kept."""
+    cap = routes.chat_service.conversations.max_messages
+    seed("capped-conversation", cap + 5)
+    pages, _ = asyncio.run(read_pages("capped-conversation", cap, cursor="2"))
+    assert pages[0][0] == "5"
+    assert sum(len(page) for page in pages) == cap
+
+    # Positions count from the start of the conversation, not the ring
+    pages, _ = asyncio.run(read_pages("capped-conversation", 2, cursor=str(cap + 3)))
+    assert pages == [[str(cap + 3), str(cap + 4)]]
+
+
+def test_invalid_cursor_rejected():
+    """A cursor that isn't one we issued is a client error."""
+    response = asyncio.run(get("/api/v1/conversation/paged-conversation", cursor="abc"))
+    assert response.status_code == 400
+
+
+def exported(body: bytes) -> dict:
+    lines = [orjson.loads(line) for line in body.splitlines() if line]
+    return {line["conversation_id"]: line["messages"] for line in lines}
+
+
+def test_export_streams_ndjson():
+    """The export has one line per conversation, plain or gzipped."""
+    seed("exported-conversation", 3)
+    plain = asyncio.run(get("/api/v1/conversations/export"))
+    compressed = asyncio.run(get("/api/v1/conversations/export", gzip="true"))
+
+    assert plain.headers["content-type"] == "application/x-ndjson"
+    assert compressed.headers["content-type"] == "application/gzip"
+    conversations = exported(plain.content)
+    assert [message["content"] for message in conversations["exported-conversation"]] == ["0", "1", "2"]
+    assert conversations["exported-conversation"][1]["role"] == "assistant"
+    assert exported(gzip.decompress(compressed.content)) == conversations
+
+
+if __name__ == "__main__":
+    test_cursor_pages_cover_history_once()
+    test_cursor_survives_dropped_messages()
+    test_invalid_cursor_rejected()
+    test_export_streams_ndjson()
+    print("✅ History paging and export work")
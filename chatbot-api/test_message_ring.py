@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Test the compact message records and the ring buffer holding them."""
+
+import sys
+from pathlib import Path
+
+# Add the app directory to the path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.models import ChatMessage
+from app.services.message_ring import MessageRecord, MessageRing
+
+
+def ring_of(capacity: int, count: int) -> MessageRing:
+    """Fill a ring with records whose content is their append order."""
+    ring = MessageRing(capacity)
+    for index in range(count):
+        ring.append(MessageRecord("user", str(index)))
+    return ring
+
+
+def contents(records) -> list:
+    return [record.content for record in records]
+
+
+def test_append_overwrites_oldest():
+    """Appending to a full ring returns the record it replaced."""
+    ring = ring_of(3, 3)
+    evicted = ring.append(MessageRecord("user", "3"))
+    assert evicted.content == "0"
+    assert contents(ring) == ["1", "2", "3"]
+    assert len(ring) == 3
+
+
+def test_indexing_after_wraparound():
+    """Positive and negative indexes count from the oldest kept record."""
+    ring = ring_of(4, 10)
+    assert contents(ring) == ["6", "7", "8", "9"]
+    assert [ring[index].content for index in range(4)] == ["6", "7", "8", "9"]
+    assert ring[-1].content == "9"
+    assert ring[-4].content == "6"
+    for index in (4, -5):
+        try:
+            ring[index]
+        except IndexError:
+            pass
+        else:
+            raise AssertionError(f"index {index} should be out of range")
+
+
+def test_slicing_matches_list():
+    """Slices of a wrapped ring match slicing the equivalent list."""
+    ring = ring_of(5, 13)
+    expected = [str(index) for index in range(8, 13)]
+    for piece in (slice(None), slice(1, 3), slice(-2, None), slice(None, None, 2), slice(3, 1)):
+        assert contents(ring[piece]) == expected[piece]
+    assert contents(ring.to_list()) == expected
+
+
+def test_unbounded_ring():
+    """A capacity of 0 keeps every record."""
+    ring = ring_of(0, 100)
+    assert len(ring) == 100
+    assert ring.append(MessageRecord("user", "100")) is None
+    assert ring[0].content == "0"
+
+
+def test_initial_records_keep_newest():
+    """Seeding a ring with more records than it holds keeps the newest ones."""
+    ring = MessageRing(2, [MessageRecord("user", str(index)) for index in range(5)])
+    assert contents(ring) == ["3", "4"]
+    assert ring.append(MessageRecord("user", "5")).content == "3"
+
+
+def test_record_round_trip():
+    """Records convert to and from API messages without losing fields."""
+    message = ChatMessage(role="assistant", content="hi", timestamp="2024-01-02T03:04:05", truncated=True)
+    record = MessageRecord.from_message(message)
+    assert record.role is sys.intern("assistant")
+    assert record.to_message() == message
+
+
+if __name__ == "__main__":
+    test_append_overwrites_oldest()
+    test_indexing_after_wraparound()
+    test_slicing_matches_list()
+    test_unbounded_ring()
+    test_initial_records_keep_newest()
+    test_record_round_trip()
+    print("✅ Message ring works")
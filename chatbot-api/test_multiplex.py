@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""Test the multiplexed WebSocket transport's cancel and credit handling."""
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+import httpx
+
+# Add the app directory to the path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.services.chat_service import ChatService
+from app.services.multiplex import ChatMultiplexer
+
+
+MODEL = "mux-model"
+TOKEN_INTERVAL = 0.01
+FRAME_TIMEOUT = 5.0
+
+
+class Upstream:
+    """Fake Ollama streaming a fixed number of tokens and counting closed streams."""
+
+    def __init__(self, tokens: int):
+        self.tokens = tokens
+        self.closed = 0
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        if request.url.path != "/api/generate":
+            return httpx.Response(404)
+        return httpx.Response(200, content=self.generate())
+
+    async def generate(self):
+        try:
+            for index in range(self.tokens):
+                await asyncio.sleep(TOKEN_INTERVAL)
+                yield (json.dumps({"response": f"t{index} ", "done": False}) + "\n").encode()
+            yield (json.dumps({"response": "", "done": True, "done_reason": "stop"}) + "\n").encode()
+        finally:
+            self.closed += 1
+
+
+class FakeWebSocket:
+    """Just enough of a Starlette WebSocket for ``ChatMultiplexer``."""
+
+    def __init__(self):
+        self.incoming: asyncio.Queue = asyncio.Queue()
+        self.outgoing: asyncio.Queue = asyncio.Queue()
+
+    async def receive(self):
+        return await self.incoming.get()
+
+    async def send_text(self, text: str) -> None:
+        self.outgoing.put_nowait(json.loads(text))
+
+    def push(self, frame) -> None:
+        self.incoming.put_nowait({"type": "websocket.receive", "text": json.dumps(frame)})
+
+    def disconnect(self) -> None:
+        self.incoming.put_nowait({"type": "websocket.disconnect", "code": 1000})
+
+    async def expect(self, kind: str):
+        """Return the next frame of a type, skipping others."""
+        while True:
+            frame = await asyncio.wait_for(self.outgoing.get(), FRAME_TIMEOUT)
+            if frame["type"] == kind:
+                return frame
+
+    async def quiet(self, seconds: float) -> bool:
+        """Check that no chunk frame arrives for a while."""
+        try:
+            while True:
+                frame = await asyncio.wait_for(self.outgoing.get(), seconds)
+                if frame["type"] == "chunk":
+                    return False
+        except asyncio.TimeoutError:
+            return True
+
+
+async def run_session(upstream: Upstream, script, credit_timeout: float = 30.0):
+    """Run a multiplexer over a fake socket while ``script`` drives it.
+
+    Returns:
+        Tuple of (script result, admission stats for the test model)
+    """
+    service = ChatService()
+    client = httpx.AsyncClient(transport=httpx.MockTransport(upstream.handler))
+    service.ollama_service.client = client
+    service.ollama_service.pool.client = client
+    websocket = FakeWebSocket()
+    multiplexer = ChatMultiplexer(websocket, service, initial_credits=64, credit_timeout=credit_timeout)
+    runner = asyncio.create_task(multiplexer.run())
+    try:
+        result = await script(websocket)
+    finally:
+        websocket.disconnect()
+        await asyncio.wait_for(runner, FRAME_TIMEOUT)
+        await client.aclose()
+    return result, service.admission.stats().get(MODEL, {})
+
+
+def chat_frame(stream_id: str, **extra):
+    return {"type": "chat", "id": stream_id, "request": {"message": "Hello", "model": MODEL}, **extra}
+
+
+def test_credit_exhaustion_and_resume():
+    """A stream out of credits pauses until the client grants more, then finishes."""
+    upstream = Upstream(tokens=6)
+
+    async def script(websocket: FakeWebSocket):
+        websocket.push(chat_frame("s1", credits=2))
+        for _ in range(2):
+            await websocket.expect("chunk")
+        paused = await websocket.quiet(0.2)
+        websocket.push({"type": "credit", "id": "s1", "credits": 10})
+        chunks = [await websocket.expect("chunk") for _ in range(4)]
+        done = await websocket.expect("done")
+        return paused, chunks, done
+
+    (paused, chunks, done), stats = asyncio.run(run_session(upstream, script))
+    assert paused, "chunks kept arriving without credits"
+    assert chunks[-1]["content"] == "t5 "
+    assert done["id"] == "s1"
+    assert stats["active"] == 0
+
+
+def test_cancel_releases_slot():
+    """Cancelling a stream closes its upstream and gives back its slot."""
+    upstream = Upstream(tokens=400)
+
+    async def script(websocket: FakeWebSocket):
+        websocket.push(chat_frame("s1", credits=1))
+        await websocket.expect("chunk")
+        websocket.push({"type": "cancel", "id": "s1"})
+        return await websocket.expect("cancelled")
+
+    cancelled, stats = asyncio.run(run_session(upstream, script))
+    assert cancelled["id"] == "s1"
+    assert upstream.closed == 1
+    assert stats["active"] == 0
+
+
+def test_credit_starvation_times_out():
+    """A stream left without credits is ended instead of holding its slot forever."""
+    upstream = Upstream(tokens=400)
+
+    async def script(websocket: FakeWebSocket):
+        websocket.push(chat_frame("s1", credits=1))
+        await websocket.expect("chunk")
+        return await websocket.expect("error")
+
+    error, stats = asyncio.run(run_session(upstream, script, credit_timeout=0.2))
+    assert error["id"] == "s1"
+    assert error["status"] == 408
+    assert upstream.closed == 1
+    assert stats["active"] == 0
+
+
+def test_non_positive_credits_rejected():
+    """Zero or negative credits are refused on both chat and credit frames."""
+    upstream = Upstream(tokens=3)
+
+    async def script(websocket: FakeWebSocket):
+        websocket.push(chat_frame("s1", credits=0))
+        rejected = await websocket.expect("error")
+        websocket.push(chat_frame("s2", credits=1))
+        await websocket.expect("chunk")
+        websocket.push({"type": "credit", "id": "s2", "credits": -5})
+        refused = await websocket.expect("error")
+        websocket.push({"type": "credit", "id": "s2", "credits": 5})
+        await websocket.expect("done")
+        return rejected, refused
+
+    (rejected, refused), stats = asyncio.run(run_session(upstream, script))
+    assert rejected["id"] == "s1" and rejected["status"] == 422
+    assert refused["id"] == "s2"
+    assert stats["active"] == 0
+
+
+if __name__ == "__main__":
+    test_credit_exhaustion_and_resume()
+    test_cancel_releases_slot()
+    test_credit_starvation_times_out()
+    test_non_positive_credits_rejected()
+    print("✅ WebSocket streams honour cancel and credits")
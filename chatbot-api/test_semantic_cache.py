@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""Test that semantic cache lookups never hold a generation slot."""
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+import httpx
+
+# Add the app directory to the path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.models import ChatRequest
+from app.services.admission import AdmissionController
+from app.services.chat_service import ChatService
+from app.services.semantic_cache import SemanticCache
+
+
+MODEL = "semantic-model"
+CACHED_QUESTION = [1.0, 0.0, 0.0]
+NEW_QUESTIONS = ([0.0, 1.0, 0.0], [0.0, 0.0, 1.0])
+
+
+class Upstream:
+    """Fake Ollama recording how many slots were held during each call."""
+
+    def __init__(self, service: ChatService, embedding):
+        self.service = service
+        self.embedding = embedding
+        self.active_during_embed = []
+        self.active_during_generate = []
+
+    def active(self) -> int:
+        return self.service.admission.stats().get(MODEL, {}).get("active", 0)
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/api/embeddings":
+            self.active_during_embed.append(self.active())
+            return httpx.Response(200, json={"embedding": self.embedding})
+        if request.url.path == "/api/generate":
+            self.active_during_generate.append(self.active())
+            if not json.loads(request.content)["stream"]:
+                return httpx.Response(200, json={"response": "fresh answer", "done": True, "done_reason": "stop"})
+            lines = [
+                {"response": "fresh answer", "done": False},
+                {"response": "", "done": True, "done_reason": "stop"},
+            ]
+            return httpx.Response(200, content="".join(json.dumps(line) + "\n" for line in lines).encode())
+        return httpx.Response(404)
+
+
+def make_service(embedding):
+    """Build a service with a one-slot gate and a seeded semantic cache."""
+    service = ChatService()
+    service.admission = AdmissionController(max_concurrency=1, max_queue=4)
+    service.semantic_cache = SemanticCache(capacity=16, threshold=0.9)
+    service.semantic_cache.insert(MODEL, "What is the answer?", CACHED_QUESTION, "cached answer")
+    upstream = Upstream(service, embedding)
+    client = httpx.AsyncClient(transport=httpx.MockTransport(upstream.handler))
+    service.ollama_service.client = client
+    service.ollama_service.pool.client = client
+    return service, upstream
+
+
+async def stream(service: ChatService, message: str):
+    request = ChatRequest(message=message, model=MODEL, temperature=0.7)
+    conversation_id = await service.process_chat_request(request)
+    return [chunk async for chunk in service.generate_streaming_response(request, conversation_id)]
+
+
+async def complete(service: ChatService, message: str):
+    request = ChatRequest(message=message, model=MODEL, temperature=0.7)
+    conversation_id = await service.process_chat_request(request)
+    return await service.generate_complete_response(request, conversation_id)
+
+
+async def hits_while_model_is_busy():
+    """Ask cached questions while another request holds the only slot."""
+    service, upstream = make_service(CACHED_QUESTION)
+    busy = service.admission.enter(MODEL)
+    try:
+        chunks = await asyncio.wait_for(stream(service, "What's the answer?"), 2)
+        response = await asyncio.wait_for(complete(service, "What's the answer, then?"), 2)
+    finally:
+        busy.release()
+    return chunks, response, upstream
+
+
+async def misses():
+    """Ask new questions on an idle model."""
+    service, upstream = make_service(NEW_QUESTIONS[0])
+    chunks = await stream(service, "Something new")
+    # The streamed answer is now cached, so ask something unrelated to it
+    upstream.embedding = NEW_QUESTIONS[1]
+    response = await complete(service, "Something else new")
+    return chunks, response, upstream, service.admission.stats()[MODEL]["active"]
+
+
+def test_hit_needs_no_slot():
+    """A semantic cache hit is answered while the model's only slot is taken."""
+    chunks, response, upstream = asyncio.run(hits_while_model_is_busy())
+    assert all(chunk.queue_position is None for chunk in chunks)
+    assert "".join(chunk.content for chunk in chunks).strip() == "cached answer"
+    assert chunks[-1].usage.cached
+    assert response.message == "cached answer"
+    assert response.usage.cached
+    assert upstream.active_during_generate == []
+
+
+def test_lookup_runs_before_taking_a_slot():
+    """On a miss the embedding call runs before the request takes its slot."""
+    chunks, response, upstream, active_after = asyncio.run(misses())
+    assert "".join(chunk.content for chunk in chunks) == "fresh answer"
+    assert response.message == "fresh answer"
+    assert upstream.active_during_embed == [0, 0]
+    assert upstream.active_during_generate == [1, 1]
+    assert active_after == 0
+
+
+if __name__ == "__main__":
+    test_hit_needs_no_slot()
+    test_lookup_runs_before_taking_a_slot()
+    print("✅ Semantic cache lookups hold no generation slot")
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Test that a coalesced generation holds its admission slot until it really ends."""
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+import httpx
+
+# Add the app directory to the path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.models import ChatRequest
+from app.services.admission import AdmissionController
+from app.services.chat_service import ChatService
+
+
+MODEL = "flight-model"
+TOKEN_INTERVAL = 0.01
+TOKEN_COUNT = 30
+
+
+class Upstream:
+    """Fake Ollama counting generations that are still running."""
+
+    def __init__(self):
+        self.started = 0
+        self.running = 0
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        if request.url.path != "/api/generate":
+            return httpx.Response(404)
+        self.started += 1
+        return httpx.Response(200, content=self.generate())
+
+    async def generate(self):
+        self.running += 1
+        try:
+            for index in range(TOKEN_COUNT):
+                await asyncio.sleep(TOKEN_INTERVAL)
+                yield (json.dumps({"response": f"t{index} ", "done": False}) + "\n").encode()
+            yield (json.dumps({"response": "", "done": True, "done_reason": "stop"}) + "\n").encode()
+        finally:
+            self.running -= 1
+
+
+async def owner_leaves_joiner_stays(upstream: Upstream):
+    """Start a deterministic stream, attach a duplicate, then drop the first client.
+
+    Returns:
+        Tuple of (slots held after the owner left, upstream still running then,
+        chunks the joiner received, slots held at the end)
+    """
+    service = ChatService()
+    client = httpx.AsyncClient(transport=httpx.MockTransport(upstream.handler))
+    service.ollama_service.client = client
+    service.ollama_service.pool.client = client
+    service.admission = AdmissionController(max_concurrency=1, max_queue=4)
+    request = ChatRequest(message="Hello", model=MODEL, temperature=0, cache=False)
+
+    async def open_stream(conversation_id: str):
+        await service.process_chat_request(request, conversation_id)
+        stream = service.generate_streaming_response(request, conversation_id)
+        await stream.__anext__()
+        return stream
+
+    try:
+        owner = await open_stream("owner")
+        joiner = await open_stream("joiner")
+        await owner.aclose()
+        await asyncio.sleep(TOKEN_INTERVAL * 3)
+        active_after_owner = service.admission.stats()[MODEL]["active"]
+        running_after_owner = upstream.running
+
+        received = 1
+        async for chunk in joiner:
+            if not chunk.is_complete:
+                received += 1
+        await asyncio.sleep(0)
+        active_at_end = service.admission.stats()[MODEL]["active"]
+    finally:
+        await client.aclose()
+    return active_after_owner, running_after_owner, received, active_at_end
+
+
+def test_owner_disconnect_keeps_slot_for_joiners():
+    """The shared generation keeps its slot after its first client leaves, and frees it when done."""
+    upstream = Upstream()
+    active_after_owner, running_after_owner, received, active_at_end = asyncio.run(
+        owner_leaves_joiner_stays(upstream)
+    )
+    assert upstream.started == 1, "the duplicate started its own generation"
+    assert running_after_owner == 1, "the generation stopped with its first client"
+    assert active_after_owner == 1, "a running generation held no admission slot"
+    assert received == TOKEN_COUNT
+    assert active_at_end == 0
+
+
+if __name__ == "__main__":
+    test_owner_disconnect_keeps_slot_for_joiners()
+    print("✅ Coalesced generations hold their slot until they end")
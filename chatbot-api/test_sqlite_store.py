@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""Test that the SQLite conversation store never reads the database on the event loop."""
+
+import asyncio
+import json
+import sys
+import tempfile
+import threading
+from pathlib import Path
+import httpx
+
+# Add the app directory to the path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.models import ChatRequest
+from app.services import sqlite_store
+from app.services.chat_service import ChatService
+from app.services.message_ring import MessageRecord
+from app.services.sqlite_store import SQLiteConversationStore
+
+
+TOKEN_INTERVAL = 0.01
+TOKEN_COUNT = 10
+
+
+async def slow_generate():
+    for index in range(TOKEN_COUNT):
+        await asyncio.sleep(TOKEN_INTERVAL)
+        yield (json.dumps({"response": f"t{index} ", "done": False}) + "\n").encode()
+    yield (json.dumps({"response": "", "done": True, "done_reason": "stop"}) + "\n").encode()
+
+
+async def handler(request: httpx.Request) -> httpx.Response:
+    if request.url.path != "/api/generate":
+        return httpx.Response(404)
+    return httpx.Response(200, content=slow_generate())
+
+
+def watch_loads(store: SQLiteConversationStore):
+    """Record whether each database read ran on the event loop's thread."""
+    on_loop = []
+    load = store._load
+
+    def recording_load(conversation_id):
+        on_loop.append(threading.current_thread() is threading.main_thread())
+        return load(conversation_id)
+
+    store._load = recording_load
+    return on_loop
+
+
+async def evict_during_generation(path: str):
+    """Stream a reply while other conversations push this one out of the hot cache."""
+    service = ChatService()
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    service.ollama_service.client = client
+    service.ollama_service.pool.client = client
+    store = SQLiteConversationStore(path, on_evict=service._on_conversation_evicted)
+    service.conversations = store
+    store.start()
+    on_loop = watch_loads(store)
+    try:
+        request = ChatRequest(message="Hello", model="store-model", temperature=0.5)
+        conversation_id = await service.process_chat_request(request, "evicted")
+        chunks = 0
+        async for chunk in service.generate_streaming_response(request, conversation_id):
+            chunks += 1
+            if chunks == 2:
+                # A tiny budget makes every other write evict the conversation being generated
+                store.max_bytes = 1
+                await store.load("other")
+                store.append("other", MessageRecord("user", "x" * 100))
+                assert "evicted" not in store._conversations
+        hot = [message.role for message in store.get(conversation_id)]
+    finally:
+        store.close()
+        await client.aclose()
+
+    reopened = SQLiteConversationStore(path)
+    reopened.start()
+    try:
+        await reopened.load("evicted")
+        stored = [message.role for message in reopened.get("evicted")]
+    finally:
+        reopened.close()
+    return on_loop, hot, stored
+
+
+async def write_from_another_process(path: str):
+    """Look up an ID, let another store write it, then look it up again."""
+    store = SQLiteConversationStore(path)
+    other = SQLiteConversationStore(path)
+    store.start()
+    other.start()
+    try:
+        await store.load("shared")
+        other.append("shared", MessageRecord("user", "written elsewhere"))
+        other.flush()
+        await store.load("shared")
+        before_expiry = list(store.get("shared"))
+        ttl, sqlite_store.MISSING_TTL = sqlite_store.MISSING_TTL, 0.0
+        try:
+            await store.load("shared")
+        finally:
+            sqlite_store.MISSING_TTL = ttl
+        after_expiry = [message.content for message in store.get("shared")]
+    finally:
+        store.close()
+        other.close()
+    return before_expiry, after_expiry
+
+
+def test_eviction_during_generation_reads_off_the_loop():
+    """A conversation evicted mid-stream is reloaded in a worker thread and stays complete."""
+    with tempfile.TemporaryDirectory() as directory:
+        on_loop, hot, stored = asyncio.run(evict_during_generation(f"{directory}/conversations.db"))
+    assert on_loop, "the evicted conversation was never reloaded"
+    assert not any(on_loop), "the database was read on the event loop"
+    assert hot == ["user", "assistant"]
+    assert stored == ["user", "assistant"]
+
+
+def test_missing_ids_expire():
+    """An ID found absent is found again once another process writes it and the entry expires."""
+    with tempfile.TemporaryDirectory() as directory:
+        before, after = asyncio.run(write_from_another_process(f"{directory}/conversations.db"))
+    assert before == []
+    assert after == ["written elsewhere"]
+
+
+if __name__ == "__main__":
+    test_eviction_during_generation_reads_off_the_loop()
+    test_missing_ids_expire()
+    print("✅ SQLite store reads stay off the event loop")
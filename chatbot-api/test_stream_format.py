@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""Test the compact streaming format: negotiation, delta frames and the start/end events."""
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+import httpx
+
+# Add the app directory to the path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.api import routes
+from app.main import app
+from app.models import StreamChunk
+from app.services.streaming import encode_delta, encode_sse, negotiate_stream_format
+
+
+TOKENS = ["Hello", ", \"world\"", "\n", "é✓"]
+
+
+def ollama_handler(request: httpx.Request) -> httpx.Response:
+    """Fake Ollama streaming a fixed reply with evaluation counters."""
+    if request.url.path != "/api/generate":
+        return httpx.Response(404)
+    lines = [{"response": token, "done": False} for token in TOKENS]
+    lines.append({"response": "", "done": True, "prompt_eval_count": 12, "eval_count": len(TOKENS)})
+    return httpx.Response(200, content="".join(json.dumps(line) + "\n" for line in lines).encode())
+
+
+def parse_events(body: bytes):
+    """Split an SSE body into (event name or None, raw data) pairs."""
+    events = []
+    for frame in body.decode("utf-8").split("\n\n"):
+        if not frame:
+            continue
+        event, data = None, None
+        for line in frame.split("\n"):
+            field, _, value = line.partition(":")
+            if field == "event":
+                event = value.strip()
+            elif field == "data":
+                data = value[1:] if value.startswith(" ") else value
+        events.append((event, data))
+    return events
+
+
+async def stream_chat(message: str, **kwargs) -> httpx.Response:
+    """POST a streaming chat against a fake Ollama."""
+    service = routes.chat_service
+    upstream = httpx.AsyncClient(transport=httpx.MockTransport(ollama_handler))
+    service.ollama_service.client = upstream
+    service.ollama_service.pool.client = upstream
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            return await client.post(
+                "/api/v1/chat/stream",
+                json={"message": message, "model": "format-model", "temperature": 0.7},
+                **kwargs
+            )
+    finally:
+        await upstream.aclose()
+
+
+def test_negotiation():
+    """The query parameter wins, then an Accept parameter, then the full format."""
+    assert negotiate_stream_format(None, None) == "full"
+    assert negotiate_stream_format("compact", None) == "compact"
+    assert negotiate_stream_format("full", "text/event-stream; format=compact") == "full"
+    assert negotiate_stream_format(None, 'application/json, text/event-stream;format="compact"') == "compact"
+    assert negotiate_stream_format(None, "application/json; format=compact") == "full"
+    try:
+        negotiate_stream_format("tiny", None)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("unknown formats should be rejected")
+
+
+def test_delta_frame_is_a_json_string():
+    """A delta is the bare JSON string, smaller than the full frame for the same token."""
+    assert encode_delta('say "hi"\n') == b'data:"say \\"hi\\"\\n"\n\n'
+    full = encode_sse(StreamChunk(content="token", is_complete=False, model="format-model"))
+    assert len(encode_delta("token")) < len(full)
+
+
+def test_compact_stream():
+    """A compact stream is a start event, one string delta per frame, then the end event."""
+    response = asyncio.run(stream_chat(
+        "compact stream test", params={"conversation_id": "compact-stream", "format": "compact"}
+    ))
+    assert response.status_code == 200
+    assert response.headers["x-stream-format"] == "compact"
+    events = parse_events(response.content)
+
+    event, data = events[0]
+    assert event == "start"
+    assert json.loads(data) == {"model": "format-model", "conversation_id": "compact-stream"}
+    deltas = [json.loads(data) for event, data in events[1:-1]]
+    assert all(event is None for event, _ in events[1:-1])
+    assert "".join(deltas) == "".join(TOKENS)
+
+    event, data = events[-1]
+    assert event == "end"
+    end = json.loads(data)
+    assert end["usage"]["prompt_tokens"] == 12
+    assert end["usage"]["completion_tokens"] == len(TOKENS)
+    assert end["timing"]["total_ms"] >= 0
+
+
+def test_accept_header_selects_compact():
+    """Clients that can't add a query parameter negotiate through Accept."""
+    response = asyncio.run(stream_chat(
+        "accept header test", headers={"accept": "text/event-stream; format=compact"}
+    ))
+    assert response.headers["x-stream-format"] == "compact"
+    assert parse_events(response.content)[0][0] == "start"
+
+
+def test_full_stream_unchanged():
+    """Without negotiation every frame is a full chunk and the stream ends with [DONE]."""
+    response = asyncio.run(stream_chat("full stream test"))
+    assert response.headers["x-stream-format"] == "full"
+    events = parse_events(response.content)
+    assert events[-1] == (None, "[DONE]")
+    chunks = [json.loads(data) for _, data in events[:-1]]
+    assert "".join(chunk["content"] for chunk in chunks if not chunk["is_complete"]) == "".join(TOKENS)
+    assert chunks[-1]["is_complete"]
+
+
+if __name__ == "__main__":
+    test_negotiation()
+    test_delta_frame_is_a_json_string()
+    test_compact_stream()
+    test_accept_header_selects_compact()
+    test_full_stream_unchanged()
+    print("✅ Compact stream format works")
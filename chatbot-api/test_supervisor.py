@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""Test the multi-process supervisor: routing, ID assignment, stats merging and restarts."""
+
+import asyncio
+import shutil
+import sys
+from pathlib import Path
+from urllib.parse import parse_qsl
+
+import httpx
+import orjson
+
+# Add the app directory to the path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app import supervisor as supervisor_module
+from app.supervisor import Supervisor, label_sample, merge_metrics, routing_key, worker_index
+
+
+WORKERS = 3
+
+
+def test_routing_key():
+    """Requests are keyed by their conversation or batch, from the query or the path."""
+    assert routing_key("/api/v1/chat", [("conversation_id", "abc")]) == "abc"
+    assert routing_key("/api/v1/chat/batch", [("batch_id", "b1")]) == "b1"
+    assert routing_key("/api/v1/conversation/abc", []) == "abc"
+    assert routing_key("/api/v1/conversation/abc/messages", []) == "abc"
+    assert routing_key("/api/v1/chat/batch/b1/stream", []) == "b1"
+    assert routing_key("/api/v1/chat", [("conversation_id", "")]) is None
+    assert routing_key("/api/v1/models", []) is None
+
+
+def test_worker_index_is_stable():
+    """A conversation always maps to the same worker, and keys spread across all of them."""
+    assert worker_index("abc", WORKERS) == worker_index("abc", WORKERS)
+    indexes = {worker_index(f"conversation-{i}", WORKERS) for i in range(100)}
+    assert indexes == set(range(WORKERS))
+
+
+def test_label_sample():
+    """The worker label is added to existing label sets and to bare samples."""
+    assert label_sample("requests_total 3", 1) == 'requests_total{worker="1"} 3'
+    assert (label_sample('requests_total{model="a{b}"} 3', 2)
+            == 'requests_total{model="a{b}",worker="2"} 3')
+
+
+def test_merge_metrics_groups_families():
+    """Each family keeps one HELP/TYPE header with every worker's samples after it."""
+    body = (
+        "# HELP requests_total Requests\n"
+        "# TYPE requests_total counter\n"
+        'requests_total{model="m"} %d\n'
+        "# HELP up Up\n"
+        "# TYPE up gauge\n"
+        "up 1\n"
+    )
+    merged = merge_metrics({0: (body % 3).encode(), 1: (body % 5).encode()})
+    assert merged.splitlines() == [
+        "# HELP requests_total Requests",
+        "# TYPE requests_total counter",
+        'requests_total{model="m",worker="0"} 3',
+        'requests_total{model="m",worker="1"} 5',
+        "# HELP up Up",
+        "# TYPE up gauge",
+        'up{worker="0"} 1',
+        'up{worker="1"} 1',
+    ]
+
+
+class Body(httpx.AsyncByteStream):
+    """A response body that can be streamed once, as a worker's would be."""
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+    async def __aiter__(self):
+        yield self.data
+
+
+def respond(payload) -> httpx.Response:
+    """Answer as a worker would, with a streamed JSON body."""
+    return httpx.Response(200, headers={"content-type": "application/json"}, stream=Body(orjson.dumps(payload)))
+
+
+def make_supervisor(handler) -> Supervisor:
+    """Build a supervisor whose workers are answered in-process by ``handler``."""
+    supervisor = Supervisor(WORKERS)
+    for worker in supervisor.workers:
+        worker.client = httpx.AsyncClient(
+            transport=httpx.MockTransport(lambda request, index=worker.index: handler(index, request)),
+            base_url="http://worker"
+        )
+    return supervisor
+
+
+async def close(supervisor: Supervisor) -> None:
+    for worker in supervisor.workers:
+        await worker.client.aclose()
+    shutil.rmtree(supervisor.socket_dir, ignore_errors=True)
+
+
+async def proxy_requests():
+    """Send new and existing conversations through the supervisor."""
+    seen = []
+
+    def handler(index, request):
+        seen.append((index, request.url.path, dict(parse_qsl(request.url.query.decode()))))
+        return respond({"worker": index})
+
+    supervisor = make_supervisor(handler)
+    transport = httpx.ASGITransport(app=supervisor)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        new = await client.post("/api/v1/chat", json={"message": "hi"})
+        existing = await client.post("/api/v1/chat?conversation_id=abc", json={"message": "hi"})
+        history = await client.get("/api/v1/conversation/abc")
+    await close(supervisor)
+    return seen, new, existing, history
+
+
+def test_ids_assigned_and_routed():
+    """A new conversation gets an ID up front and lands on the worker that owns it."""
+    seen, new, existing, history = asyncio.run(proxy_requests())
+
+    assigned = new.headers["x-conversation-id"]
+    index, path, query = seen[0]
+    assert path == "/api/v1/chat"
+    assert query == {"conversation_id": assigned}
+    assert index == worker_index(assigned, WORKERS)
+
+    # An existing conversation keeps its ID and its worker, whichever path addresses it
+    assert "x-conversation-id" not in existing.headers
+    owner = worker_index("abc", WORKERS)
+    assert seen[1] == (owner, "/api/v1/chat", {"conversation_id": "abc"})
+    assert seen[2] == (owner, "/api/v1/conversation/abc", {})
+    assert existing.json() == history.json() == {"worker": owner}
+
+
+async def merged_stats():
+    """Scrape merged endpoints while one worker is down."""
+
+    def handler(index, request):
+        if index == 2:
+            raise httpx.ConnectError("restarting", request=request)
+        if request.url.path == "/metrics":
+            return httpx.Response(200, text=f"# TYPE up gauge\nup {index + 1}\n")
+        return httpx.Response(200, json={"entries": index * 10})
+
+    supervisor = make_supervisor(handler)
+    transport = httpx.ASGITransport(app=supervisor)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        metrics = await client.get("/metrics")
+        stats = await client.get("/api/v1/cache/stats")
+    await close(supervisor)
+    return metrics, stats
+
+
+def test_stats_merged_across_workers():
+    """Per-process stats come back from every reachable worker, labelled by worker."""
+    metrics, stats = asyncio.run(merged_stats())
+    assert metrics.status_code == 200
+    assert metrics.text.splitlines() == ["# TYPE up gauge", 'up{worker="0"} 1', 'up{worker="1"} 2']
+    assert stats.json() == {"workers": {"0": {"entries": 0}, "1": {"entries": 10}}}
+
+
+class FakeProcess:
+    """Stands in for a worker process that exits when told to."""
+
+    pid = 1234
+
+    def __init__(self):
+        self.returncode = None
+        self._exited = asyncio.Event()
+
+    def exit(self, code: int) -> None:
+        self.returncode = code
+        self._exited.set()
+
+    async def wait(self) -> int:
+        await self._exited.wait()
+        return self.returncode
+
+
+async def restart_after_failed_spawn():
+    """Crash a worker whose first restart attempt fails to spawn."""
+    supervisor = Supervisor(1)
+    worker = supervisor.workers[0]
+    attempts = []
+    spawned = asyncio.Event()
+
+    async def spawn():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise OSError("Cannot allocate memory")
+        worker.process = FakeProcess()
+        spawned.set()
+
+    async def wait_ready(timeout):
+        return True
+
+    worker.process = FakeProcess()
+    worker.spawn = spawn
+    worker.wait_ready = wait_ready
+    supervisor._running = True
+    backoff, supervisor_module.MIN_RESTART_BACKOFF = supervisor_module.MIN_RESTART_BACKOFF, 0.01
+    monitor = asyncio.create_task(supervisor._monitor(worker))
+    try:
+        worker.process.exit(1)
+        await asyncio.wait_for(spawned.wait(), 5)
+        result = (len(attempts), worker.restarts, worker.alive, monitor.done())
+    finally:
+        supervisor_module.MIN_RESTART_BACKOFF = backoff
+
+    supervisor._running = False
+    monitor.cancel()
+    await asyncio.gather(monitor, return_exceptions=True)
+    await close(supervisor)
+    return result
+
+
+def test_failed_restart_is_retried():
+    """A spawn error is logged and retried instead of ending the worker's monitor."""
+    attempts, restarts, alive, monitor_done = asyncio.run(restart_after_failed_spawn())
+    assert attempts == 2
+    assert restarts == 2
+    assert alive
+    assert not monitor_done
+
+
+if __name__ == "__main__":
+    test_routing_key()
+    test_worker_index_is_stable()
+    test_label_sample()
+    test_merge_metrics_groups_families()
+    test_ids_assigned_and_routed()
+    test_stats_merged_across_workers()
+    test_failed_restart_is_retried()
+    print("✅ Supervisor routes and restarts workers")
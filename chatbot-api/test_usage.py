@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Test the usage block, the stage timings and the Server-Timing header."""
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+import httpx
+
+# Add the app directory to the path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.api import routes
+from app.main import app
+from app.services.timing import STAGES, StageTimer
+
+
+# Ollama's final-chunk counters; durations are in nanoseconds
+COUNTERS = {
+    "prompt_eval_count": 20,
+    "eval_count": 50,
+    "load_duration": 3_000_000,
+    "prompt_eval_duration": 40_000_000,
+    "eval_duration": 500_000_000,
+}
+
+
+class CountingOllama:
+    """Fake Ollama answering /api/generate in either mode and counting calls."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        if request.url.path != "/api/generate":
+            return httpx.Response(404)
+        self.calls += 1
+        if json.loads(request.content).get("stream"):
+            lines = [{"response": "Hi there", "done": False}, dict(COUNTERS, response="", done=True)]
+            return httpx.Response(200, content="".join(json.dumps(line) + "\n" for line in lines).encode())
+        return httpx.Response(200, json=dict(COUNTERS, response="Hi there", done=True))
+
+
+async def complete(ollama: CountingOllama, messages):
+    """POST non-streaming chats against a fake Ollama."""
+    service = routes.chat_service
+    upstream = httpx.AsyncClient(transport=httpx.MockTransport(ollama.handler))
+    service.ollama_service.client = upstream
+    service.ollama_service.pool.client = upstream
+    transport = httpx.ASGITransport(app=app)
+    responses = []
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            for message in messages:
+                responses.append(await client.post(
+                    "/api/v1/chat", json={"message": message, "model": "usage-model", "temperature": 0}
+                ))
+    finally:
+        await upstream.aclose()
+    return responses
+
+
+def server_timing(header: str) -> dict:
+    """Parse a Server-Timing header into durations keyed by stage."""
+    stages = {}
+    for entry in header.split(", "):
+        name, _, duration = entry.partition(";dur=")
+        stages[name] = float(duration)
+    return stages
+
+
+def test_usage_from_ollama_counters():
+    """Token counts and Ollama's durations come back converted to milliseconds."""
+    ollama = CountingOllama()
+    response, = asyncio.run(complete(ollama, ["usage counters test"]))
+    assert response.status_code == 200
+    usage = response.json()["usage"]
+    assert usage["prompt_tokens"] == 20
+    assert usage["completion_tokens"] == 50
+    assert usage["total_tokens"] == 70
+    assert usage["cached"] is False
+    assert (usage["load_ms"], usage["prompt_eval_ms"], usage["eval_ms"]) == (3.0, 40.0, 500.0)
+    assert usage["tokens_per_second"] == 100.0
+
+
+def test_server_timing_matches_body():
+    """The Server-Timing header carries the same stage durations as the response body."""
+    ollama = CountingOllama()
+    response, = asyncio.run(complete(ollama, ["server timing test"]))
+    header = server_timing(response.headers["server-timing"])
+    timing = {
+        name[:-len("_ms")]: value
+        for name, value in response.json()["timing"].items() if value is not None
+    }
+    assert header == timing
+    assert {"parse", "queue", "total"} <= set(header)
+    # Stages run back to back, so they add up to the total (give or take rounding)
+    stages = sum(value for name, value in header.items() if name != "total")
+    assert abs(stages - header["total"]) < 0.01
+
+
+def test_cached_answer_has_no_counters():
+    """A repeated deterministic prompt is served from cache and says so."""
+    ollama = CountingOllama()
+    first, second = asyncio.run(complete(ollama, ["cached usage test", "cached usage test"]))
+    assert ollama.calls == 1
+    assert first.json()["usage"]["cached"] is False
+    usage = second.json()["usage"]
+    assert usage["cached"] is True
+    assert usage["prompt_tokens"] is None and usage["completion_tokens"] is None
+
+
+def test_stage_timer_skips_missing_stages():
+    """Stages that didn't happen are left out and the first mark of a stage wins."""
+    timer = StageTimer(started=100.0)
+    timer.marks = {"history": 100.010, "connect": 100.050, "last_token": 100.100}
+    timer.mark("connect")
+    durations = timer.durations()
+    assert list(durations) == ["history", "connect", "last_token", "total"]
+    assert durations == {"history": 10.0, "connect": 40.0, "last_token": 50.0, "total": 100.0}
+    assert timer.server_timing() == "history;dur=10, connect;dur=40, last_token;dur=50, total;dur=100"
+    assert set(durations) - {"total"} <= set(STAGES)
+
+
+if __name__ == "__main__":
+    test_usage_from_ollama_counters()
+    test_server_timing_matches_body()
+    test_cached_answer_has_no_counters()
+    test_stage_timer_skips_missing_stages()
+    print("✅ Usage and timings are reported")
@@ -62,6 +62,19 @@ export default function ChatInterface() {
       let isInThinkingTag = false;
 
       for await (const chunk of streamChat(request)) {
+        // Show queue status until the first token replaces it
+        if (chunk.queue_position) {
+          setMessages((prev) => {
+            const newMessages = [...prev];
+            const lastMessage = newMessages[newMessages.length - 1];
+            if (lastMessage.role === "assistant") {
+              lastMessage.content = `Waiting in queue (position ${chunk.queue_position})...`;
+            }
+            return newMessages;
+          });
+          continue;
+        }
+
         accumulatedContent += chunk.content;
 
         // Check if we're in a thinking tag
@@ -2,6 +2,7 @@ export interface ChatMessage {
   role: "user" | "assistant" | "system";
   content: string;
   timestamp?: string;
+  truncated?: boolean;
 }
 
 export interface ChatRequest {
@@ -24,6 +25,7 @@ export interface StreamChunk {
   content: string;
   is_complete: boolean;
   model: string;
+  queue_position?: number;
 }
 
 export interface ModelsResponse {